@@ -22,6 +22,25 @@ def _gloo_initialize(event):
     gl_initialize()
 
 
+def _gloo_end_frame():
+    from ..gloo import (gl, upload_scheduler, deletion_queue,
+                        render_target_pool)
+    render_target_pool.end_frame()
+    deletion_queue.flush()
+    upload_scheduler.run()
+    gl.end_frame()
+
+
+def _gloo_set_context(event):
+    from ..gloo import gl
+    gl.set_current_context(event.source)
+
+
+def _gloo_forget_context(canvas):
+    from ..gloo import gl
+    gl.forget_context(canvas)
+
+
 class Canvas(object):
     """Representation of a GUI element with an OpenGL context
 
@@ -127,6 +146,11 @@ class Canvas(object):
             self.events.initialize.connect(_gloo_initialize,
                                            ref='gloo_initialize')
 
+        # Let gloo know which context is current
+        for emitter in (self.events.initialize, self.events.resize,
+                        self.events.draw):
+            emitter.connect(_gloo_set_context, ref='gloo_context')
+
         # store arguments that get set on Canvas init
         kwargs = dict(title=title, size=size, position=position, show=show,
                       vsync=vsync, resizable=resizable, decorate=decorate,
@@ -264,6 +288,7 @@ class Canvas(object):
         """ Swap GL buffers such that the offscreen buffer becomes visible.
         """
         self._backend._vispy_swap_buffers()
+        _gloo_end_frame()
 
     def show(self, visible=True):
         """ Show (or hide) the canvas """
@@ -289,6 +314,7 @@ class Canvas(object):
             self.events.close()
             self._backend._vispy_close()
             self._backend._vispy_canvas = None
+            _gloo_forget_context(self)
 
     def _update_fps(self, event):
         """ Updates the fps after every window and resets the basetime
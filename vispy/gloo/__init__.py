@@ -47,12 +47,16 @@ Example::
 from __future__ import division
 
 from . import gl  # noqa
-from .globject import GLObject  # noqa
-from .buffer import VertexBuffer, IndexBuffer  # noqa
+from .globject import (GLObject, UploadScheduler, upload_scheduler,  # noqa
+                       GPUMemory, gpu_memory,  # noqa
+                       DeletionQueue, deletion_queue)  # noqa
+from .buffer import (VertexBuffer, IndexBuffer, RingVertexBuffer,  # noqa
+                     BufferArena)  # noqa
 from .initialize import gl_initialize  # noqa
 from .texture import Texture1D, Texture2D, TextureAtlas, Texture3D  # noqa
 from .shader import VertexShader, FragmentShader  # noqa
 from .program import Program  # noqa
 from .framebuffer import (FrameBuffer, ColorBuffer, DepthBuffer,  # noqa
-                          StencilBuffer)  # noqa
+                          StencilBuffer, RenderTargetPool,  # noqa
+                          render_target_pool)  # noqa
 from .wrappers import *  # noqa
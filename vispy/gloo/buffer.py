@@ -9,8 +9,10 @@ import sys
 import numpy as np
 
 from . import gl
-from . globject import GLObject
+from . globject import GLObject, gpu_memory
+from .util import _as_array
 from ..util import logger
+from ..ext.six import string_types
 
 
 # ------------------------------------------------------------ Buffer class ---
@@ -39,10 +41,57 @@ class Buffer(GLObject):
         Buffer byte size
     resizeable : bool
         Indicates whether buffer is resizeable
+    usage : str | GLenum
+        Usage hint for the GPU memory: 'static' (set once), 'dynamic'
+        (updated now and then), 'stream' (updated about every frame),
+        or the corresponding GL enum. With 'auto' the hint is chosen
+        based on the updates in the first frames. Default 'dynamic'.
+
+    Notes
+    -----
+    Pending writes that are completely covered by a later write are
+    dropped. For buffers that have CPU storage, pending writes of data in
+    the storage are merged when they overlap or are adjacent, and the
+    whole buffer is uploaded at once when a large enough part of it is
+    pending.
+
+    Large writes are uploaded in chunks, and at most ``upload_budget``
+    bytes are uploaded per frame (if set). The data of a buffer can be
+    a memory-mapped array (np.memmap) or a bytes object (e.g. mmap.mmap),
+    which is then streamed to the GPU without reading it into memory at
+    once.
+
+    When the buffer needs to grow, the GPU memory is over-allocated by
+    a constant factor, so that growing it incrementally (e.g. using
+    ``DataBuffer.extend()``) only rarely needs a new allocation.
+
+    In the 'auto' usage mode, the buffer counts the frames in which it
+    is updated during the first frames after its first use, and then
+    selects the usage hint. If the hint changes, the GPU memory is
+    reallocated, and filled from CPU storage (if there is no storage,
+    the hint is used for the next allocation). The decision is recorded
+    as a 'usage_hint' event in ``gl.stats()``.
     """
 
+    # When the pending writes from CPU storage cover more than this
+    # fraction of the buffer, the whole buffer is uploaded at once.
+    _full_upload_threshold = 0.5
+
+    # Max number of pending writes from CPU storage. If there are more,
+    # they are merged into a single write (which may include gaps).
+    _max_pending_ranges = 32
+
+    # Factor by which the allocated memory grows when more is needed
+    _growth_factor = 1.5
+
+    # Number of frames during which the updates are counted in 'auto'
+    # usage mode, and the fraction of these frames with an update above
+    # which the buffer is considered to be streaming.
+    _auto_usage_frames = 10
+    _auto_usage_stream = 0.75
+
     def __init__(self, data=None, target=gl.GL_ARRAY_BUFFER, nbytes=0,
-                 resizeable=True):
+                 resizeable=True, usage='dynamic'):
 
         GLObject.__init__(self)
         self._need_resize = True
@@ -58,11 +107,15 @@ class Buffer(GLObject):
             raise ValueError("Invalid target for buffer object")
         self._target = target
 
-        # Bytesize of buffer in GPU memory
+        # Bytesize of buffer, and of the memory allocated on the GPU
         self._nbytes = nbytes
+        self._capacity = 0
 
         # Buffer usage (GL_STATIC_DRAW, G_STREAM_DRAW or GL_DYNAMIC_DRAW)
-        self._usage = gl.GL_DYNAMIC_DRAW
+        self._auto_usage = usage == 'auto'
+        self._usage = _check_usage('dynamic' if self._auto_usage else usage)
+        self._usage_start = None  # First frame in which buffer was used
+        self._usage_updates = set()  # Frames in which it was updated
 
         # Set data
         self._pending_data = []
@@ -76,6 +129,54 @@ class Buffer(GLObject):
 
         return self._nbytes
 
+    @property
+    def usage(self):
+        """ The usage hint (GL enum) of the buffer """
+
+        return self._usage
+
+    @property
+    def capacity_nbytes(self):
+        """ Number of bytes allocated (or to be allocated) on the GPU """
+
+        return max(self._capacity, self._nbytes)
+
+    @property
+    def _gpu_nbytes(self):
+        """ Number of bytes used on the GPU (see GPUMemory) """
+
+        return 0 if self._need_create else self._capacity
+
+    def _evict(self):
+        """ Delete the buffer from the GPU, and upload it again from the
+        CPU storage when it is activated.
+        """
+
+        store = self._store_bytes()
+        if store is None or store.nbytes < self._nbytes:
+            return False
+        self.delete()
+        self._capacity = 0
+        self._need_resize = True
+        self._pending_data = []
+        self._add_pending_data(store[:self._nbytes], self._nbytes, 0)
+        return True
+
+    @property
+    def _need_update(self):
+        """ Whether the buffer must be activated to be created, allocated
+        or updated before it can be used.
+        """
+
+        return bool(self._need_create or self._need_resize or
+                    self._pending_data or self._auto_usage)
+
+    @property
+    def pending_nbytes(self):
+        """ Number of bytes waiting to be uploaded """
+
+        return sum([p[1] for p in self._pending_data])
+
     def set_data(self, data, offset=0, copy=False):
         """ Set data (deferred operation)
 
@@ -92,7 +193,9 @@ class Buffer(GLObject):
             Asking explicitly for a copy will prevent this behavior.
         """
 
-        data = np.array(data, copy=copy)
+        data = _as_array(data)
+        if copy:
+            data = data.copy()
         nbytes = data.nbytes
 
         if offset < 0:
@@ -102,20 +205,82 @@ class Buffer(GLObject):
                 raise ValueError("Data does not fit into buffer")
             else:
                 self._nbytes = nbytes
-                self._need_resize = True
-                # Invalidate any view on this buffer
-                for view in self._views:
-                    view._valid = False
-                self._views = []
+                if self._grow(nbytes):
+                    # Invalidate any view on this buffer
+                    for view in self._views:
+                        view._valid = False
+                    self._views = []
 
         elif (offset + nbytes) > self._nbytes:
             raise ValueError("Data does not fit into buffer")
 
-        # If the whole buffer is to be written, we clear any pending data
-        # (because they will be overwritten anyway)
-        if nbytes == self._nbytes and offset == 0:
-            self._pending_data = []
-        self._pending_data.append((data, nbytes, offset))
+        self._add_pending_data(data, nbytes, offset)
+
+    def _add_pending_data(self, data, nbytes, offset):
+        """ Add a write to the pending data, dropping the writes that
+        it shadows and merging it with other writes from CPU storage.
+        """
+
+        pending = self._pending_data
+        stop = offset + nbytes
+
+        # Drop pending writes that would be overwritten anyway
+        pending[:] = [p for p in pending
+                      if p[2] < offset or p[2] + p[1] > stop]
+
+        # Writes that are not from the CPU storage are simply appended
+        store = self._store_bytes()
+        if store is None or not _in_store(data, store, offset):
+            pending.append((data, nbytes, offset))
+            return
+
+        # Get the writes from storage that follow the last other write;
+        # only these can be merged without changing the end result.
+        i = len(pending)
+        while i > 0 and _in_store(pending[i-1][0], store, pending[i-1][2]):
+            i -= 1
+        ranges = [(p[2], p[2] + p[1]) for p in pending[i:]]
+        ranges.append((offset, stop))
+        ranges.sort()
+
+        # Merge overlapping and adjacent ranges
+        merged = [list(ranges[0])]
+        for start, stop in ranges[1:]:
+            if start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], stop)
+            else:
+                merged.append([start, stop])
+        if len(merged) > self._max_pending_ranges:
+            merged = [[merged[0][0], merged[-1][1]]]
+
+        # Upload the whole buffer if a large part of it is dirty
+        dirty = sum([stop - start for start, stop in merged])
+        if (i == 0 and len(merged) > 1 and store.nbytes >= self._nbytes and
+                dirty > self._full_upload_threshold * self._nbytes):
+            merged = [[0, self._nbytes]]
+
+        pending[i:] = [(store[start:stop], stop - start, start)
+                       for start, stop in merged]
+
+    def _store_bytes(self):
+        """ Get the CPU storage of this buffer as an array of bytes, or
+        None if there is no storage.
+        """
+        return None
+
+    def _grow(self, nbytes):
+        """ Make sure that the buffer can hold nbytes. Returns True if
+        this requires a new allocation on the GPU, in which case the
+        allocated size is increased by at least the growth factor.
+        """
+
+        if self._need_resize or nbytes > self._capacity:
+            if nbytes > self._capacity:
+                self._capacity = max(nbytes,
+                                     int(self._capacity * self._growth_factor))
+            self._need_resize = True
+            return True
+        return False
 
     def _create(self):
         """ Create buffer on GPU """
@@ -129,11 +294,17 @@ class Buffer(GLObject):
         logger.debug("GPU: Deleting buffer")
         gl.glDeleteBuffer(self._handle)
 
+    def _garbage(self):
+        """ Deletions to do when the buffer is garbage collected """
+
+        return [('glDeleteBuffer', self._handle)]
+
     def _resize(self):
         """ """
 
-        logger.debug("GPU: Resizing buffer(%d bytes)" % self._nbytes)
-        gl.glBufferData(self._target, self._nbytes, self._usage)
+        self._capacity = self.capacity_nbytes
+        logger.debug("GPU: Resizing buffer(%d bytes)" % self._capacity)
+        gl.glBufferData(self._target, self._capacity, self._usage)
 
     def _activate(self):
         """ Bind the buffer to some target """
@@ -144,6 +315,10 @@ class Buffer(GLObject):
         if self.base is not None:
             return
         
+        # Select usage hint if necessary
+        if self._auto_usage:
+            self._update_usage()
+
         # Resize if necessary
         if self._need_resize:
             self._resize()
@@ -154,6 +329,8 @@ class Buffer(GLObject):
             logger.debug("GPU: Updating buffer (%d pending operation(s))" %
                          len(self._pending_data))
             self._update_data()
+
+        gpu_memory._touch(self)
     
     def _deactivate(self):
         """ Unbind the current bound buffer """
@@ -161,12 +338,57 @@ class Buffer(GLObject):
         logger.debug("GPU: Deactivating buffer")
         gl.glBindBuffer(self._target, 0)
 
+    def _update_usage(self):
+        """ Track the frames in which the buffer is updated, and select
+        the usage hint when enough frames have passed.
+        """
+
+        frame = gl.get_frame_count()
+        if self._usage_start is None:
+            self._usage_start = frame
+        elif self._pending_data or self._need_resize:
+            self._usage_updates.add(frame)
+        if frame - self._usage_start < self._auto_usage_frames:
+            return
+
+        # Select usage hint based on the number of frames with updates
+        n = len(self._usage_updates)
+        if n == 0:
+            usage = gl.GL_STATIC_DRAW
+        elif n >= self._auto_usage_stream * self._auto_usage_frames:
+            usage = gl.GL_STREAM_DRAW
+        else:
+            usage = gl.GL_DYNAMIC_DRAW
+        self._auto_usage = False
+        self._usage_updates = set()
+        gl.record_event('usage_hint', (self._nbytes, usage))
+        logger.debug("Using usage hint %r for buffer (%d updates in %d "
+                     "frames)" % (usage, n, self._auto_usage_frames))
+
+        # Re-specify the GPU memory with the new hint
+        if usage != self._usage:
+            self._usage = usage
+            store = self._store_bytes()
+            if store is not None and not self._need_resize:
+                self._need_resize = True
+                self._pending_data = []
+                self._add_pending_data(store[:self._nbytes], self._nbytes, 0)
+
     def _update_data(self):
         """ Upload all pending data to GPU. """
 
-        # Update data
-        while self._pending_data:
-            data, nbytes, offset = self._pending_data.pop(0)
+        # Update data, in chunks and within the upload budget
+        pending, self._pending_data = self._pending_data, []
+        while pending:
+            data, nbytes, offset = pending.pop(0)
+            size = self._take_upload(nbytes)
+            if size == 0:
+                pending.insert(0, (data, nbytes, offset))
+                break
+            elif size < nbytes:
+                data = np.ascontiguousarray(data).reshape(-1).view(np.uint8)
+                pending.insert(0, (data[size:], nbytes - size, offset + size))
+                data, nbytes = data[:size], size
 
             # Determine whether to check errors to try handling the ATI bug
             check_ati_bug = ((not self._bufferSubDataOk) and
@@ -187,11 +409,41 @@ class Buffer(GLObject):
                 # We try to detect this, and if we can use glBufferData instead
                 if offset == 0 and nbytes == self._nbytes:
                     gl.glBufferData(self._target, data, self._usage)
+                    self._capacity = nbytes
                     logger.debug("Using glBufferData instead of " +
                                  "glBufferSubData (known ATI bug).")
                 else:
                     raise
 
+        # Keep what did not fit in the budget for the next frame
+        self._pending_data = pending + self._pending_data
+
+
+def _check_usage(usage):
+    """ Get the GL enum for the given usage hint. """
+
+    usages = {'static': gl.GL_STATIC_DRAW,
+              'dynamic': gl.GL_DYNAMIC_DRAW,
+              'stream': gl.GL_STREAM_DRAW}
+    if isinstance(usage, string_types):
+        if usage not in usages:
+            raise ValueError('usage must be one of %s, not "%s"'
+                             % (tuple(usages) + ('auto', ), usage))
+        return usages[usage]
+    elif usage not in usages.values():
+        raise ValueError('Invalid usage hint %r' % usage)
+    return usage
+
+
+def _in_store(data, store, offset):
+    """ Get whether data is the part of the store (an array of bytes)
+    at the given byte offset.
+    """
+    if not data.flags['C_CONTIGUOUS'] or offset + data.nbytes > store.nbytes:
+        return False
+    address = data.__array_interface__['data'][0]
+    return address == store.__array_interface__['data'][0] + offset
+
 
 # -------------------------------------------------------- DataBuffer class ---
 class DataBuffer(Buffer):
@@ -219,18 +471,27 @@ class DataBuffer(Buffer):
         undesired behavior, unless a copy is given. Default True.
     resizeable : bool
         Indicates whether buffer is resizeable
+    usage : str | GLenum
+        Usage hint for the GPU memory: 'static' (set once), 'dynamic'
+        (updated now and then), 'stream' (updated about every frame),
+        or the corresponding GL enum. With 'auto' the hint is chosen
+        based on the updates in the first frames. Default 'dynamic'.
     """
 
     def __init__(self, data=None, dtype=None, target=gl.GL_ARRAY_BUFFER,
-                 size=0, base=None, offset=0, store=True, resizeable=True):
+                 size=0, base=None, offset=0, store=True, resizeable=True,
+                 usage='dynamic'):
 
-        Buffer.__init__(self, target=target, resizeable=resizeable)
+        Buffer.__init__(self, target=target, resizeable=resizeable,
+                        usage=usage)
         self._base = base
         self._offset = offset
         self._data = None
         self._store = store
         self._copy = False  # flag to indicate that a copy is made
         self._size = size
+        self._reserve = None  # Over-allocated storage used by extend()
+        self._key = None
 
         # This buffer is a view on another
         if base is not None:
@@ -244,10 +505,7 @@ class DataBuffer(Buffer):
 
         # Create buffer from data
         elif data is not None:
-            if dtype is not None:
-                data = np.array(data, dtype=dtype, copy=False)
-            else:
-                data = np.array(data, copy=False)
+            data = _as_array(data, dtype)
             # Handle storage
             if self._store:
                 if not data.flags["C_CONTIGUOUS"]:
@@ -289,6 +547,26 @@ class DataBuffer(Buffer):
         else:
             return self._handle
 
+    @property
+    def _need_update(self):
+        """ Whether the buffer must be activated to be created, allocated
+        or updated before it can be used.
+        """
+
+        if self._base is not None:
+            return self._base._need_update
+        return Buffer._need_update.fget(self)
+
+    @property
+    def resident(self):
+        """ Whether the buffer exists on the GPU with all its data
+        uploaded (see GLObject.resident).
+        """
+
+        if self._base is not None:
+            return self._base.resident
+        return Buffer.resident.fget(self)
+
     @property
     def target(self):
         """ OpenGL type of object. """
@@ -335,6 +613,14 @@ class DataBuffer(Buffer):
             offset = offset * self.itemsize
             Buffer.set_data(self, data=data, offset=offset, copy=copy)
 
+    def _store_bytes(self):
+        """ Get the CPU storage of this buffer as an array of bytes, or
+        None if there is no storage.
+        """
+        if self._data is None or self._base is not None:
+            return None
+        return self._data.view(np.uint8)
+
     @property
     def dtype(self):
         """ Buffer dtype """
@@ -387,7 +673,8 @@ class DataBuffer(Buffer):
 
         Notes
         -----
-        This clears any pending operations.
+        This clears any pending operations. GPU memory is only
+        reallocated if the new size exceeds the allocated size.
         """
 
         if not self._resizeable:
@@ -405,13 +692,97 @@ class DataBuffer(Buffer):
         self._views = []
 
         self._pending_data = []
-        self._need_resize = True
         self._size = size
+        self._nbytes = size * self._itemsize
+        self._grow(self._nbytes)
         if self._data is not None and self._store:
             self._data = np.resize(self._data, self._size)
         else:
             self._data = None
 
+    def extend(self, data):
+        """ Append data at the end of the buffer (deferred operation)
+
+        The GPU memory is over-allocated when the buffer grows, so that
+        it only needs to be reallocated once in a while. Only the new data
+        is uploaded, and views on the buffer stay valid, unless the
+        memory is reallocated. Reallocation requires CPU storage, unless
+        no data has been uploaded yet.
+
+        Parameters
+        ----------
+
+        data : ndarray
+            The data to append. Either an array with the dtype of this
+            buffer, or (if the dtype has a single field) an array that
+            can be converted to it, e.g. of shape (n, 2) for 2D
+            positions.
+        """
+
+        if not self._resizeable:
+            raise RuntimeError("Buffer is not resizeable")
+
+        if self._base is not None:
+            raise RuntimeError("Buffer view is not resizeable")
+
+        data = self._convert_data(data)
+        start, stop = self._size, self._size + len(data)
+        was_allocated = not self._need_resize
+
+        # Grow the storage by the same factor as the GPU memory
+        if self._data is not None:
+            reserve = self._reserve
+            if (reserve is None or self._data.base is not reserve or
+                    stop > len(reserve)):
+                n = max(stop, int(len(self._data) * self._growth_factor))
+                reserve = np.empty(n, dtype=self.dtype)
+                reserve[:start] = self._data
+                self._reserve = reserve
+            reserve[start:stop] = data
+            self._data = reserve[:stop]
+        elif was_allocated and stop * self._itemsize > self._capacity:
+            raise RuntimeError("Cannot grow buffer without CPU storage")
+
+        self._size = stop
+        self._nbytes = stop * self._itemsize
+        for view in self._views:
+            if isinstance(view._key, str):
+                view._size = self._size
+                view._nbytes = self._size * view._itemsize
+
+        if self._grow(self._nbytes) and was_allocated:
+            for view in self._views:
+                view._valid = False
+            self._views = []
+            # Upload everything (from storage) into the new memory
+            self._pending_data = []
+            self.set_data(self._data, offset=0)
+            return
+
+        if self._data is not None:
+            self.set_data(self._data[start:stop], offset=start)
+        else:
+            self.set_data(data, offset=start, copy=True)
+
+    def _convert_data(self, data):
+        """ Convert data to a 1D array with the dtype of this buffer.
+        Data with a builtin dtype is converted if this buffer's dtype
+        has a single field.
+        """
+
+        data = np.array(data, copy=False)
+        if data.dtype != self.dtype:
+            if self.dtype.names is None or len(self.dtype.names) != 1:
+                raise TypeError("Data must have dtype %s" % self.dtype)
+            base, shape = self.dtype[0].base, self.dtype[0].shape
+            shape = () if shape == (1,) else shape
+            if data.shape[max(0, data.ndim - len(shape)):] != shape:
+                raise ValueError("Data must have shape (n,) + %r"
+                                 % (shape,))
+            data = np.ascontiguousarray(data, dtype=base)
+            data = data.ravel().view(self.dtype)
+        return data.ravel()
+
     def __getitem__(self, key):
         """ Create a view on this buffer. """
 
@@ -514,7 +885,7 @@ class DataBuffer(Buffer):
                 # WARNING: do we check data size
                 #          or do we let numpy raises an error ?
                 base.data[key] = data
-                offset = start * base.itemsize
+                offset = start
                 data = base.data[start:stop]
                 base.set_data(data=data, offset=offset, copy=False)
             # Base buffer has no CPU storage, we cannot do operation
@@ -528,14 +899,14 @@ class DataBuffer(Buffer):
             # WARNING: do we check data size
             #          or do we let numpy raises an error ?
             self.data[key] = data
-            offset = start * self.itemsize
+            offset = start
             self.set_data(data=self.data[start:stop],
                           offset=offset, copy=False)
 
         # Buffer is a base buffer but we do not have CPU storage
         # If 'key' points to a contiguous chunk of buffer, it's ok
         elif step == 1:
-            offset = start * self.itemsize
+            offset = start
 
             # Make sure data is an array
             if not isinstance(data, np.ndarray):
@@ -561,7 +932,9 @@ class VertexBuffer(DataBuffer):
     ----------
 
     data : ndarray
-        Buffer data (optional)
+        Buffer data (optional). This can also be a memory-mapped array
+        (np.memmap), or a bytes object like mmap.mmap (if dtype is
+        given), which is uploaded without being read into memory.
     dtype : dtype
         Buffer data type (optional)
     size : int
@@ -573,15 +946,27 @@ class VertexBuffer(DataBuffer):
         undesired behavior, unless a copy is given. Default True.
     resizeable : bool
         Indicates whether buffer is resizeable
+    usage : str | GLenum
+        Usage hint for the GPU memory: 'static' (set once), 'dynamic'
+        (updated now and then), 'stream' (updated about every frame),
+        or the corresponding GL enum. With 'auto' the hint is chosen
+        based on the updates in the first frames. Default 'dynamic'.
+    divisor : int
+        For instanced drawing (see ``Program.draw()``): the number of
+        instances that use each element, or 0 (default) if each vertex
+        uses the next element.
     """
 
     def __init__(self, data=None, dtype=None, size=0, store=True,
-                 resizeable=True, *args, **kwargs):
+                 resizeable=True, usage='dynamic', divisor=0,
+                 *args, **kwargs):
 
         # We don't want these two parameters to be seen from outside
         # (because they are used internally only)
         offset = kwargs.get("offset", 0)
         base = kwargs.get("base", None)
+        if data is not None:
+            data, dtype = _as_array(data, dtype), None
 
         # Build a structured view of the data if:
         #  -> it is not already a structured array
@@ -606,7 +991,10 @@ class VertexBuffer(DataBuffer):
 
         DataBuffer.__init__(self, data=data, dtype=dtype, size=size, base=base,
                             offset=offset, target=gl.GL_ARRAY_BUFFER,
-                            store=store, resizeable=resizeable)
+                            store=store, resizeable=resizeable, usage=usage)
+        if divisor < 0:
+            raise ValueError("Divisor must not be negative")
+        self._divisor = int(divisor)
 
         # Check base type and count for each dtype fields (if buffer is a base)
         if base is None:
@@ -630,6 +1018,316 @@ class VertexBuffer(DataBuffer):
                            % (count, name))
                     raise TypeError(msg)
 
+    @property
+    def divisor(self):
+        """ The number of instances that use each element in instanced
+        drawing, or 0 if each vertex uses the next element. Views have
+        the divisor of their base buffer.
+        """
+
+        if self._base is not None:
+            return self._base.divisor
+        return self._divisor
+
+
+# -------------------------------------------------- RingVertexBuffer class ---
+class RingVertexBuffer(VertexBuffer):
+    """ Vertex buffer with a fixed capacity that is used as a circular
+    buffer, e.g. for streaming time series.
+
+    New samples are written with ``append()``, overwriting the oldest
+    samples. Only the new samples are uploaded, which takes at most two
+    uploads when the samples wrap around the end of the buffer. The
+    data is never moved; the oldest sample is at index ``head`` (once
+    the buffer is full). To render the samples in chronological order,
+    draw the ``ranges`` in order, or offset the vertex index in the
+    shader using ``head``.
+
+    Parameters
+    ----------
+
+    data : ndarray
+        Initial buffer data (optional). Its size is the capacity.
+    dtype : dtype
+        Buffer data type (optional)
+    size : int
+        Buffer capacity (if no data is given)
+    store : bool
+        Specify whether this object stores a reference to the data,
+        allowing the data to be updated regardless of striding. Note
+        that modifying the data after passing it here might result in
+        undesired behavior, unless a copy is given. Default True.
+    usage : str | GLenum
+        Usage hint for the GPU memory: 'static' (set once), 'dynamic'
+        (updated now and then), 'stream' (updated about every frame),
+        or the corresponding GL enum. With 'auto' the hint is chosen
+        based on the updates in the first frames. Default 'dynamic'.
+    """
+
+    def __init__(self, data=None, dtype=None, size=0, store=True,
+                 usage='dynamic', *args, **kwargs):
+
+        # A ring buffer has a fixed size (views are created with
+        # resizeable=False too)
+        kwargs.pop('resizeable', None)
+        VertexBuffer.__init__(self, data=data, dtype=dtype, size=size,
+                              store=store, resizeable=False, usage=usage,
+                              *args, **kwargs)
+        self._head = 0
+        self._count = self.size if data is not None else 0
+
+    @property
+    def head(self):
+        """ Index at which the next sample is written. Once the buffer is
+        full, this is the index of the oldest sample. """
+
+        return self._head
+
+    @property
+    def count(self):
+        """ Number of samples that have been written (at most the size
+        of the buffer) """
+
+        return self._count
+
+    @property
+    def ranges(self):
+        """ List of (first, count) tuples describing the written samples
+        in chronological order """
+
+        if self._count < self.size:
+            return [(0, self._count)] if self._count else []
+        elif self._head == 0:
+            return [(0, self.size)]
+        return [(self._head, self.size - self._head), (0, self._head)]
+
+    def append(self, samples):
+        """ Append samples, overwriting the oldest samples (deferred
+        operation)
+
+        Parameters
+        ----------
+
+        samples : ndarray
+            The samples to append. Either an array with the dtype of this
+            buffer, or (if the dtype has a single field) an array that
+            can be converted to it, e.g. of shape (n, 2) for 2D
+            positions.
+        """
+
+        if self.base is not None:
+            raise ValueError("Cannot append data on a non-base buffer")
+
+        samples = self._convert_data(samples)
+
+        # Only the last samples remain if more are given than fit
+        size, n = self.size, len(samples)
+        k = min(n, size)
+        samples = samples[n - k:]
+        start = (self._head + n - k) % size
+
+        # Write in at most two parts
+        parts = [(start, samples[:size - start])]
+        if start + k > size:
+            parts.append((0, samples[size - start:]))
+        for offset, part in parts:
+            if self._data is not None:
+                stop = offset + len(part)
+                self._data[offset:stop] = part
+                self.set_data(self._data[offset:stop], offset=offset)
+            else:
+                self.set_data(part, offset=offset, copy=True)
+
+        self._head = (self._head + n) % size
+        self._count = min(self._count + n, size)
+
+
+# ------------------------------------------------------- BufferArena class ---
+class BufferArena(object):
+    """ Sub-allocator that lets many small vertex buffers share a few
+    large ones.
+
+    The arena creates large VertexBuffer's (blocks), and hands out views
+    on these blocks. The views can be used like any VertexBuffer, e.g.
+    as attribute data of a Program. Views on the same block share the
+    same GL buffer, so drawing them needs fewer binds, and the pending
+    data of all views on a block is uploaded at once (merged where
+    possible) when the block is activated, or when ``upload()`` is
+    called.
+
+    Parameters
+    ----------
+
+    dtype : dtype
+        The dtype of the data (as for VertexBuffer).
+    block_size : int
+        The number of elements in each block. Larger allocations get a
+        block of their own.
+    usage : str | GLenum
+        Usage hint for the blocks. See VertexBuffer.
+    """
+
+    def __init__(self, dtype, block_size=65536, usage='dynamic'):
+        self._block_size = block_size
+        self._usage = usage
+        self._blocks = []
+        self._free = {}  # block -> sorted list of free (start, stop)
+        self._allocations = {}  # view -> (block, start, stop)
+        self._new_block(block_size, dtype)
+
+    @property
+    def dtype(self):
+        """ The dtype of the data """
+
+        return self._blocks[0].dtype
+
+    @property
+    def blocks(self):
+        """ List of the blocks (VertexBuffer's) of this arena """
+
+        return list(self._blocks)
+
+    @property
+    def size(self):
+        """ Number of allocated elements """
+
+        return sum([stop - start for _, start, stop in
+                    self._allocations.values()])
+
+    def _new_block(self, size, dtype=None):
+        block = VertexBuffer(dtype=dtype or self.dtype, size=size,
+                             resizeable=False, usage=self._usage)
+        self._blocks.append(block)
+        self._free[block] = [(0, size)]
+        return block
+
+    def allocate(self, data=None, size=None):
+        """ Allocate a view on one of the blocks
+
+        Parameters
+        ----------
+
+        data : ndarray | None
+            The data of the view (deferred upload). Either an array with
+            the dtype of the arena, or (if the dtype has a single field)
+            an array that can be converted to it.
+        size : int | None
+            The number of elements of the view, if no data is given.
+
+        Returns
+        -------
+
+        view : VertexBuffer
+            A view on one of the blocks. Use ``view[...] = data`` to set
+            its data, and ``free(view)`` to give the space back.
+        """
+
+        if data is not None:
+            data = self._blocks[0]._convert_data(data)
+            size = len(data)
+        elif size is None:
+            raise ValueError("Either data or size must be given")
+        if size <= 0:
+            raise ValueError("Cannot allocate an empty view")
+
+        block, start = self._reserve(size)
+        stop = start + size
+        view = block[start:stop]
+        self._allocations[view] = block, start, stop
+        if data is not None:
+            block.data[start:stop] = data
+            block.set_data(block.data[start:stop], offset=start)
+        return view
+
+    def _reserve(self, size):
+        """ Find space for size elements (first fit), compacting a block
+        or creating a new one if necessary.
+        """
+
+        for block in self._blocks:
+            free = self._free[block]
+            for i, (start, stop) in enumerate(free):
+                if stop - start >= size:
+                    if stop - start == size:
+                        free.pop(i)
+                    else:
+                        free[i] = (start + size, stop)
+                    return block, start
+        for block in self._blocks:
+            free = self._free[block]
+            if sum([stop - start for start, stop in free]) >= size:
+                self._compact_block(block)
+                return self._reserve(size)
+        self._new_block(max(size, self._block_size))
+        return self._reserve(size)
+
+    def free(self, view):
+        """ Free the space of a view. The view cannot be used anymore.
+
+        Parameters
+        ----------
+
+        view : VertexBuffer
+            A view that was returned by ``allocate()``.
+        """
+
+        if view not in self._allocations:
+            raise ValueError("View was not allocated by this arena")
+        block, start, stop = self._allocations.pop(view)
+        view._valid = False
+        if view in block._views:
+            block._views.remove(view)
+
+        # Insert the range in the free list, merging it with neighbours
+        free = self._free[block]
+        free.append((start, stop))
+        free.sort()
+        merged = [free[0]]
+        for start, stop in free[1:]:
+            if start == merged[-1][1]:
+                merged[-1] = (merged[-1][0], stop)
+            else:
+                merged.append((start, stop))
+        self._free[block] = merged
+
+    def compact(self):
+        """ Move the views of each block to the start of the block, so
+        that all free space is in one range at the end (deferred
+        operation). The views stay valid; their offsets are updated.
+        """
+
+        for block in self._blocks:
+            self._compact_block(block)
+
+    def _compact_block(self, block):
+        allocations = sorted([(start, stop, view) for view, (b, start, stop)
+                              in self._allocations.items() if b is block],
+                             key=lambda a: a[0])
+        pos, first_moved = 0, None
+        for start, stop, view in allocations:
+            size = stop - start
+            if start != pos:
+                if first_moved is None:
+                    first_moved = pos
+                block.data[pos:pos + size] = block.data[start:stop]
+                view._offset = pos * block.itemsize
+                view._key = slice(pos, pos + size)
+                self._allocations[view] = block, pos, pos + size
+            pos += size
+        if first_moved is not None:
+            block.set_data(block.data[first_moved:pos], offset=first_moved)
+        self._free[block] = [(pos, block.size)] if pos < block.size else []
+
+    def upload(self):
+        """ Upload the pending data of all blocks. This requires an
+        active GL context.
+        """
+
+        for block in self._blocks:
+            if block._pending_data or block._need_resize:
+                block.activate()
+                block.deactivate()
+
 
 # ------------------------------------------------------- IndexBuffer class ---
 class IndexBuffer(DataBuffer):
@@ -651,10 +1349,15 @@ class IndexBuffer(DataBuffer):
         undesired behavior, unless a copy is given. Default True.
     resizeable : bool
         Indicates whether buffer is resizeable
+    usage : str | GLenum
+        Usage hint for the GPU memory: 'static' (set once), 'dynamic'
+        (updated now and then), 'stream' (updated about every frame),
+        or the corresponding GL enum. With 'auto' the hint is chosen
+        based on the updates in the first frames. Default 'dynamic'.
     """
 
     def __init__(self, data=None, dtype=np.uint32, size=0, store=True,
-                 resizeable=True, *args, **kwargs):
+                 resizeable=True, usage='dynamic', *args, **kwargs):
 
         # We don't want these two parameters to be seen from outside
         # (because they are used internally only)
@@ -674,4 +1377,4 @@ class IndexBuffer(DataBuffer):
 
         DataBuffer.__init__(self, data=data, dtype=dtype, size=size, base=base,
                             offset=offset, target=gl.GL_ELEMENT_ARRAY_BUFFER,
-                            store=store, resizeable=resizeable)
+                            store=store, resizeable=resizeable, usage=usage)
@@ -5,9 +5,11 @@
 # -----------------------------------------------------------------------------
 
 #import OpenGL.GL as gl
+import numpy as np
+
 from . import gl
 from .globject import GLObject
-from .texture import Texture2D
+from .texture import Texture, Texture2D, _check_texture_format
 from ..util import logger
 
 # ------------------------------------------------------ RenderBuffer class ---
@@ -76,6 +78,11 @@ class RenderBuffer(GLObject):
         logger.debug("GPU: Deleting render buffer")
         gl.glDeleteRenderbuffer(self._handle)
 
+    def _garbage(self):
+        """ Deletions to do when the buffer is garbage collected """
+
+        return [('glDeleteRenderbuffer', self._handle)]
+
     def _activate(self):
         """ Activate buffer on GPU """
 
@@ -314,6 +321,11 @@ class FrameBuffer(GLObject):
         logger.debug("GPU: Delete framebuffer")
         gl.glDeleteFramebuffer(self._handle)
 
+    def _garbage(self):
+        """ Deletions to do when the framebuffer is garbage collected """
+
+        return [('glDeleteFramebuffer', self._handle)]
+
     def _activate(self):
         """ Activate framebuffer on GPU """
 
@@ -324,6 +336,13 @@ class FrameBuffer(GLObject):
         if self._need_attach:
             self._attach()
             self._need_attach = False
+
+        # Attached buffers that were resized need new storage
+        for buffer in (self._color_buffer, self._depth_buffer,
+                       self._stencil_buffer):
+            if buffer is not None and buffer._need_resize:
+                buffer.activate()
+                buffer.deactivate()
     
     def _deactivate(self):
         """ Deactivate framebuffer on GPU """
@@ -379,3 +398,163 @@ class FrameBuffer(GLObject):
                                    'by attachments is not supported.')
             else:
                 raise RuntimeError('Unknown framebuffer error: %r.' % res)
+
+
+# ------------------------------------------------- RenderTargetPool class ---
+class RenderTargetPool(object):
+    """ Hands out FrameBuffer, Texture2D and RenderBuffer objects to
+    render to, and takes them back at the end of the frame, so that
+    offscreen rendering does not allocate GPU objects on each draw.
+
+    Free objects are kept per GL context and looked up by their kind,
+    shape, format and dtype. When there is no free object with the
+    requested shape, a free object of the same kind, format and dtype
+    is resized in place. Objects that were not used for ``max_idle``
+    frames are deleted.
+
+    The objects handed out in a frame are taken back when the Canvas
+    calls ``end_frame()``. Objects that are not needed anymore within
+    the frame can be given back earlier with ``release()``.
+
+    Parameters
+    ----------
+    max_idle : int
+        The number of frames after which unused free objects are
+        deleted. Default 60.
+    """
+
+    def __init__(self, max_idle=60):
+        self.max_idle = max_idle
+        # context -> (list of (object, key) in use,
+        #             dict key -> list of free (object, frame released))
+        self._contexts = {}
+
+    def texture(self, shape, dtype=np.uint8, format=None):
+        """ Get a Texture2D with the given shape, dtype and format.
+        The texture data is undefined.
+        """
+        shape = tuple(int(i) for i in shape)
+        if len(shape) == 2:
+            shape += (1,)
+        if format is None:
+            format = Texture._formats.get(shape[-1], None)
+        else:
+            format = _check_texture_format(format)
+        key = Texture2D, format, np.dtype(dtype)
+        obj = self._get(key, shape)
+        if obj is None:
+            obj = Texture2D(shape=shape, dtype=dtype, format=format,
+                            store=False)
+            self._put(obj, key)
+        return obj
+
+    def render_buffer(self, cls, shape, format=None):
+        """ Get a render buffer of the given class (ColorBuffer,
+        DepthBuffer or StencilBuffer), with the given shape and format.
+        """
+        shape = tuple(int(i) for i in shape)
+        key = cls, format, None
+        obj = self._get(key, shape)
+        if obj is None:
+            obj = cls(shape) if format is None else cls(shape, format)
+            self._put(obj, key)
+        return obj
+
+    def frame_buffer(self, color=None, depth=None, stencil=None):
+        """ Get a FrameBuffer with the given attachments. A free
+        FrameBuffer that already has these attachments is preferred.
+        """
+        attachments = color, depth, stencil
+        key = FrameBuffer, None, None
+        obj = self._get(key, attachments)
+        if obj is None:
+            obj = FrameBuffer()
+            self._put(obj, key)
+        for name, buffer in zip(('color_buffer', 'depth_buffer',
+                                 'stencil_buffer'), attachments):
+            if getattr(obj, name) is not buffer:
+                setattr(obj, name, buffer)
+        return obj
+
+    def release(self, *objects):
+        """ Give objects back to the pool before the end of the frame """
+        used, free = self._state()
+        for obj in objects:
+            for i, (other, key) in enumerate(used):
+                if other is obj:
+                    del used[i]
+                    self._free(free, obj, key)
+                    break
+
+    def end_frame(self):
+        """ Take back all objects handed out in the current context,
+        and delete the free objects that were not used for ``max_idle``
+        frames.
+        """
+        used, free = self._state()
+        while used:
+            self._free(free, *used.pop())
+        frame = gl.get_frame_count()
+        for key, objects in list(free.items()):
+            for entry in list(objects):
+                if frame - entry[1] > self.max_idle:
+                    objects.remove(entry)
+                    entry[0].delete()
+            if not objects:
+                del free[key]
+
+    def count(self, context=None):
+        """ Get the number of pooled objects (in use or free) in the
+        given context (default the current context).
+        """
+        if context is None:
+            context = gl.get_current_context()
+        if context not in self._contexts:
+            return 0
+        used, free = self._contexts[context]
+        return len(used) + sum(len(objects) for objects in free.values())
+
+    def _state(self):
+        context = gl.get_current_context()
+        if context not in self._contexts:
+            self._contexts[context] = [], {}
+        return self._contexts[context]
+
+    def _free(self, free, obj, key):
+        free.setdefault(key, []).append((obj, gl.get_frame_count()))
+
+    def _put(self, obj, key):
+        self._state()[0].append((obj, key))
+
+    def _get(self, key, shape):
+        """ Take a free object with the given key, preferably with the
+        given shape (the attachments for a FrameBuffer). Other objects
+        are resized.
+        """
+        used, free = self._state()
+        objects = free.get(key)
+        if not objects:
+            return None
+        for i in reversed(range(len(objects))):
+            obj = objects[i][0]
+            if key[0] is FrameBuffer:
+                found = (obj.color_buffer, obj.depth_buffer,
+                         obj.stencil_buffer) == shape
+            else:
+                found = obj.shape == shape
+            if found:
+                del objects[i]
+                break
+        else:
+            obj = objects.pop()[0]
+            if key[0] is not FrameBuffer:
+                obj.resize(shape)
+        used.append((obj, key))
+        return obj
+
+    def _forget_context(self, context):
+        self._contexts.pop(context, None)
+
+
+render_target_pool = RenderTargetPool()
+gl._context_listeners.append(render_target_pool._forget_context)
@@ -27,7 +27,12 @@ http://www.khronos.org/opengles/sdk/docs/man/
 
 from __future__ import division
 
+import re
+from collections import deque, namedtuple
+from numbers import Number
+
 from ...util import config, logger
+from ...util.ptime import time
 
 from ._constants import *  # noqa
 from ._proxy import BaseGLProxy
@@ -37,6 +42,34 @@ from ._proxy import BaseGLProxy
 # This variable is used in our proxy classes to call the right functions.
 current_backend = None
 
+# The object (backend module or proxy) that the functions in this
+# namespace are taken from. This differs from current_backend when the
+# calls go through one of the wrapping proxies defined below.
+_current_namespace = None
+
+# Whether the calls go through the profile proxy
+_profiling = False
+
+# The number of frames that have ended (see end_frame())
+_frame_count = 0
+
+# The target that was last passed to use_gl(), and the error check mode
+_current_target = None
+_error_check = 'draw'
+
+# The object that identifies the current GL context (see
+# set_current_context()), and the functions to call when a context is
+# forgotten.
+_current_context = None
+_context_listeners = []
+
+# The instanced drawing functions, per (backend, context)
+_instancing = {}
+
+# The extensions that provide instanced drawing
+_instancing_extensions = ('GL_ARB_instanced_arrays', 'GL_EXT_instanced_arrays',
+                          'GL_ANGLE_instanced_arrays')
+
 
 class MainProxy(BaseGLProxy):
     """ Main proxy for the GL ES 2.0 API. 
@@ -48,7 +81,7 @@ class MainProxy(BaseGLProxy):
     """
     
     def __call__(self, funcname, returns, *args):
-        func = getattr(current_backend, funcname)
+        func = getattr(_current_namespace, funcname)
         return func(*args)
 
 
@@ -60,28 +93,19 @@ class DebugProxy(BaseGLProxy):
     on each API call. Intended for internal use.
     """
     
-    def _arg_repr(self, arg):
-        """ Get a useful (and not too large) represetation of an argument.
-        """
-        r = repr(arg)
-        max = 40
-        if len(r) > max:
-            if hasattr(arg, 'shape'):
-                r = 'array:' + 'x'.join([repr(s) for s in arg.shape])
-            else:
-                r = r[:max-3] + '...'
-        return r
-    
+    def __init__(self):
+        self._target = None  # The module or proxy to pass the calls to
+
     def __call__(self, funcname, returns, *args):
         # Avoid recursion for glGetError
         if funcname == 'glGetError':
-            func = getattr(current_backend, funcname)
+            func = getattr(self._target, funcname)
             return func()
         # Log function call
-        argstr = ', '.join(map(self._arg_repr, args))
+        argstr = ', '.join(map(_arg_repr, args))
         logger.debug("%s(%s)" % (funcname, argstr))
         # Call function
-        func = getattr(current_backend, funcname)
+        func = getattr(self._target, funcname)
         ret = func(*args)
         # Log return value
         if returns:
@@ -92,9 +116,320 @@ class DebugProxy(BaseGLProxy):
         return ret
 
 
+class ErrorCheckProxy(BaseGLProxy):
+    """ Proxy that implements the 'call' and 'frame' error check modes
+    (see ``set_error_check()``).
+
+    In 'call' mode, check_error() is run after each API call. In
+    'frame' mode, the last calls are recorded in ``recent_calls`` as
+    (funcname, args), so that they can be reported when an error is
+    detected at the end of the frame. Arrays are recorded by their shape
+    and dtype, so that they are not kept alive. The calls are only
+    formatted when an error is reported.
+    """
+
+    def __init__(self, ncalls=20):
+        self._target = None  # The module or proxy to pass the calls to
+        self.per_call = False
+        self.recent_calls = deque(maxlen=ncalls)
+
+    def __call__(self, funcname, returns, *args):
+        func = getattr(self._target, funcname)
+        # Avoid recursion for glGetError
+        if funcname == 'glGetError':
+            return func()
+        ret = func(*args)
+        if self.per_call:
+            check_error(funcname)
+        else:
+            for arg in args:
+                if hasattr(arg, 'shape'):
+                    args = tuple(_ArrayInfo(a.shape, getattr(a, 'dtype', ''))
+                                 if hasattr(a, 'shape') else a for a in args)
+                    break
+            self.recent_calls.append((funcname, args))
+        return ret
+
+
+class StateProxy(BaseGLProxy):
+    """ Proxy that shadows the GL state to avoid redundant state changes.
+
+    This proxy keeps track of the bound program, the bound buffers, the
+    bound textures per texture unit, the enabled capabilities, the
+    vertex attribute arrays, and the blend and depth state. Calls that
+    would not change this state are not passed on to the backend. The
+    number of skipped calls per function is counted in ``skipped``.
+
+    The shadowed state is only valid if all GL calls go via this proxy,
+    and the GL context does not change. Therefore the state is
+    invalidated at the end of each frame (see ``end_frame()``). Use
+    ``invalidate()`` if GL is called in another way, or when switching
+    between contexts in the middle of a frame.
+    """
+
+    # Functions that set a parameter group, and how many times their
+    # arguments are repeated to match the arguments of the other
+    # functions in the group.
+    _parameter_groups = {
+        'glBlendColor': ('blend_color', 1),
+        'glBlendEquation': ('blend_equation', 2),
+        'glBlendEquationSeparate': ('blend_equation', 1),
+        'glBlendFunc': ('blend_func', 2),
+        'glBlendFuncSeparate': ('blend_func', 1),
+        'glDepthFunc': ('depth_func', 1),
+        'glDepthMask': ('depth_mask', 1),
+        'glDepthRange': ('depth_range', 1),
+    }
+
+    def __init__(self):
+        self._target = None  # The module or proxy to pass the calls to
+        self.skipped = {}
+        self._handlers = {
+            'glUseProgram': self._use_program,
+            'glBindBuffer': self._bind_buffer,
+            'glActiveTexture': self._active_texture,
+            'glBindTexture': self._bind_texture,
+            'glEnable': self._enable,
+            'glDisable': self._disable,
+            'glEnableVertexAttribArray': self._enable_attrib_array,
+            'glDisableVertexAttribArray': self._disable_attrib_array,
+            'glVertexAttribPointer': self._attrib_pointer,
+            'glDeleteBuffer': self._forget_handle,
+            'glDeleteProgram': self._forget_handle,
+            'glDeleteTexture': self._forget_handle,
+        }
+        for funcname in self._parameter_groups:
+            self._handlers[funcname] = self._parameter_setter(funcname)
+        self.invalidate()
+
+    def invalidate(self):
+        """ Forget the shadowed state, so that all subsequent state
+        changes are passed on to the backend (until the state is known
+        again).
+        """
+        self._bindings = {}  # target, or (unit, target) -> handle
+        self._texture_unit = None
+        self._enabled = {}  # capability -> bool
+        self._attrib_arrays = {}  # index -> bool
+        self._attrib_pointers = {}  # index -> (buffer, args)
+        self._parameters = {}  # group -> args
+
+    @property
+    def skipped_count(self):
+        """ The total number of calls that were skipped.
+        """
+        return sum(self.skipped.values())
+
+    def __call__(self, funcname, returns, *args):
+        handler = self._handlers.get(funcname)
+        if handler is not None and handler(*args):
+            self.skipped[funcname] = self.skipped.get(funcname, 0) + 1
+            return None
+        func = getattr(self._target, funcname)
+        return func(*args)
+
+    # The handlers below update the shadowed state, and return True if
+    # the call would not change anything.
+
+    def _set(self, d, key, value):
+        if key in d and d[key] == value:
+            return True
+        d[key] = value
+        return False
+
+    def _use_program(self, program):
+        return self._set(self._bindings, 'program', program)
+
+    def _bind_buffer(self, target, buffer):
+        return self._set(self._bindings, target, buffer)
+
+    def _active_texture(self, texture):
+        if self._texture_unit == texture:
+            return True
+        self._texture_unit = texture
+        return False
+
+    def _bind_texture(self, target, texture):
+        key = self._texture_unit, target
+        return self._set(self._bindings, key, texture)
+
+    def _enable(self, cap):
+        return self._set(self._enabled, cap, True)
+
+    def _disable(self, cap):
+        return self._set(self._enabled, cap, False)
+
+    def _enable_attrib_array(self, index):
+        return self._set(self._attrib_arrays, index, True)
+
+    def _disable_attrib_array(self, index):
+        return self._set(self._attrib_arrays, index, False)
+
+    def _attrib_pointer(self, index, *args):
+        # The pointer refers to the currently bound array buffer
+        buffer = self._bindings.get(GL_ARRAY_BUFFER, None)
+        if buffer is None or not _is_plain(args):
+            self._attrib_pointers.pop(index, None)
+            return False
+        return self._set(self._attrib_pointers, index, (buffer, args))
+
+    def _parameter_setter(self, funcname):
+        group, repeat = self._parameter_groups[funcname]
+
+        def setter(*args):
+            if not _is_plain(args):
+                self._parameters.pop(group, None)
+                return False
+            return self._set(self._parameters, group, args * repeat)
+        return setter
+
+    def _forget_handle(self, handle):
+        # GL may hand out the handle of a deleted object again
+        for key, val in list(self._bindings.items()):
+            if val == handle:
+                del self._bindings[key]
+        for key, val in list(self._attrib_pointers.items()):
+            if val[0] == handle:
+                del self._attrib_pointers[key]
+        return False
+
+
+class ProfileProxy(BaseGLProxy):
+    """ Proxy that collects statistics of the GL calls per frame.
+
+    For each frame, the number of calls and the cumulative wall time
+    are collected per GL function. Further, the number of bytes passed
+    to the functions that upload data, and the number of draw calls and
+    primitives are counted. The statistics of completed frames are
+    kept in ``history``; use ``stats()`` to get a report. Enable this
+    proxy via ``use_gl('desktop profile')``.
+    """
+
+    # Functions that upload data, and the index of the data argument
+    _upload_functions = {
+        'glBufferData': 1,
+        'glBufferSubData': 2,
+        'glTexImage2D': 5,
+        'glTexSubImage2D': 6,
+    }
+
+    def __init__(self, history=120):
+        self._target = None  # The module or proxy to pass the calls to
+        self.history = deque(maxlen=history)
+        self._frame = self._new_frame()
+
+    def _new_frame(self):
+        return dict(calls={}, time={}, bytes={}, draw_calls=0, primitives=0,
+                    events={})
+
+    def record_event(self, kind, info):
+        """ Record an event (e.g. a decision made by gloo) in the
+        statistics of the current frame.
+        """
+        self._frame['events'].setdefault(kind, []).append(info)
+
+    def reset(self):
+        """ Clear the history and the statistics of the current frame.
+        """
+        self.history.clear()
+        self._frame = self._new_frame()
+
+    def end_frame(self):
+        """ Move the statistics of the current frame to the history.
+        """
+        self.history.append(self._frame)
+        self._frame = self._new_frame()
+
+    def __call__(self, funcname, returns, *args):
+        func = getattr(self._target, funcname)
+        t0 = time()
+        ret = func(*args)
+        t1 = time()
+        # Count the call
+        frame = self._frame
+        calls, times = frame['calls'], frame['time']
+        calls[funcname] = calls.get(funcname, 0) + 1
+        times[funcname] = times.get(funcname, 0.0) + (t1 - t0)
+        # Count bytes and primitives
+        if funcname in self._upload_functions:
+            nbytes = _nbytes(args[self._upload_functions[funcname]])
+            frame['bytes'][funcname] = \
+                frame['bytes'].get(funcname, 0) + nbytes
+        elif funcname == 'glDrawArrays':
+            frame['draw_calls'] += 1
+            frame['primitives'] += _primitive_count(args[0], args[2])
+        elif funcname == 'glDrawElements':
+            frame['draw_calls'] += 1
+            frame['primitives'] += _primitive_count(args[0], args[1])
+        return ret
+
+
+def _nbytes(data):
+    """ Get the number of bytes in the given data. Arguments that only
+    specify a size or shape (to allocate memory) count as zero bytes.
+    """
+    if hasattr(data, 'nbytes'):
+        return data.nbytes
+    elif isinstance(data, (bytes, bytearray)):
+        return len(data)
+    return 0
+
+
+def _primitive_count(mode, count):
+    """ Get the number of primitives drawn for the given mode and number
+    of vertices.
+    """
+    if mode == GL_TRIANGLES:
+        n = count // 3
+    elif mode in (GL_TRIANGLE_STRIP, GL_TRIANGLE_FAN):
+        n = count - 2
+    elif mode == GL_LINES:
+        n = count // 2
+    elif mode == GL_LINE_STRIP:
+        n = count - 1
+    else:  # GL_POINTS, GL_LINE_LOOP
+        n = count
+    return max(0, n)
+
+
+# Shape and dtype of an array argument recorded in 'frame' error check mode
+_ArrayInfo = namedtuple('_ArrayInfo', ['shape', 'dtype'])
+
+
+def _arg_repr(arg):
+    """ Get a useful (and not too large) represetation of an argument.
+    """
+    max = 40
+    if isinstance(arg, _ArrayInfo) or (hasattr(arg, 'shape') and
+                                       getattr(arg, 'size', max) > 4):
+        return 'array:%s:%s' % ('x'.join([repr(s) for s in arg.shape]),
+                                getattr(arg, 'dtype', ''))
+    if isinstance(arg, (str, bytes)):
+        arg = arg[:max]  # avoid the repr of large shader sources
+    elif hasattr(arg, '__len__') and len(arg) > max:
+        return '<%s of length %i>' % (type(arg).__name__, len(arg))
+    r = repr(arg)
+    if len(r) > max:
+        r = r[:max-3] + '...'
+    return r
+
+
+def _is_plain(args):
+    """ Get whether all args are numbers, which can be compared to the
+    arguments of a previous call.
+    """
+    for arg in args:
+        if not isinstance(arg, Number):
+            return False
+    return True
+
+
 # Instantiate proxy objects
 proxy = MainProxy()
 _debug_proxy = DebugProxy()
+_error_proxy = ErrorCheckProxy()
+state_proxy = StateProxy()
+profile_proxy = ProfileProxy()
 
 
 def use_gl(target='desktop'):
@@ -111,15 +446,26 @@ def use_gl(target='desktop'):
     * desktop - Use desktop (i.e. normal) OpenGL.
     * pyopengl - Use pyopengl (for fallback and testing). 
     * angle - Use the Angle library to target DirectX (Windows only). (WIP)
-    * mock - Dummy backend that can be useful for testing. (not yet available)
+    * mock - Dummy backend that records all GL calls. Useful for testing.
     * webgl - Send the GL commands to the browser. (not yet available)
 
+    Options can be appended to the target, separated by a space:
+    * debug - Log all calls and check for errors after each call.
+      Errors are also checked after each call if the error check mode
+      is 'call' (see ``set_error_check()``).
+    * shadow - Shadow the GL state to skip redundant state changes
+      (see ``StateProxy``).
+    * profile - Collect statistics of the GL calls per frame (see
+      ``stats()``).
+
     """
     target = target or 'desktop'
 
     # Get options
     target, _, options = target.partition(' ')
     debug = config['gl_debug'] or ('debug' in options)
+    shadow = 'shadow' in options
+    profile = 'profile' in options
     
     # Select modules to import names from
     try:
@@ -128,13 +474,31 @@ def use_gl(target='desktop'):
         msg = 'Could not import gl target "%s":\n%s' % (target, str(err))
         raise RuntimeError(msg)
 
+    # Let the calls go through the selected proxies
+    namespace = mod
+    if profile:
+        profile_proxy._target = namespace
+        namespace = profile_proxy
+    if _error_check in ('call', 'frame') and not debug:
+        _error_proxy._target = namespace
+        _error_proxy.per_call = _error_check == 'call'
+        _error_proxy.recent_calls.clear()
+        namespace = _error_proxy
+    if debug:
+        _debug_proxy._target = namespace
+        namespace = _debug_proxy
+    if shadow:
+        state_proxy._target = namespace
+        state_proxy.invalidate()
+        namespace = state_proxy
+
     # Apply
-    global current_backend
+    global current_backend, _current_namespace, _profiling, _current_target
     current_backend = mod
-    if debug:
-        _copy_gl_functions(_debug_proxy, globals())
-    else:
-        _copy_gl_functions(mod, globals())
+    _current_target = target + (' ' + options if options else '')
+    _current_namespace = namespace
+    _profiling = profile
+    _copy_gl_functions(namespace, globals())
 
 
 def _copy_gl_functions(source, dest):
@@ -157,6 +521,211 @@ def _copy_gl_functions(source, dest):
         dest[name] = source[name]
 
 
+def end_frame():
+    """ Mark the end of a frame. This is called by
+    ``Canvas.swap_buffers()``.
+
+    The state shadowed by the ``state_proxy`` is invalidated, because
+    the GUI toolkit may change the GL state in between frames. When
+    profiling, the statistics of the frame are moved to the history.
+    In the 'frame' error check mode, errors are checked here.
+    """
+    global _frame_count
+    _frame_count += 1
+    state_proxy.invalidate()
+    if _profiling:
+        profile_proxy.end_frame()
+    if _error_check == 'frame':
+        _check_frame_errors()
+
+
+def get_frame_count():
+    """ Get the number of frames that have ended, i.e. the number of
+    times that ``end_frame()`` has been called.
+    """
+    return _frame_count
+
+
+def set_current_context(context):
+    """ Set the object that identifies the current GL context. This is
+    done by the ``Canvas`` before it emits its initialize, resize and
+    draw events. GL objects that are shared between gloo objects (e.g.
+    linked programs) are only shared within a context.
+
+    Parameters
+    ----------
+    context : object
+        A hashable object that identifies the context, or None.
+    """
+    global _current_context
+    _current_context = context
+
+
+def get_current_context():
+    """ Get the object that identifies the current GL context (see
+    ``set_current_context()``), or None if it was not set.
+    """
+    return _current_context
+
+
+def forget_context(context):
+    """ Forget the GL objects that are shared within a context, because
+    the context has been destroyed. This is done when a ``Canvas`` is
+    closed.
+
+    Parameters
+    ----------
+    context : object
+        The object that identifies the context.
+    """
+    global _current_context
+    for key in list(_instancing):
+        if key[1] == context:
+            del _instancing[key]
+    for listener in _context_listeners:
+        listener(context)
+    if _current_context is context:
+        _current_context = None
+
+
+def get_instancing():
+    """ Get the functions for instanced drawing, which are not part of
+    GL ES 2.0: a tuple (glVertexAttribDivisor, glDrawArraysInstanced,
+    glDrawElementsInstanced), or None if the backend or the driver does
+    not provide them (via GL 3.3, or the ARB, EXT or ANGLE
+    instanced_arrays extension). Requires a current context.
+
+    Note that these functions are called directly on the backend, and
+    not via the debug, error check or profile proxies.
+    """
+    key = current_backend, _current_context
+    if key not in _instancing:
+        get = getattr(current_backend, '_instancing_functions', None)
+        _instancing[key] = get() if get is not None else None
+    return _instancing[key]
+
+
+def _supports_instancing(get_parameter):
+    """ Get whether the driver supports instanced drawing, using the
+    given glGetParameter function of a backend.
+    """
+    extensions = (get_parameter(GL_EXTENSIONS) or '').split()
+    if set(extensions).intersection(_instancing_extensions):
+        return True
+    version_string = get_parameter(GL_VERSION) or ''
+    version = re.search(r'(\d+)\.(\d+)', version_string)
+    if version is None:
+        return False
+    version = int(version.group(1)), int(version.group(2))
+    if 'OpenGL ES' in version_string:
+        return version >= (3, 0)
+    return version >= (3, 3)
+
+
+def record_event(kind, info):
+    """ Record an event in the statistics of the current frame. Events
+    are only recorded when profiling (see ``stats()``).
+
+    Parameters
+    ----------
+    kind : str
+        The kind of event, e.g. 'usage_hint'.
+    info : object
+        Information about the event.
+    """
+    if _profiling:
+        profile_proxy.record_event(kind, info)
+
+
+def set_error_check(mode='draw'):
+    """ Set when Vispy checks for GL errors.
+
+    Checking for errors (via ``glGetError``) forces the driver to
+    synchronize, so checking less often can improve the performance.
+
+    Parameters
+    ----------
+    mode : str
+        The error check mode. 'call' checks after each GL call (slow).
+        'draw' checks after each draw command of a gloo Program (the
+        default). 'frame' checks once per frame, in ``end_frame()``; the
+        last GL calls of the frame are included in the error message to
+        help diagnose the error. 'off' disables the checks. Explicit
+        calls to ``check_error()`` are always done.
+    """
+    global _error_check
+    modes = ('call', 'draw', 'frame', 'off')
+    if mode not in modes:
+        raise ValueError('Error check mode must be one of %s, not %r'
+                         % (modes, mode))
+    _error_check = mode
+    use_gl(_current_target)  # Apply
+
+
+def get_error_check():
+    """ Get the current error check mode. See ``set_error_check()``.
+    """
+    return _error_check
+
+
+def _check_frame_errors():
+    """ Check for errors and include the recent calls in the error.
+    """
+    try:
+        check_error('end of frame')
+    except RuntimeError as err:
+        calls = ['%s(%s)' % (funcname, ', '.join(map(_arg_repr, args)))
+                 for funcname, args in _error_proxy.recent_calls]
+        _error_proxy.recent_calls.clear()
+        if calls:
+            err.args = (err.args[0] + '\nLast GL calls:\n  ' +
+                        '\n  '.join(calls), )
+        raise err
+
+
+def stats(frames=None):
+    """ Get statistics of the GL calls in the last completed frames.
+
+    Statistics are only collected when profiling is enabled, e.g. via
+    ``use_gl('desktop profile')``.
+
+    Parameters
+    ----------
+    frames : int | None
+        The number of frames to get the statistics for. If None, all
+        frames in the history are used.
+
+    Returns
+    -------
+    stats : dict
+        A dict with the following keys. 'frames': the number of frames
+        that the statistics are summed over, 'calls': the number of calls
+        per function, 'time': the cumulative wall time per function (in
+        seconds), 'bytes': the number of bytes uploaded per function,
+        'draw_calls' and 'primitives': the number of draw calls and
+        primitives drawn, 'events': a dict that maps each kind of event
+        to a list of the recorded events (see ``record_event()``), and
+        the totals 'total_calls', 'total_time' and 'total_bytes'.
+    """
+    history = list(profile_proxy.history)
+    if frames is not None:
+        history = history[-frames:] if frames > 0 else []
+    result = dict(frames=len(history), calls={}, time={}, bytes={},
+                  draw_calls=0, primitives=0, events={})
+    for frame in history:
+        for kind, events in frame['events'].items():
+            result['events'].setdefault(kind, []).extend(events)
+        for key in ('calls', 'time', 'bytes'):
+            d = result[key]
+            for funcname, val in frame[key].items():
+                d[funcname] = d.get(funcname, 0) + val
+        result['draw_calls'] += frame['draw_calls']
+        result['primitives'] += frame['primitives']
+    for key in ('calls', 'time', 'bytes'):
+        result['total_' + key] = sum(result[key].values())
+    return result
+
+
 def check_error(when='periodic check'):
     """ Check this from time to time to detect GL errors.
 
@@ -7,7 +7,7 @@
 
 import ctypes
 
-from . import _copy_gl_functions
+from . import _copy_gl_functions, _supports_instancing
 from ._constants import *  # noqa
 
 
@@ -35,6 +35,28 @@ def glShaderSource_compat(handle, code):
     return []
 
 
+# Extensions
+
+
+def _instancing_functions():
+    """ Get the functions for instanced drawing (see gl.get_instancing),
+    from the ANGLE_instanced_arrays extension.
+    """
+    if not _supports_instancing(glGetParameter):
+        return None
+    try:
+        divisor = _lib.glVertexAttribDivisorANGLE
+        arrays = _lib.glDrawArraysInstancedANGLE
+        elements = _lib.glDrawElementsInstancedANGLE
+    except AttributeError:
+        return None
+    divisor.argtypes = ctypes.c_uint, ctypes.c_uint
+    arrays.argtypes = ctypes.c_uint, ctypes.c_int, ctypes.c_int, ctypes.c_int
+    elements.argtypes = (ctypes.c_uint, ctypes.c_int, ctypes.c_uint,
+                         ctypes.c_void_p, ctypes.c_int)
+    return divisor, arrays, elements
+
+
 ## Inject
 
 
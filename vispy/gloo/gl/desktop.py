@@ -8,7 +8,7 @@
 import sys
 import ctypes.util
 
-from . import _copy_gl_functions
+from . import _copy_gl_functions, _supports_instancing
 from ._constants import *  # noqa
 
 ## Ctypes stuff
@@ -114,6 +114,31 @@ def glShaderSource_compat(handle, code):
     return []
 
 
+# Extensions
+
+
+def _instancing_functions():
+    """ Get the functions for instanced drawing (see gl.get_instancing),
+    from GL 3.3 or the ARB_instanced_arrays extension.
+    """
+    if not _supports_instancing(glGetParameter):
+        return None
+    c_uint, c_int = ctypes.c_uint, ctypes.c_int
+    for suffix in ('', 'ARB'):
+        try:
+            divisor = _get_gl_func('glVertexAttribDivisor' + suffix, None,
+                                   (c_uint, c_uint))
+            arrays = _get_gl_func('glDrawArraysInstanced' + suffix, None,
+                                  (c_uint, c_int, c_int, c_int))
+            elements = _get_gl_func('glDrawElementsInstanced' + suffix,
+                                    None, (c_uint, c_int, c_uint,
+                                           ctypes.c_void_p, c_int))
+        except RuntimeError:
+            continue
+        return divisor, arrays, elements
+    return None
+
+
 ## Inject
 
 
@@ -0,0 +1,995 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+
+""" GL ES 2.0 API implemented as a recording mock. Intended for testing,
+and for profiling the Python side of vispy on systems without a GPU.
+
+Each call is appended to a compact command log (``mock.commands``) as
+a ``(funcname, args)`` tuple, in which array arguments are replaced by an
+``ArrayInfo(shape, dtype, nbytes)`` description. The mock hands out fake
+handles, keeps track of bound state, and answers queries like
+``glGetProgramParameter`` and ``glGetActiveUniform`` by parsing the
+sources of the attached shaders. A handful of common mistakes (using
+deleted objects, writing outside a buffer, drawing without a program)
+result in GL errors that can be obtained via ``glGetError``.
+
+Use ``gl.use_gl('mock')`` to select this backend. Use ``mock.reset()``
+to clear the command log and all GL state.
+"""
+
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from . import BaseGLProxy, _copy_gl_functions
+from ._constants import *  # noqa
+
+
+_GL_SAMPLER_3D = 35679  # Not in ES 2.0, but used by gloo.Texture3D
+
+ArrayInfo = namedtuple('ArrayInfo', ['shape', 'dtype', 'nbytes'])
+
+_glsl_types = {
+    'float': GL_FLOAT, 'vec2': GL_FLOAT_VEC2, 'vec3': GL_FLOAT_VEC3,
+    'vec4': GL_FLOAT_VEC4, 'int': GL_INT, 'ivec2': GL_INT_VEC2,
+    'ivec3': GL_INT_VEC3, 'ivec4': GL_INT_VEC4, 'bool': GL_BOOL,
+    'bvec2': GL_BOOL_VEC2, 'bvec3': GL_BOOL_VEC3, 'bvec4': GL_BOOL_VEC4,
+    'mat2': GL_FLOAT_MAT2, 'mat3': GL_FLOAT_MAT3, 'mat4': GL_FLOAT_MAT4,
+    'sampler2D': GL_SAMPLER_2D, 'samplerCube': GL_SAMPLER_CUBE,
+    'sampler3D': _GL_SAMPLER_3D,
+}
+
+_re_comment = re.compile(r'//.*?$|/\*.*?\*/', re.M | re.S)
+_re_declaration = re.compile(r'\b(uniform|attribute)\s+'
+                             r'(?:(?:lowp|mediump|highp)\s+)?'
+                             r'(\w+)\s+([^;]+);')
+_re_name = re.compile(r'\s*(\w+)\s*(?:\[\s*(\d+)\s*\])?\s*$')
+_re_main = re.compile(r'\bvoid\s+main\s*\(')
+
+
+def _compact(arg):
+    """ Replace array data by a small description, so that the command
+    log does not keep uploaded data alive.
+    """
+    if isinstance(arg, np.ndarray):
+        return ArrayInfo(arg.shape, arg.dtype, arg.nbytes)
+    return arg
+
+
+def _nbytes(data):
+    """ Get the number of bytes represented by a data argument. """
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    elif isinstance(data, (int, np.integer)):
+        return int(data)
+    return len(data)
+
+
+def _parse_variables(codes):
+    """ Get the uniforms and attributes declared in the given GLSL
+    sources, as two lists of (name, size, gtype). Variables that are
+    never referenced outside of their declaration are considered to be
+    optimized away, just like a real GLSL compiler would.
+    """
+    codes = [_re_comment.sub('', code) for code in codes]
+    declared = {'uniform': [], 'attribute': []}
+    bodies = []
+    for code in codes:
+        for m in _re_declaration.finditer(code):
+            kind, typename = m.group(1), m.group(2)
+            gtype = _glsl_types.get(typename)
+            if gtype is None:
+                continue
+            for decl in m.group(3).split(','):
+                mm = _re_name.match(decl)
+                if mm:
+                    name, size = mm.group(1), int(mm.group(2) or 1)
+                    if name not in [d[0] for d in declared[kind]]:
+                        declared[kind].append((name, size, gtype))
+        bodies.append(_re_declaration.sub('', code))
+    body = '\n'.join(bodies)
+    uniforms, attributes = [], []
+    for kind, result in (('uniform', uniforms), ('attribute', attributes)):
+        for name, size, gtype in declared[kind]:
+            if re.search(r'\b%s\b' % name, body):
+                result.append((name, size, gtype))
+    return uniforms, attributes
+
+
+class MockGLState(object):
+    """ The state of the mock GL implementation. Has a method for each
+    GL function that affects or queries the state. Functions that are
+    not implemented here are only recorded.
+    """
+
+    _default_parameters = {
+        GL_VENDOR: 'Vispy', GL_RENDERER: 'Vispy mock GL',
+        GL_VERSION: 'OpenGL ES 2.0 (vispy mock)',
+        GL_SHADING_LANGUAGE_VERSION: 'OpenGL ES GLSL ES 1.0',
+        GL_EXTENSIONS: '',
+        GL_MAX_TEXTURE_SIZE: 8192, GL_MAX_CUBE_MAP_TEXTURE_SIZE: 8192,
+        GL_MAX_RENDERBUFFER_SIZE: 8192, GL_MAX_VIEWPORT_DIMS: (8192, 8192),
+        GL_MAX_VERTEX_ATTRIBS: 16, GL_MAX_VARYING_VECTORS: 32,
+        GL_MAX_VERTEX_UNIFORM_VECTORS: 1024,
+        GL_MAX_FRAGMENT_UNIFORM_VECTORS: 1024,
+        GL_MAX_TEXTURE_IMAGE_UNITS: 16, GL_MAX_VERTEX_TEXTURE_IMAGE_UNITS: 16,
+        GL_MAX_COMBINED_TEXTURE_IMAGE_UNITS: 32,
+        GL_RED_BITS: 8, GL_GREEN_BITS: 8, GL_BLUE_BITS: 8, GL_ALPHA_BITS: 8,
+        GL_DEPTH_BITS: 24, GL_STENCIL_BITS: 8, GL_SUBPIXEL_BITS: 4,
+        GL_SAMPLES: 0, GL_SAMPLE_BUFFERS: 0,
+        GL_ALIASED_LINE_WIDTH_RANGE: (1.0, 1.0),
+        GL_ALIASED_POINT_SIZE_RANGE: (1.0, 64.0),
+        GL_VIEWPORT: (0, 0, 0, 0), GL_SCISSOR_BOX: (0, 0, 0, 0),
+        GL_COLOR_CLEAR_VALUE: (0.0, 0.0, 0.0, 0.0),
+        GL_DEPTH_CLEAR_VALUE: 1.0, GL_STENCIL_CLEAR_VALUE: 0,
+        GL_COLOR_WRITEMASK: (1, 1, 1, 1), GL_DEPTH_WRITEMASK: 1,
+        GL_DEPTH_RANGE: (0.0, 1.0), GL_DEPTH_FUNC: GL_LESS,
+        GL_CULL_FACE_MODE: GL_BACK, GL_FRONT_FACE: GL_CCW,
+        GL_LINE_WIDTH: 1.0,
+        GL_POLYGON_OFFSET_FACTOR: 0.0, GL_POLYGON_OFFSET_UNITS: 0.0,
+        GL_SAMPLE_COVERAGE_VALUE: 1.0, GL_SAMPLE_COVERAGE_INVERT: 0,
+        GL_BLEND_COLOR: (0.0, 0.0, 0.0, 0.0),
+        GL_BLEND_EQUATION_RGB: GL_FUNC_ADD,
+        GL_BLEND_EQUATION_ALPHA: GL_FUNC_ADD,
+        GL_BLEND_SRC_RGB: GL_ONE, GL_BLEND_SRC_ALPHA: GL_ONE,
+        GL_BLEND_DST_RGB: GL_ZERO, GL_BLEND_DST_ALPHA: GL_ZERO,
+        GL_STENCIL_FUNC: GL_ALWAYS, GL_STENCIL_BACK_FUNC: GL_ALWAYS,
+        GL_STENCIL_REF: 0, GL_STENCIL_BACK_REF: 0,
+        GL_STENCIL_VALUE_MASK: 255, GL_STENCIL_BACK_VALUE_MASK: 255,
+        GL_STENCIL_WRITEMASK: 255, GL_STENCIL_BACK_WRITEMASK: 255,
+        GL_STENCIL_FAIL: GL_KEEP, GL_STENCIL_BACK_FAIL: GL_KEEP,
+        GL_STENCIL_PASS_DEPTH_FAIL: GL_KEEP,
+        GL_STENCIL_BACK_PASS_DEPTH_FAIL: GL_KEEP,
+        GL_STENCIL_PASS_DEPTH_PASS: GL_KEEP,
+        GL_STENCIL_BACK_PASS_DEPTH_PASS: GL_KEEP,
+        GL_PACK_ALIGNMENT: 4, GL_UNPACK_ALIGNMENT: 4,
+        GL_GENERATE_MIPMAP_HINT: GL_DONT_CARE,
+    }
+
+    # Functions that simply set one or more parameters. Each argument
+    # is mapped to the corresponding tuple of parameter names.
+    _parameter_setters = {
+        'glClearDepth': ((GL_DEPTH_CLEAR_VALUE, ), ),
+        'glClearStencil': ((GL_STENCIL_CLEAR_VALUE, ), ),
+        'glCullFace': ((GL_CULL_FACE_MODE, ), ),
+        'glFrontFace': ((GL_FRONT_FACE, ), ),
+        'glDepthFunc': ((GL_DEPTH_FUNC, ), ),
+        'glDepthMask': ((GL_DEPTH_WRITEMASK, ), ),
+        'glLineWidth': ((GL_LINE_WIDTH, ), ),
+        'glPolygonOffset': ((GL_POLYGON_OFFSET_FACTOR, ),
+                            (GL_POLYGON_OFFSET_UNITS, )),
+        'glSampleCoverage': ((GL_SAMPLE_COVERAGE_VALUE, ),
+                             (GL_SAMPLE_COVERAGE_INVERT, )),
+        'glBlendEquation': ((GL_BLEND_EQUATION_RGB,
+                             GL_BLEND_EQUATION_ALPHA), ),
+        'glBlendEquationSeparate': ((GL_BLEND_EQUATION_RGB, ),
+                                    (GL_BLEND_EQUATION_ALPHA, )),
+        'glBlendFunc': ((GL_BLEND_SRC_RGB, GL_BLEND_SRC_ALPHA),
+                        (GL_BLEND_DST_RGB, GL_BLEND_DST_ALPHA)),
+        'glBlendFuncSeparate': ((GL_BLEND_SRC_RGB, ), (GL_BLEND_DST_RGB, ),
+                                (GL_BLEND_SRC_ALPHA, ),
+                                (GL_BLEND_DST_ALPHA, )),
+        'glStencilFunc': ((GL_STENCIL_FUNC, GL_STENCIL_BACK_FUNC),
+                          (GL_STENCIL_REF, GL_STENCIL_BACK_REF),
+                          (GL_STENCIL_VALUE_MASK, GL_STENCIL_BACK_VALUE_MASK)),
+        'glStencilMask': ((GL_STENCIL_WRITEMASK, GL_STENCIL_BACK_WRITEMASK), ),
+        'glStencilOp': (
+            (GL_STENCIL_FAIL, GL_STENCIL_BACK_FAIL),
+            (GL_STENCIL_PASS_DEPTH_FAIL, GL_STENCIL_BACK_PASS_DEPTH_FAIL),
+            (GL_STENCIL_PASS_DEPTH_PASS, GL_STENCIL_BACK_PASS_DEPTH_PASS)),
+    }
+
+    # Functions that set a single parameter that consists of all arguments
+    _tuple_setters = {
+        'glClearColor': GL_COLOR_CLEAR_VALUE,
+        'glBlendColor': GL_BLEND_COLOR,
+        'glColorMask': GL_COLOR_WRITEMASK,
+        'glDepthRange': GL_DEPTH_RANGE,
+        'glViewport': GL_VIEWPORT,
+        'glScissor': GL_SCISSOR_BOX,
+    }
+
+    def __init__(self):
+        self._last_handle = 0
+        self.objects = {}  # handle -> object dict (with a 'kind' key)
+        self.errors = []
+        self.parameters = dict(self._default_parameters)
+        self.enabled = set([GL_DITHER])
+        self.array_buffer = 0
+        self.element_array_buffer = 0
+        self.framebuffer = 0
+        self.renderbuffer = 0
+        self.program = 0
+        self.active_texture = GL_TEXTURE0
+        self.textures = {}  # (unit, target) -> handle
+        self.vertex_attribs = {}  # index -> dict
+
+    # --- helpers
+
+    def set_error(self, err):
+        """ Set a GL error (only the first of each kind is kept). """
+        if err not in self.errors:
+            self.errors.append(err)
+
+    def set_parameter(self, funcname, *args):
+        """ Apply a function that only sets parameters. Returns False if
+        the function is not a parameter setter.
+        """
+        if funcname in self._tuple_setters:
+            self.parameters[self._tuple_setters[funcname]] = tuple(args)
+        elif funcname in self._parameter_setters:
+            for pnames, arg in zip(self._parameter_setters[funcname], args):
+                for pname in pnames:
+                    self.parameters[pname] = arg
+        else:
+            return False
+        return True
+
+    def _create(self, kind, **kwargs):
+        self._last_handle += 1
+        kwargs['kind'] = kind
+        self.objects[self._last_handle] = kwargs
+        return self._last_handle
+
+    def _get(self, handle, kind):
+        """ Get object of the given kind, or set an error and return None.
+        """
+        ob = self.objects.get(handle, None)
+        if ob is None or ob['kind'] != kind:
+            self.set_error(GL_INVALID_OPERATION if ob is not None or
+                           handle > 0 else GL_INVALID_VALUE)
+            return None
+        return ob
+
+    def _delete(self, handle, kind):
+        ob = self.objects.get(handle, None)
+        if ob is not None and ob['kind'] == kind:
+            del self.objects[handle]
+            return True
+        elif handle != 0:
+            self.set_error(GL_INVALID_VALUE)
+        return False
+
+    def _is(self, handle, kind):
+        ob = self.objects.get(handle, None)
+        return ob is not None and ob['kind'] == kind
+
+    def bound_buffer(self, target):
+        """ Get the buffer object bound to the given target (or None). """
+        if target == GL_ARRAY_BUFFER:
+            handle = self.array_buffer
+        elif target == GL_ELEMENT_ARRAY_BUFFER:
+            handle = self.element_array_buffer
+        else:
+            self.set_error(GL_INVALID_ENUM)
+            return None
+        if not handle:
+            self.set_error(GL_INVALID_OPERATION)
+            return None
+        return self.objects[handle]
+
+    def bound_texture(self, target):
+        """ Get the texture object bound to the given target (or None). """
+        if target in (GL_TEXTURE_CUBE_MAP_POSITIVE_X,
+                      GL_TEXTURE_CUBE_MAP_NEGATIVE_X,
+                      GL_TEXTURE_CUBE_MAP_POSITIVE_Y,
+                      GL_TEXTURE_CUBE_MAP_NEGATIVE_Y,
+                      GL_TEXTURE_CUBE_MAP_POSITIVE_Z,
+                      GL_TEXTURE_CUBE_MAP_NEGATIVE_Z):
+            target = GL_TEXTURE_CUBE_MAP
+        handle = self.textures.get((self.active_texture, target), 0)
+        if not handle:
+            self.set_error(GL_INVALID_OPERATION)
+            return None
+        return self.objects[handle]
+
+    def current_program(self):
+        """ Get the program object in use (or None). """
+        if not self.program:
+            self.set_error(GL_INVALID_OPERATION)
+            return None
+        return self.objects[self.program]
+
+    # --- objects
+
+    def glCreateBuffer(self):
+        return self._create('buffer', nbytes=0, usage=GL_STATIC_DRAW)
+
+    def glCreateTexture(self):
+        return self._create('texture', shape=None, format=None, params={})
+
+    def glCreateFramebuffer(self):
+        return self._create('framebuffer', attachments={})
+
+    def glCreateRenderbuffer(self):
+        return self._create('renderbuffer', shape=None, format=None)
+
+    def glCreateProgram(self):
+        return self._create('program', shaders=[], linked=False, log='',
+                            uniforms=[], attributes=[], locations={},
+                            attribute_locations={}, bound_locations={},
+                            values={})
+
+    def glCreateShader(self, type):
+        if type not in (GL_VERTEX_SHADER, GL_FRAGMENT_SHADER):
+            self.set_error(GL_INVALID_ENUM)
+            return 0
+        return self._create('shader', type=type, source='', compiled=False,
+                            log='')
+
+    def glDeleteBuffer(self, buffer):
+        if self._delete(buffer, 'buffer'):
+            if self.array_buffer == buffer:
+                self.array_buffer = 0
+            if self.element_array_buffer == buffer:
+                self.element_array_buffer = 0
+
+    def glDeleteTexture(self, texture):
+        if self._delete(texture, 'texture'):
+            for key, handle in list(self.textures.items()):
+                if handle == texture:
+                    del self.textures[key]
+
+    def glDeleteFramebuffer(self, framebuffer):
+        if self._delete(framebuffer, 'framebuffer'):
+            if self.framebuffer == framebuffer:
+                self.framebuffer = 0
+
+    def glDeleteRenderbuffer(self, renderbuffer):
+        if self._delete(renderbuffer, 'renderbuffer'):
+            if self.renderbuffer == renderbuffer:
+                self.renderbuffer = 0
+
+    def glDeleteProgram(self, program):
+        if self._delete(program, 'program'):
+            if self.program == program:
+                self.program = 0
+
+    def glDeleteShader(self, shader):
+        self._delete(shader, 'shader')
+
+    def glIsBuffer(self, buffer):
+        return self._is(buffer, 'buffer')
+
+    def glIsTexture(self, texture):
+        return self._is(texture, 'texture')
+
+    def glIsFramebuffer(self, framebuffer):
+        return self._is(framebuffer, 'framebuffer')
+
+    def glIsRenderbuffer(self, renderbuffer):
+        return self._is(renderbuffer, 'renderbuffer')
+
+    def glIsProgram(self, program):
+        return self._is(program, 'program')
+
+    def glIsShader(self, shader):
+        return self._is(shader, 'shader')
+
+    # --- buffers
+
+    def glBindBuffer(self, target, buffer):
+        if buffer and self._get(buffer, 'buffer') is None:
+            return
+        if target == GL_ARRAY_BUFFER:
+            self.array_buffer = buffer
+        elif target == GL_ELEMENT_ARRAY_BUFFER:
+            self.element_array_buffer = buffer
+        else:
+            self.set_error(GL_INVALID_ENUM)
+
+    def glBufferData(self, target, data, usage):
+        ob = self.bound_buffer(target)
+        if ob is not None:
+            ob['nbytes'] = _nbytes(data)
+            ob['usage'] = usage
+
+    def glBufferSubData(self, target, offset, data):
+        ob = self.bound_buffer(target)
+        if ob is not None:
+            if offset < 0 or offset + _nbytes(data) > ob['nbytes']:
+                self.set_error(GL_INVALID_VALUE)
+
+    def glGetBufferParameter(self, target, pname):
+        ob = self.bound_buffer(target)
+        if ob is None:
+            return 0
+        elif pname == GL_BUFFER_SIZE:
+            return ob['nbytes']
+        elif pname == GL_BUFFER_USAGE:
+            return ob['usage']
+        self.set_error(GL_INVALID_ENUM)
+        return 0
+
+    # --- textures
+
+    def glActiveTexture(self, texture):
+        units = self.parameters[GL_MAX_COMBINED_TEXTURE_IMAGE_UNITS]
+        if not GL_TEXTURE0 <= texture < GL_TEXTURE0 + units:
+            self.set_error(GL_INVALID_ENUM)
+        else:
+            self.active_texture = texture
+
+    def glBindTexture(self, target, texture):
+        if texture and self._get(texture, 'texture') is None:
+            return
+        self.textures[(self.active_texture, target)] = texture
+
+    def glTexImage2D(self, target, level, internalformat, format, type,
+                     pixels):
+        ob = self.bound_texture(target)
+        if ob is not None and level == 0:
+            if isinstance(pixels, (tuple, list)):
+                shape = tuple(pixels[:2])
+            else:
+                shape = pixels.shape[:2]
+            ob['shape'], ob['format'] = shape, internalformat
+
+    def glCopyTexImage2D(self, target, level, internalformat, x, y, width,
+                         height, border):
+        ob = self.bound_texture(target)
+        if ob is not None and level == 0:
+            ob['shape'], ob['format'] = (height, width), internalformat
+
+    def glTexSubImage2D(self, target, level, xoffset, yoffset, format, type,
+                        pixels):
+        ob = self.bound_texture(target)
+        if ob is not None:
+            self._check_tex_region(ob, xoffset, yoffset, pixels.shape[1],
+                                   pixels.shape[0])
+
+    def glCopyTexSubImage2D(self, target, level, xoffset, yoffset, x, y,
+                            width, height):
+        ob = self.bound_texture(target)
+        if ob is not None:
+            self._check_tex_region(ob, xoffset, yoffset, width, height)
+
+    def _check_tex_region(self, ob, x, y, w, h):
+        if ob['shape'] is None:
+            self.set_error(GL_INVALID_OPERATION)
+        elif x < 0 or y < 0 or y + h > ob['shape'][0] or \
+                x + w > ob['shape'][1]:
+            self.set_error(GL_INVALID_VALUE)
+
+    def glTexParameterf(self, target, pname, param):
+        ob = self.bound_texture(target)
+        if ob is not None:
+            ob['params'][pname] = param
+
+    glTexParameteri = glTexParameterf
+
+    def glGetTexParameter(self, target, pname):
+        ob = self.bound_texture(target)
+        if ob is not None:
+            return ob['params'].get(pname, 0)
+        return 0
+
+    def glGenerateMipmap(self, target):
+        self.bound_texture(target)
+
+    # --- framebuffers and renderbuffers
+
+    def glBindFramebuffer(self, target, framebuffer):
+        if framebuffer and self._get(framebuffer, 'framebuffer') is None:
+            return
+        self.framebuffer = framebuffer
+
+    def glBindRenderbuffer(self, target, renderbuffer):
+        if renderbuffer and self._get(renderbuffer, 'renderbuffer') is None:
+            return
+        self.renderbuffer = renderbuffer
+
+    def glRenderbufferStorage(self, target, internalformat, width, height):
+        if not self.renderbuffer:
+            self.set_error(GL_INVALID_OPERATION)
+            return
+        ob = self.objects[self.renderbuffer]
+        ob['shape'], ob['format'] = (height, width), internalformat
+
+    def glGetRenderbufferParameter(self, target, pname):
+        if not self.renderbuffer:
+            self.set_error(GL_INVALID_OPERATION)
+            return 0
+        ob = self.objects[self.renderbuffer]
+        shape = ob['shape'] or (0, 0)
+        return {GL_RENDERBUFFER_WIDTH: shape[1],
+                GL_RENDERBUFFER_HEIGHT: shape[0],
+                GL_RENDERBUFFER_INTERNAL_FORMAT: ob['format']}.get(pname, 0)
+
+    def _attach(self, attachment, handle, kind):
+        if not self.framebuffer:
+            self.set_error(GL_INVALID_OPERATION)
+            return
+        attachments = self.objects[self.framebuffer]['attachments']
+        if not handle:
+            attachments.pop(attachment, None)
+        elif self._get(handle, kind) is not None:
+            attachments[attachment] = handle
+
+    def glFramebufferRenderbuffer(self, target, attachment,
+                                  renderbuffertarget, renderbuffer):
+        self._attach(attachment, renderbuffer, 'renderbuffer')
+
+    def glFramebufferTexture2D(self, target, attachment, textarget, texture,
+                               level):
+        self._attach(attachment, texture, 'texture')
+
+    def glCheckFramebufferStatus(self, target):
+        if target != GL_FRAMEBUFFER:
+            self.set_error(GL_INVALID_ENUM)
+            return 0
+        if not self.framebuffer:
+            return GL_FRAMEBUFFER_COMPLETE
+        attachments = self.objects[self.framebuffer]['attachments']
+        if not attachments:
+            return GL_FRAMEBUFFER_INCOMPLETE_MISSING_ATTACHMENT
+        shapes = set()
+        for handle in attachments.values():
+            ob = self.objects.get(handle, None)
+            if ob is None or ob['shape'] is None:
+                return GL_FRAMEBUFFER_INCOMPLETE_ATTACHMENT
+            shapes.add(tuple(ob['shape']))
+        if len(shapes) > 1:
+            return GL_FRAMEBUFFER_INCOMPLETE_DIMENSIONS
+        return GL_FRAMEBUFFER_COMPLETE
+
+    def glGetFramebufferAttachmentParameter(self, target, attachment, pname):
+        attachments = {}
+        if self.framebuffer:
+            attachments = self.objects[self.framebuffer]['attachments']
+        handle = attachments.get(attachment, 0)
+        if pname == GL_FRAMEBUFFER_ATTACHMENT_OBJECT_NAME:
+            return handle
+        elif pname == GL_FRAMEBUFFER_ATTACHMENT_OBJECT_TYPE:
+            if not handle:
+                return GL_NONE
+            elif self.objects[handle]['kind'] == 'texture':
+                return GL_TEXTURE
+            return GL_RENDERBUFFER
+        return 0
+
+    # --- shaders
+
+    def glShaderSource(self, shader, source):
+        ob = self._get(shader, 'shader')
+        if ob is not None:
+            if isinstance(source, (tuple, list)):
+                source = '\n'.join(source)
+            ob['source'] = source
+
+    def glShaderSource_compat(self, handle, code):
+        self.glShaderSource(handle, code)
+        return set()
+
+    def glCompileShader(self, shader):
+        ob = self._get(shader, 'shader')
+        if ob is not None:
+            ob['compiled'] = bool(ob['source'].strip())
+            ob['log'] = '' if ob['compiled'] else 'ERROR: empty source'
+
+    def glGetShaderParameter(self, shader, pname):
+        ob = self._get(shader, 'shader')
+        if ob is None:
+            return 0
+        return {GL_SHADER_TYPE: ob['type'],
+                GL_COMPILE_STATUS: int(ob['compiled']),
+                GL_DELETE_STATUS: 0,
+                GL_INFO_LOG_LENGTH: len(ob['log']),
+                GL_SHADER_SOURCE_LENGTH: len(ob['source'])}.get(pname, 0)
+
+    def glGetShaderInfoLog(self, shader):
+        ob = self._get(shader, 'shader')
+        return '' if ob is None else ob['log']
+
+    def glGetShaderSource(self, shader):
+        ob = self._get(shader, 'shader')
+        return '' if ob is None else ob['source']
+
+    def glGetShaderPrecisionFormat(self, shadertype, precisiontype):
+        return 127, 23
+
+    # --- programs
+
+    def glAttachShader(self, program, shader):
+        ob = self._get(program, 'program')
+        if ob is not None and self._get(shader, 'shader') is not None:
+            if shader in ob['shaders']:
+                self.set_error(GL_INVALID_OPERATION)
+            else:
+                ob['shaders'].append(shader)
+
+    def glDetachShader(self, program, shader):
+        ob = self._get(program, 'program')
+        if ob is not None:
+            if shader in ob['shaders']:
+                ob['shaders'].remove(shader)
+            else:
+                self.set_error(GL_INVALID_OPERATION)
+
+    def glGetAttachedShaders(self, program):
+        ob = self._get(program, 'program')
+        return () if ob is None else tuple(ob['shaders'])
+
+    def glBindAttribLocation(self, program, index, name):
+        ob = self._get(program, 'program')
+        if ob is not None:
+            ob['bound_locations'][name] = index
+
+    def glLinkProgram(self, program):
+        ob = self._get(program, 'program')
+        if ob is None:
+            return
+        # Check shaders
+        shaders = [self.objects.get(h, None) for h in ob['shaders']]
+        codes = {GL_VERTEX_SHADER: [], GL_FRAGMENT_SHADER: []}
+        for shader in shaders:
+            if shader is None or not shader['compiled']:
+                return self._link_failed(ob, 'shader is not compiled')
+            codes[shader['type']].append(shader['source'])
+        for type, name in ((GL_VERTEX_SHADER, 'vertex'),
+                           (GL_FRAGMENT_SHADER, 'fragment')):
+            mains = sum([len(_re_main.findall(c)) for c in codes[type]])
+            if mains != 1:
+                return self._link_failed(ob, '%s stage needs one main()'
+                                         % name)
+        # Determine active variables
+        uniforms, attributes = _parse_variables(codes[GL_VERTEX_SHADER] +
+                                                codes[GL_FRAGMENT_SHADER])
+        ob['uniforms'], ob['attributes'] = uniforms, attributes
+        # Assign uniform locations (array elements get consecutive ones)
+        ob['locations'], ob['values'] = {}, {}
+        loc = 0
+        for name, size, gtype in uniforms:
+            ob['locations'][name] = loc
+            for i in range(size):
+                ob['locations']['%s[%d]' % (name, i)] = loc + i
+            loc += size
+        # Assign attribute locations, taking bound locations into account
+        ob['attribute_locations'] = {}
+        used = set(ob['bound_locations'].values())
+        loc = 0
+        for name, size, gtype in attributes:
+            if name in ob['bound_locations']:
+                ob['attribute_locations'][name] = ob['bound_locations'][name]
+                continue
+            while loc in used:
+                loc += 1
+            ob['attribute_locations'][name] = loc
+            used.add(loc)
+        ob['linked'], ob['log'] = True, ''
+
+    def _link_failed(self, ob, log):
+        ob['linked'], ob['log'] = False, 'ERROR: ' + log
+        ob['uniforms'], ob['attributes'] = [], []
+
+    def glValidateProgram(self, program):
+        self._get(program, 'program')
+
+    def glGetProgramParameter(self, program, pname):
+        ob = self._get(program, 'program')
+        if ob is None:
+            return 0
+        if pname in (GL_LINK_STATUS, GL_VALIDATE_STATUS):
+            return int(ob['linked'])
+        elif pname == GL_ACTIVE_UNIFORMS:
+            return len(ob['uniforms'])
+        elif pname == GL_ACTIVE_ATTRIBUTES:
+            return len(ob['attributes'])
+        elif pname == GL_ATTACHED_SHADERS:
+            return len(ob['shaders'])
+        elif pname == GL_INFO_LOG_LENGTH:
+            return len(ob['log'])
+        elif pname == GL_ACTIVE_UNIFORM_MAX_LENGTH:
+            return max([len(u[0]) + 4 for u in ob['uniforms']] or [0])
+        elif pname == GL_ACTIVE_ATTRIBUTE_MAX_LENGTH:
+            return max([len(a[0]) + 4 for a in ob['attributes']] or [0])
+        elif pname == GL_DELETE_STATUS:
+            return 0
+        self.set_error(GL_INVALID_ENUM)
+        return 0
+
+    def glGetProgramInfoLog(self, program):
+        ob = self._get(program, 'program')
+        return '' if ob is None else ob['log']
+
+    def _get_active(self, program, index, key):
+        ob = self._get(program, 'program')
+        if ob is None:
+            return '', 0, 0
+        if not 0 <= index < len(ob[key]):
+            self.set_error(GL_INVALID_VALUE)
+            return '', 0, 0
+        name, size, gtype = ob[key][index]
+        if size > 1:
+            name += '[0]'
+        return name, size, gtype
+
+    def glGetActiveUniform(self, program, index):
+        return self._get_active(program, index, 'uniforms')
+
+    def glGetActiveAttrib(self, program, index):
+        return self._get_active(program, index, 'attributes')
+
+    def glGetUniformLocation(self, program, name):
+        ob = self._get(program, 'program')
+        if ob is None or not ob['linked']:
+            return -1
+        return ob['locations'].get(name, -1)
+
+    def glGetAttribLocation(self, program, name):
+        ob = self._get(program, 'program')
+        if ob is None or not ob['linked']:
+            return -1
+        return ob['attribute_locations'].get(name, -1)
+
+    def glUseProgram(self, program):
+        if program:
+            ob = self._get(program, 'program')
+            if ob is None:
+                return
+            elif not ob['linked']:
+                self.set_error(GL_INVALID_OPERATION)
+                return
+        self.program = program
+
+    def set_uniform(self, location, value):
+        """ Store a uniform value for the current program. """
+        ob = self.current_program()
+        if ob is not None and location != -1:
+            if location not in ob['locations'].values():
+                self.set_error(GL_INVALID_OPERATION)
+            else:
+                ob['values'][location] = value
+
+    def glGetUniform(self, program, location):
+        ob = self._get(program, 'program')
+        if ob is None or location not in ob['values']:
+            self.set_error(GL_INVALID_OPERATION)
+            return 0.0
+        value = ob['values'][location]
+        if len(value) == 1:
+            return value[0]
+        return tuple(value)
+
+    # --- vertex attributes
+
+    def _attrib(self, index):
+        if not 0 <= index < self.parameters[GL_MAX_VERTEX_ATTRIBS]:
+            self.set_error(GL_INVALID_VALUE)
+            return None
+        if index not in self.vertex_attribs:
+            self.vertex_attribs[index] = dict(
+                enabled=False, size=4, type=GL_FLOAT, normalized=False,
+                stride=0, offset=0, buffer=0, value=(0.0, 0.0, 0.0, 1.0))
+        return self.vertex_attribs[index]
+
+    def glEnableVertexAttribArray(self, index):
+        attrib = self._attrib(index)
+        if attrib is not None:
+            attrib['enabled'] = True
+
+    def glDisableVertexAttribArray(self, index):
+        attrib = self._attrib(index)
+        if attrib is not None:
+            attrib['enabled'] = False
+
+    def glVertexAttribPointer(self, indx, size, type, normalized, stride,
+                              offset):
+        attrib = self._attrib(indx)
+        if attrib is not None:
+            attrib.update(size=size, type=type, normalized=normalized,
+                          stride=stride, offset=offset or 0,
+                          buffer=self.array_buffer)
+
+    def set_attrib_value(self, index, *values):
+        """ Set a generic vertex attribute value. """
+        attrib = self._attrib(index)
+        if attrib is not None:
+            attrib['value'] = tuple(values) + (0.0, 0.0, 0.0, 1.0)[
+                len(values):]
+
+    def glGetVertexAttrib(self, index, pname):
+        attrib = self._attrib(index)
+        if attrib is None:
+            return 0
+        return {GL_VERTEX_ATTRIB_ARRAY_ENABLED: int(attrib['enabled']),
+                GL_VERTEX_ATTRIB_ARRAY_SIZE: attrib['size'],
+                GL_VERTEX_ATTRIB_ARRAY_STRIDE: attrib['stride'],
+                GL_VERTEX_ATTRIB_ARRAY_TYPE: attrib['type'],
+                GL_VERTEX_ATTRIB_ARRAY_NORMALIZED: int(attrib['normalized']),
+                GL_VERTEX_ATTRIB_ARRAY_BUFFER_BINDING: attrib['buffer'],
+                GL_CURRENT_VERTEX_ATTRIB: attrib['value']}.get(pname, 0)
+
+    def glGetVertexAttribOffset(self, index, pname):
+        attrib = self._attrib(index)
+        return 0 if attrib is None else attrib['offset']
+
+    # --- drawing
+
+    def glDrawArrays(self, mode, first, count):
+        if first < 0 or count < 0:
+            self.set_error(GL_INVALID_VALUE)
+        else:
+            self.current_program()
+
+    def glDrawElements(self, mode, count, type, offset):
+        if count < 0:
+            self.set_error(GL_INVALID_VALUE)
+        elif not self.element_array_buffer:
+            self.set_error(GL_INVALID_OPERATION)
+        else:
+            self.current_program()
+
+    def glVertexAttribDivisor(self, index, divisor):
+        attrib = self._attrib(index)
+        if attrib is not None:
+            attrib['divisor'] = divisor
+
+    def glDrawArraysInstanced(self, mode, first, count, primcount):
+        if primcount < 0:
+            self.set_error(GL_INVALID_VALUE)
+        else:
+            self.glDrawArrays(mode, first, count)
+
+    def glDrawElementsInstanced(self, mode, count, type, offset, primcount):
+        if primcount < 0:
+            self.set_error(GL_INVALID_VALUE)
+        else:
+            self.glDrawElements(mode, count, type, offset)
+
+    def glReadPixels(self, x, y, width, height, format, type):
+        channels = {GL_ALPHA: 1, GL_RGB: 3, GL_RGBA: 4}[format]
+        return b'\x00' * int(width * height * channels)
+
+    # --- state
+
+    def glEnable(self, cap):
+        self.enabled.add(cap)
+
+    def glDisable(self, cap):
+        self.enabled.discard(cap)
+
+    def glIsEnabled(self, cap):
+        return cap in self.enabled
+
+    def glPixelStorei(self, pname, param):
+        self.parameters[pname] = param
+
+    def glHint(self, target, mode):
+        self.parameters[target] = mode
+
+    def _set_face_parameters(self, face, front, back, values):
+        pnames = {GL_FRONT: (front, ), GL_BACK: (back, ),
+                  GL_FRONT_AND_BACK: (front, back)}.get(face, None)
+        if pnames is None:
+            self.set_error(GL_INVALID_ENUM)
+            return
+        for i, value in enumerate(values):
+            for pname in pnames:
+                self.parameters[pname[i]] = value
+
+    def glStencilFuncSeparate(self, face, func, ref, mask):
+        self._set_face_parameters(
+            face, (GL_STENCIL_FUNC, GL_STENCIL_REF, GL_STENCIL_VALUE_MASK),
+            (GL_STENCIL_BACK_FUNC, GL_STENCIL_BACK_REF,
+             GL_STENCIL_BACK_VALUE_MASK), (func, ref, mask))
+
+    def glStencilMaskSeparate(self, face, mask):
+        self._set_face_parameters(face, (GL_STENCIL_WRITEMASK, ),
+                                  (GL_STENCIL_BACK_WRITEMASK, ), (mask, ))
+
+    def glStencilOpSeparate(self, face, fail, zfail, zpass):
+        self._set_face_parameters(
+            face, (GL_STENCIL_FAIL, GL_STENCIL_PASS_DEPTH_FAIL,
+                   GL_STENCIL_PASS_DEPTH_PASS),
+            (GL_STENCIL_BACK_FAIL, GL_STENCIL_BACK_PASS_DEPTH_FAIL,
+             GL_STENCIL_BACK_PASS_DEPTH_PASS), (fail, zfail, zpass))
+
+    def glGetParameter(self, pname):
+        bindings = {
+            GL_ARRAY_BUFFER_BINDING: self.array_buffer,
+            GL_ELEMENT_ARRAY_BUFFER_BINDING: self.element_array_buffer,
+            GL_FRAMEBUFFER_BINDING: self.framebuffer,
+            GL_RENDERBUFFER_BINDING: self.renderbuffer,
+            GL_CURRENT_PROGRAM: self.program,
+            GL_ACTIVE_TEXTURE: self.active_texture,
+            GL_TEXTURE_BINDING_2D: self.textures.get(
+                (self.active_texture, GL_TEXTURE_2D), 0),
+            GL_TEXTURE_BINDING_CUBE_MAP: self.textures.get(
+                (self.active_texture, GL_TEXTURE_CUBE_MAP), 0),
+        }
+        if pname in bindings:
+            return bindings[pname]
+        elif pname in self.parameters:
+            return self.parameters[pname]
+        elif pname in (GL_BLEND, GL_CULL_FACE, GL_DEPTH_TEST, GL_DITHER,
+                       GL_POLYGON_OFFSET_FILL, GL_SAMPLE_ALPHA_TO_COVERAGE,
+                       GL_SAMPLE_COVERAGE, GL_SCISSOR_TEST, GL_STENCIL_TEST):
+            return int(pname in self.enabled)
+        self.set_error(GL_INVALID_ENUM)
+        return 0
+
+    def glGetError(self):
+        if self.errors:
+            return self.errors.pop(0)
+        return GL_NO_ERROR
+
+
+class MockGLProxy(BaseGLProxy):
+    """ Proxy that records all GL calls and applies them to a MockGLState.
+    """
+
+    def __init__(self):
+        self.commands = []
+        self.state = MockGLState()
+
+    def reset(self):
+        """ Clear the command log and reset the GL state. """
+        del self.commands[:]
+        self.state = MockGLState()
+
+    def __call__(self, funcname, returns, *args):
+        self.commands.append((funcname, tuple(_compact(a) for a in args)))
+        state = self.state
+        func = getattr(state, funcname, None)
+        if func is not None:
+            return func(*args)
+        elif funcname.startswith('glUniform'):
+            if funcname.startswith('glUniformMatrix'):
+                state.set_uniform(args[0], tuple(np.ravel(args[3])))
+            elif funcname.endswith('v'):
+                state.set_uniform(args[0], tuple(np.ravel(args[2])))
+            else:
+                state.set_uniform(args[0], args[1:])
+        elif funcname.startswith('glVertexAttrib'):
+            state.set_attrib_value(*args)
+        else:
+            state.set_parameter(funcname, *args)
+
+
+def reset():
+    """ Clear the command log and reset the GL state of the mock backend.
+    Like with a new context, the GL objects that gloo shares within the
+    current context (see ``gl.forget_context()``) are forgotten.
+    """
+    from . import forget_context, get_current_context
+    _proxy.reset()
+    forget_context(get_current_context())
+
+
+def _instancing_functions():
+    """ Get the functions for instanced drawing (see gl.get_instancing),
+    or None if ``mock.instancing`` is False.
+    """
+    if not instancing:
+        return None
+    return tuple([_recorder(name) for name in
+                  ('glVertexAttribDivisor', 'glDrawArraysInstanced',
+                   'glDrawElementsInstanced')])
+
+
+def _recorder(funcname):
+    def func(*args):
+        return _proxy(funcname, None, *args)
+    func.__name__ = funcname
+    return func
+
+
+def count(funcname=None):
+    """ Get the number of recorded GL calls, or the number of calls to
+    a specific GL function if funcname is given.
+    """
+    if funcname is None:
+        return len(_proxy.commands)
+    return len([c for c in _proxy.commands if c[0] == funcname])
+
+
+# Whether the mock provides instanced drawing (see gl.get_instancing)
+instancing = True
+
+# Instantiate proxy and inject functions
+_proxy = MockGLProxy()
+commands = _proxy.commands
+_copy_gl_functions(_proxy, globals())
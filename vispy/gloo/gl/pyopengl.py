@@ -11,7 +11,7 @@ import OpenGL.GL.framebufferobjects as _FBO
 
 from ...util import logger
 
-from . import _copy_gl_functions
+from . import _copy_gl_functions, _supports_instancing
 from ._constants import *  # noqa
 
 
@@ -123,6 +123,21 @@ def _get_function_from_pyopengl(funcname):
     return func
 
 
+def _instancing_functions():
+    """ Get the functions for instanced drawing (see gl.get_instancing),
+    from GL 3.3 or the ARB_instanced_arrays extension.
+    """
+    if not _supports_instancing(glGetParameter):
+        return None
+    for suffix in ('', 'ARB'):
+        funcs = [getattr(_GL, name + suffix, None) for name in
+                 ('glVertexAttribDivisor', 'glDrawArraysInstanced',
+                  'glDrawElementsInstanced')]
+        if all(funcs):
+            return tuple(funcs)
+    return None
+
+
 def _inject():
     """ Copy functions from OpenGL.GL into _pyopengl namespace.
     """
@@ -0,0 +1,101 @@
+""" Tests for the error check modes.
+"""
+
+import numpy as np
+from nose.tools import assert_equal, assert_raises, assert_true
+
+from vispy import gloo
+from vispy.gloo import gl
+from vispy.gloo.gl import mock
+
+
+VERT = """
+attribute vec2 a_position;
+void main() {
+    gl_Position = vec4(a_position, 0.0, 1.0);
+}
+"""
+
+FRAG = """
+void main() {
+    gl_FragColor = vec4(1.0, 1.0, 1.0, 1.0);
+}
+"""
+
+
+def setup_module():
+    gl.use_gl('mock')
+
+
+def teardown_module():
+    gl.set_error_check('draw')
+    gl.use_gl()  # Reset to default
+
+
+def test_error_check_modes():
+    """ Errors are checked according to the error check mode """
+    assert_equal(gl.get_error_check(), 'draw')
+    assert_raises(ValueError, gl.set_error_check, 'never')
+
+    # Per call
+    gl.set_error_check('call')
+    mock.reset()
+    assert_raises(RuntimeError, gl.glDrawArrays, gl.GL_TRIANGLES, 0, 3)
+
+    # Per frame, with the last calls in the message
+    gl.set_error_check('frame')
+    mock.reset()
+    gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+    buf = gl.glCreateBuffer()
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf)
+    gl.glBufferData(gl.GL_ARRAY_BUFFER, np.zeros((10, 2), np.float32),
+                    gl.GL_STATIC_DRAW)
+    gl.glDrawArrays(gl.GL_TRIANGLES, 0, 3)
+    # Arrays are not kept, only their shape and dtype
+    for funcname, args in gl._error_proxy.recent_calls:
+        assert_true(not any(isinstance(arg, np.ndarray) for arg in args))
+    try:
+        gl.end_frame()
+    except RuntimeError as err:
+        msg = str(err)
+    else:
+        raise AssertionError('end_frame() should raise an error')
+    assert_true('GL_INVALID_OPERATION' in msg)
+    assert_true('glDrawArrays(GL_TRIANGLES, 0, 3)' in msg)
+    assert_true('array:10x2:float32' in msg)
+    gl.end_frame()  # Errors have been consumed
+
+    # Off
+    gl.set_error_check('off')
+    mock.reset()
+    gl.glDrawArrays(gl.GL_TRIANGLES, 0, 3)
+    gl.end_frame()
+    assert_raises(RuntimeError, gl.check_error)  # explicit check
+
+    gl.set_error_check('draw')
+    assert_equal(gl.get_error_check(), 'draw')
+
+
+def test_error_check_draw():
+    """ Program.draw only checks errors in 'draw' mode """
+    program = gloo.Program(VERT, FRAG)
+    program['a_position'] = np.zeros((3, 2), np.float32)
+    try:
+        for mode in ('draw', 'frame', 'off'):
+            gl.set_error_check(mode)
+            mock.reset()
+            program._need_create = True
+            program.draw('triangles')
+            assert_equal(mock.count('glGetError'), int(mode == 'draw'))
+    finally:
+        gl.set_error_check('draw')
+
+
+def test_arg_repr():
+    """ Arguments are represented compactly """
+    assert_equal(gl._arg_repr(3), '3')
+    assert_equal(gl._arg_repr(np.zeros((10, 2), np.float32)),
+                 'array:10x2:float32')
+    assert_true(len(gl._arg_repr('void main() {}\n' * 1000)) <= 40)
+    assert_true(len(gl._arg_repr(b'\x00' * 10000)) <= 40)
+    assert_equal(gl._arg_repr(list(range(100))), '<list of length 100>')
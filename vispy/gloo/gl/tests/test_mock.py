@@ -0,0 +1,157 @@
+""" Tests for the recording mock GL backend.
+"""
+
+import numpy as np
+from nose.tools import assert_equal, assert_true, assert_raises
+
+from vispy import gloo
+from vispy.gloo import gl
+from vispy.gloo.gl import mock
+
+
+VERT = """
+uniform mat4 u_transform;
+uniform float u_scale[2];
+uniform float u_unused;
+attribute vec2 a_position;
+void main() {
+    gl_Position = u_transform * vec4(a_position * u_scale[0], 0.0, 1.0);
+}
+"""
+
+FRAG = """
+uniform vec4 u_color;
+void main() {
+    gl_FragColor = u_color;
+}
+"""
+
+
+def setup_module():
+    gl.use_gl('mock')
+
+
+def teardown_module():
+    gl.use_gl()  # Reset to default
+
+
+def setup():
+    mock.reset()
+
+
+def _link_program():
+    prog = gl.glCreateProgram()
+    for stype, code in ((gl.GL_VERTEX_SHADER, VERT),
+                        (gl.GL_FRAGMENT_SHADER, FRAG)):
+        shader = gl.glCreateShader(stype)
+        gl.glShaderSource(shader, code)
+        gl.glCompileShader(shader)
+        gl.glAttachShader(prog, shader)
+    gl.glLinkProgram(prog)
+    return prog
+
+
+def test_recording():
+    """ Mock backend records a compact command log """
+    mock.reset()
+    buf = gl.glCreateBuffer()
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf)
+    data = np.zeros((10, 2), np.float32)
+    gl.glBufferData(gl.GL_ARRAY_BUFFER, data, gl.GL_DYNAMIC_DRAW)
+    gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 8, data[1:])
+
+    assert_equal(mock.count(), 4)
+    assert_equal(mock.count('glBufferSubData'), 1)
+    funcname, args = mock.commands[2]
+    assert_equal(funcname, 'glBufferData')
+    assert_equal(args[1], mock.ArrayInfo((10, 2), 'float32', 80))
+    assert_equal(gl.glGetBufferParameter(gl.GL_ARRAY_BUFFER,
+                                         gl.GL_BUFFER_SIZE), 80)
+    assert_equal(gl.glGetError(), gl.GL_NO_ERROR)
+
+    # Writing outside the buffer is an error
+    gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 40, data)
+    assert_equal(gl.glGetError(), gl.GL_INVALID_VALUE)
+    assert_equal(gl.glGetError(), gl.GL_NO_ERROR)
+
+    mock.reset()
+    assert_equal(mock.count(), 0)
+    assert_true(not gl.glIsBuffer(buf))
+
+
+def test_handles_and_state():
+    """ Mock backend hands out handles and tracks bound state """
+    mock.reset()
+    tex1, tex2 = gl.glCreateTexture(), gl.glCreateTexture()
+    assert_true(tex1 != tex2)
+    gl.glBindTexture(gl.GL_TEXTURE_2D, tex2)
+    assert_equal(gl.glGetParameter(gl.GL_TEXTURE_BINDING_2D), tex2)
+    gl.glDeleteTexture(tex2)
+    assert_true(not gl.glIsTexture(tex2))
+    assert_true(gl.glIsTexture(tex1))
+
+    gl.glEnable(gl.GL_BLEND)
+    assert_true(gl.glIsEnabled(gl.GL_BLEND))
+    gl.glDisable(gl.GL_BLEND)
+    assert_true(not gl.glIsEnabled(gl.GL_BLEND))
+
+    gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+    assert_equal(gl.glGetParameter(gl.GL_BLEND_SRC_ALPHA), gl.GL_SRC_ALPHA)
+    gl.glLineWidth(3.0)
+    assert_equal(gl.glGetParameter(gl.GL_LINE_WIDTH), 3.0)
+
+
+def test_program_queries():
+    """ Mock backend answers program queries from the shader source """
+    mock.reset()
+    prog = _link_program()
+    assert_true(gl.glGetProgramParameter(prog, gl.GL_LINK_STATUS))
+
+    # u_unused is declared but not used, so it is not active
+    n = gl.glGetProgramParameter(prog, gl.GL_ACTIVE_UNIFORMS)
+    uniforms = [gl.glGetActiveUniform(prog, i) for i in range(n)]
+    names = sorted(u[0] for u in uniforms)
+    assert_equal(names, ['u_color', 'u_scale[0]', 'u_transform'])
+    assert_true(('u_scale[0]', 2, gl.GL_FLOAT) in uniforms)
+    assert_true(gl.glGetUniformLocation(prog, 'u_scale[1]') >= 0)
+    assert_equal(gl.glGetUniformLocation(prog, 'u_unused'), -1)
+
+    n = gl.glGetProgramParameter(prog, gl.GL_ACTIVE_ATTRIBUTES)
+    assert_equal(n, 1)
+    assert_equal(gl.glGetActiveAttrib(prog, 0),
+                 ('a_position', 1, gl.GL_FLOAT_VEC2))
+
+    # Uniform values are stored
+    gl.glUseProgram(prog)
+    loc = gl.glGetUniformLocation(prog, 'u_color')
+    gl.glUniform4f(loc, 1.0, 0.5, 0.25, 1.0)
+    assert_equal(tuple(gl.glGetUniform(prog, loc)), (1.0, 0.5, 0.25, 1.0))
+    assert_equal(gl.glGetError(), gl.GL_NO_ERROR)
+
+
+def test_errors():
+    """ Mock backend generates errors for common mistakes """
+    mock.reset()
+    gl.glDrawArrays(gl.GL_TRIANGLES, 0, 3)
+    assert_equal(gl.glGetError(), gl.GL_INVALID_OPERATION)
+    assert_equal(gl.glGetError(), gl.GL_NO_ERROR)
+
+    buf = gl.glCreateBuffer()
+    gl.glDeleteBuffer(buf)
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf)
+    assert_raises(RuntimeError, gl.check_error)
+    gl.check_error()  # errors have been consumed
+
+
+def test_gloo_program_draw():
+    """ Mock backend can run a gloo Program """
+    mock.reset()
+    program = gloo.Program(VERT, FRAG)
+    program['a_position'] = np.zeros((6, 2), np.float32)
+    program['u_transform'] = np.eye(4, dtype=np.float32)
+    program['u_color'] = (1, 0, 0, 1)
+    program.draw('triangles')
+    assert_equal(mock.count('glLinkProgram'), 1)
+    assert_equal(mock.count('glDrawArrays'), 1)
+    assert_equal(mock.count('glUniformMatrix4fv'), 1)
+    gl.check_error()
@@ -81,6 +81,13 @@ def test_webgl():
     _test_contant_names(webgl)
 
 
+def test_mock():
+    """ Mock backend should have all ES 2.0 names. No more, no less. """
+    from vispy.gloo.gl import mock
+    _test_function_names(mock)
+    _test_contant_names(mock)
+
+
 def _main():
     """ For testing this test suite :)
     """
@@ -88,6 +95,7 @@ def _main():
     test_proxy()
     test_destop()
     test_angle()
+    test_mock()
     test_pyopengl()
     test_webgl()
 
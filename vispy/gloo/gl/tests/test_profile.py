@@ -0,0 +1,73 @@
+""" Tests for the profiling proxy.
+"""
+
+import numpy as np
+from nose.tools import assert_equal, assert_true
+
+from vispy.gloo import gl
+from vispy.gloo.gl import mock
+
+
+def setup_module():
+    gl.use_gl('mock profile')
+
+
+def teardown_module():
+    gl.use_gl()  # Reset to default
+    gl.profile_proxy.reset()
+
+
+def test_stats():
+    """ Profile proxy collects statistics per frame """
+    mock.reset()
+    gl.profile_proxy.reset()
+    assert_equal(gl.stats()['frames'], 0)
+
+    data = np.zeros((100, 3), np.float32)
+    for i in range(3):
+        buf = gl.glCreateBuffer()
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, data, gl.GL_STATIC_DRAW)
+        gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 0, data[:i])
+        gl.glDrawArrays(gl.GL_TRIANGLES, 0, 99)
+        gl.glDrawArrays(gl.GL_LINE_STRIP, 0, 10)
+        gl.end_frame()
+
+    # Last frame
+    stats = gl.stats(1)
+    assert_equal(stats['frames'], 1)
+    assert_equal(stats['calls']['glDrawArrays'], 2)
+    assert_equal(stats['total_calls'], 6)
+    assert_equal(stats['draw_calls'], 2)
+    assert_equal(stats['primitives'], 33 + 9)
+    assert_equal(stats['bytes'], {'glBufferData': 1200,
+                                  'glBufferSubData': 24})
+    assert_equal(stats['total_bytes'], 1224)
+    assert_true(stats['total_time'] >= 0)
+    assert_equal(set(stats['time']), set(stats['calls']))
+
+    # All frames in history
+    stats = gl.stats()
+    assert_equal(stats['frames'], 3)
+    assert_equal(stats['draw_calls'], 6)
+    assert_equal(stats['bytes']['glBufferSubData'], 12 * (0 + 1 + 2))
+    assert_equal(gl.stats(10)['frames'], 3)
+    assert_equal(gl.stats(0)['frames'], 0)
+
+    # The history is bounded
+    for i in range(gl.profile_proxy.history.maxlen + 5):
+        gl.end_frame()
+    assert_equal(gl.stats()['frames'], gl.profile_proxy.history.maxlen)
+    assert_equal(gl.stats()['total_calls'], 0)
+
+
+def test_no_profiling():
+    """ No statistics are collected when profiling is off """
+    gl.use_gl('mock')
+    try:
+        gl.profile_proxy.reset()
+        gl.glCreateBuffer()
+        gl.end_frame()
+        assert_equal(gl.stats()['frames'], 0)
+    finally:
+        gl.use_gl('mock profile')
@@ -0,0 +1,98 @@
+""" Tests for the state shadowing proxy.
+"""
+
+from nose.tools import assert_equal, assert_true
+
+from vispy.gloo import gl
+from vispy.gloo.gl import mock
+
+
+def setup_module():
+    gl.use_gl('mock shadow')
+
+
+def teardown_module():
+    gl.use_gl()  # Reset to default
+
+
+def setup():
+    mock.reset()
+    gl.state_proxy.invalidate()
+    gl.state_proxy.skipped.clear()
+
+
+def test_state_proxy_bindings():
+    """ State proxy skips redundant binds """
+    setup()
+    assert_true(gl.glUseProgram is not mock.glUseProgram)
+    buf1, buf2 = gl.glCreateBuffer(), gl.glCreateBuffer()
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf1)
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf1)
+    gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, buf1)
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf2)
+    assert_equal(mock.count('glBindBuffer'), 3)
+    assert_equal(gl.state_proxy.skipped, {'glBindBuffer': 1})
+
+    # Textures are tracked per unit
+    tex = gl.glCreateTexture()
+    gl.glActiveTexture(gl.GL_TEXTURE0)
+    gl.glBindTexture(gl.GL_TEXTURE_2D, tex)
+    gl.glActiveTexture(gl.GL_TEXTURE1)
+    gl.glBindTexture(gl.GL_TEXTURE_2D, tex)
+    gl.glActiveTexture(gl.GL_TEXTURE1)
+    gl.glBindTexture(gl.GL_TEXTURE_2D, tex)
+    assert_equal(mock.count('glBindTexture'), 2)
+    assert_equal(mock.count('glActiveTexture'), 2)
+
+    # Deleting an object forgets its bindings
+    gl.glDeleteBuffer(buf2)
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf2)
+    assert_equal(mock.count('glBindBuffer'), 4)
+
+    # Invalidating forgets everything
+    gl.state_proxy.invalidate()
+    gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, buf1)
+    assert_equal(mock.count('glBindBuffer'), 5)
+    gl.end_frame()
+    gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, buf1)
+    assert_equal(mock.count('glBindBuffer'), 6)
+
+
+def test_state_proxy_parameters():
+    """ State proxy skips redundant enables and parameter changes """
+    setup()
+    for i in range(3):
+        gl.glEnable(gl.GL_BLEND)
+        gl.glDisable(gl.GL_DEPTH_TEST)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE)
+        gl.glDepthFunc(gl.GL_LESS)
+    assert_equal(mock.count(), 4)
+    assert_equal(gl.state_proxy.skipped_count, 8)
+    assert_true(gl.glIsEnabled(gl.GL_BLEND))
+
+    # Functions in the same group are compared with each other
+    gl.glBlendFuncSeparate(gl.GL_SRC_ALPHA, gl.GL_ONE,
+                           gl.GL_SRC_ALPHA, gl.GL_ONE)
+    assert_equal(mock.count('glBlendFuncSeparate'), 0)
+    gl.glBlendFuncSeparate(gl.GL_SRC_ALPHA, gl.GL_ONE, gl.GL_ONE, gl.GL_ONE)
+    gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE)
+    assert_equal(mock.count('glBlendFuncSeparate'), 1)
+    assert_equal(mock.count('glBlendFunc'), 2)
+
+
+def test_state_proxy_attributes():
+    """ State proxy skips redundant attribute pointers """
+    setup()
+    buf1, buf2 = gl.glCreateBuffer(), gl.glCreateBuffer()
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf1)
+    for i in range(2):
+        gl.glEnableVertexAttribArray(0)
+        gl.glVertexAttribPointer(0, 2, gl.GL_FLOAT, False, 8, 0)
+    assert_equal(mock.count('glEnableVertexAttribArray'), 1)
+    assert_equal(mock.count('glVertexAttribPointer'), 1)
+    # The pointer refers to the bound buffer
+    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buf2)
+    gl.glVertexAttribPointer(0, 2, gl.GL_FLOAT, False, 8, 0)
+    assert_equal(mock.count('glVertexAttribPointer'), 2)
+    assert_equal(gl.glGetVertexAttrib(
+        0, gl.GL_VERTEX_ATTRIB_ARRAY_BUFFER_BINDING), buf2)
@@ -41,6 +41,15 @@ def test_use_desktop():
             val2 = getattr(gl.webgl, name)
             assert_is(val1, val2)
     
+    # Use mock
+    gl.use_gl('mock')
+    #
+    for name in dir(gl.desktop):
+        if name.lower().startswith('gl'):
+            val1 = getattr(gl, name)
+            val2 = getattr(gl.mock, name)
+            assert_is(val1, val2)
+
     # Touch debug wrapper stuff
     gl.use_gl('desktop debug')
     
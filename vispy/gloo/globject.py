@@ -4,6 +4,311 @@
 # Distributed under the (new) BSD License. See LICENSE.txt for more info.
 # -----------------------------------------------------------------------------
 
+import weakref
+from time import time
+
+from . import gl
+from ..util import logger
+from ..util.ordereddict import OrderedDict
+
+
+class UploadScheduler(object):
+    """ Schedules the uploads of pending data within a per-frame budget
+    that is shared by all GL objects.
+
+    When a budget is set, data that does not fit in the budget of the
+    current frame stays pending, and the object is queued. The queued
+    objects are uploaded (in chunks) by ``run()``, which the Canvas
+    calls at the end of each frame, and when they are activated. Use
+    the ``resident`` property of buffers, textures and programs to know
+    whether all their data has been uploaded.
+
+    Parameters
+    ----------
+    nbytes : int | None
+        The max number of bytes to upload per frame. Default None (no
+        limit).
+    seconds : float | None
+        The max time to spend uploading per frame, counted from the
+        first upload in the frame. Default None (no limit).
+    """
+
+    def __init__(self, nbytes=None, seconds=None):
+        self.nbytes = nbytes
+        self.seconds = seconds
+        self._queue = OrderedDict()  # id -> (weakref to object, context)
+        self._frame = None
+        self._used = 0
+        self._start = 0.0
+
+    @property
+    def nbytes(self):
+        """ The max number of bytes to upload per frame, or None """
+        return self._nbytes
+
+    @nbytes.setter
+    def nbytes(self, nbytes):
+        if nbytes is not None:
+            nbytes = int(nbytes)
+            if nbytes <= 0:
+                raise ValueError("Upload budget must be positive")
+        self._nbytes = nbytes
+
+    @property
+    def seconds(self):
+        """ The max time to spend uploading per frame, or None """
+        return self._seconds
+
+    @seconds.setter
+    def seconds(self, seconds):
+        if seconds is not None:
+            seconds = float(seconds)
+            if seconds <= 0:
+                raise ValueError("Upload time budget must be positive")
+        self._seconds = seconds
+
+    @property
+    def pending_nbytes(self):
+        """ The number of bytes waiting to be uploaded for the queued
+        objects.
+        """
+        nbytes = 0
+        for ref, context in self._queue.values():
+            obj = ref()
+            if obj is not None:
+                nbytes += obj.pending_nbytes
+        return nbytes
+
+    def add(self, obj):
+        """ Queue a GL object, so that its pending data is uploaded by
+        ``run()`` even if it is not activated (e.g. to preload data).
+        The object is uploaded in the GL context that is current now.
+        """
+        if obj._id not in self._queue:
+            context = gl.get_current_context()
+            self._queue[obj._id] = weakref.ref(obj), context
+
+    def run(self):
+        """ Upload the pending data of the queued objects, as far as the
+        budget of the current frame allows. Only objects that were queued
+        in the current GL context (or without context) are uploaded.
+        """
+        current = gl.get_current_context()
+        for key, (ref, context) in list(self._queue.items()):
+            obj = ref()
+            if obj is None or not obj.pending_nbytes:
+                del self._queue[key]
+                continue
+            elif context is not None and context is not current:
+                continue
+            elif self._spent():
+                break
+            obj.activate()
+            obj.deactivate()
+            if not obj.pending_nbytes:
+                del self._queue[key]
+
+    def _spent(self):
+        """ Whether the budget of the current frame is spent """
+        if self._frame != gl.get_frame_count() or not self._used:
+            return False
+        if self._nbytes is not None and self._used >= self._nbytes:
+            return True
+        if self._seconds is not None and time() - self._start > self._seconds:
+            return True
+        return False
+
+    def _take(self, size, unit=1):
+        """ Get the number of bytes (a multiple of unit) of a write of
+        size bytes that fits in the budget, and spend these bytes. At
+        least one unit is uploaded per frame.
+        """
+        frame = gl.get_frame_count()
+        if frame != self._frame:
+            self._frame, self._used, self._start = frame, 0, time()
+        if self._spent():
+            return 0
+        if self._nbytes is not None:
+            allowed = max(unit, (self._nbytes - self._used) // unit * unit)
+            size = min(size, allowed)
+        self._used += size
+        return size
+
+
+upload_scheduler = UploadScheduler()
+
+
+class GPUMemory(object):
+    """ Keeps track of the buffers and textures in each GL context, and
+    of the GPU memory that they use.
+
+    When a budget is set and the buffers and textures in a context use
+    more memory, the least recently activated objects that have CPU
+    storage (``store=True``) are evicted from the GPU. An evicted object
+    is re-created and its data is uploaded again when it is activated.
+    Objects that were activated in the current frame are not evicted.
+
+    Parameters
+    ----------
+    budget : int | None
+        The max number of bytes of GPU memory per context. Default None
+        (no limit).
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        # context -> OrderedDict(id -> [weakref, nbytes, frame]), in the
+        # order in which the objects were last activated.
+        self._contexts = {}
+        self._totals = {}
+
+    @property
+    def budget(self):
+        """ The max number of bytes of GPU memory per context, or None """
+        return self._budget
+
+    @budget.setter
+    def budget(self, nbytes):
+        if nbytes is not None:
+            nbytes = int(nbytes)
+            if nbytes <= 0:
+                raise ValueError("Memory budget must be positive")
+        self._budget = nbytes
+
+    def nbytes(self, context=None):
+        """ Get the number of bytes used by the buffers and textures in
+        the given context (default the current context).
+        """
+        if context is None:
+            context = gl.get_current_context()
+        return self._totals.get(context, 0)
+
+    def count(self, context=None):
+        """ Get the number of buffers and textures in the given context
+        (default the current context).
+        """
+        if context is None:
+            context = gl.get_current_context()
+        return len(self._contexts.get(context, ()))
+
+    def evict(self, nbytes, context=None):
+        """ Evict the least recently activated objects that have CPU
+        storage, until at least nbytes are freed or no more objects can
+        be evicted. Returns the number of bytes freed.
+        """
+        if context is None:
+            context = gl.get_current_context()
+        frame = gl.get_frame_count()
+        freed = 0
+        for ref, size, last in list(self._contexts.get(context, {}).values()):
+            if freed >= nbytes or last >= frame:
+                break
+            obj = ref()
+            if obj is not None and size and obj._evict():
+                freed += size
+                gl.record_event('evict', (obj.__class__.__name__, size))
+        return freed
+
+    def _touch(self, obj):
+        """ Register the activation of an object in the current context,
+        and evict other objects if the budget is exceeded.
+        """
+        context = gl.get_current_context()
+        objects = self._contexts.setdefault(context, OrderedDict())
+        entry = objects.pop(obj._id, None)
+        if entry is None:
+            def callback(ref, key=obj._id):
+                self._discard(context, key)
+            entry = [weakref.ref(obj, callback), 0, 0]
+        nbytes = obj._gpu_nbytes
+        total = self._totals.get(context, 0) + nbytes - entry[1]
+        entry[1:] = nbytes, gl.get_frame_count()
+        objects[obj._id] = entry
+        self._totals[context] = total
+        if self._budget is not None and total > self._budget:
+            self.evict(total - self._budget, context)
+
+    def _remove(self, obj):
+        """ Unregister an object that is deleted """
+        for context in list(self._contexts):
+            self._discard(context, obj._id)
+
+    def _discard(self, context, key):
+        entry = self._contexts.get(context, {}).pop(key, None)
+        if entry is not None:
+            self._totals[context] -= entry[1]
+
+    def _forget_context(self, context):
+        self._contexts.pop(context, None)
+        self._totals.pop(context, None)
+
+
+gpu_memory = GPUMemory()
+gl._context_listeners.append(gpu_memory._forget_context)
+
+
+class DeletionQueue(object):
+    """ Deletes the GL objects that are garbage collected, at the end of
+    a frame in the GL context that created them.
+
+    An object can be collected at any moment, when its context is not
+    current (or does not exist anymore). Therefore ``GLObject.__del__``
+    only puts its handle in the queue of its context. The Canvas calls
+    ``flush()`` at the end of each frame, which deletes the queued
+    objects of the current context, grouped per type. When a context is
+    forgotten (see ``gl.forget_context()``), its queue is dropped, and
+    its objects are not deleted anymore, since they are gone with it.
+    """
+
+    def __init__(self):
+        self._queues = {}  # context -> list of (gl function name, handle)
+        self._objects = {}  # context -> WeakSet of objects created in it
+
+    def add(self, context, deletions):
+        """ Queue deletions, a list of (gl function name, handle), for
+        the given context.
+        """
+        if deletions:
+            self._queues.setdefault(context, []).extend(deletions)
+
+    def pending(self, context=None):
+        """ Get the number of queued deletions for the given context
+        (default the current context).
+        """
+        if context is None:
+            context = gl.get_current_context()
+        return len(self._queues.get(context, ()))
+
+    def flush(self):
+        """ Delete the queued objects of the current context. Returns the
+        number of deleted objects.
+        """
+        deletions = self._queues.pop(gl.get_current_context(), None)
+        if not deletions:
+            return 0
+        deletions.sort(key=lambda deletion: deletion[0])
+        for funcname, handle in deletions:
+            getattr(gl, funcname)(handle)
+        logger.debug("GPU: Deleted %d collected objects" % len(deletions))
+        gl.record_event('collected', len(deletions))
+        return len(deletions)
+
+    def _register(self, obj):
+        """ Register an object that is created in the current context """
+        objects = self._objects.get(obj._context)
+        if objects is None:
+            objects = self._objects[obj._context] = weakref.WeakSet()
+        objects.add(obj)
+
+    def _forget_context(self, context):
+        self._queues.pop(context, None)
+        for obj in self._objects.pop(context, ()):
+            obj._need_delete = False
+
+
+deletion_queue = DeletionQueue()
+gl._context_listeners.append(deletion_queue._forget_context)
+
 
 class GLObject(object):
     """ Generic GL object that may live both on CPU and GPU 
@@ -12,6 +317,10 @@ class GLObject(object):
     # Internal id counter to keep track of GPU objects
     _idcount = 0
 
+    # Max number of bytes that is uploaded in one GL call. Larger data
+    # (e.g. memory-mapped from disk) is streamed in chunks.
+    _upload_chunk_nbytes = 16 * 1024 * 1024
+
     def __init__(self):
         """ Initialize the object in the default state """
 
@@ -19,9 +328,16 @@ class GLObject(object):
         self._target = None
         self._need_create = True
         self._need_delete = False
+        self._context = None  # The GL context in which it was created
 
         GLObject._idcount += 1
         self._id = GLObject._idcount
+
+        # Max number of bytes to upload per frame, and the bytes uploaded
+        # in the last frame in which data was uploaded.
+        self._upload_budget = None
+        self._upload_frame = None
+        self._upload_used = 0
     
     def __del__(self):
         # You never know when this is goint to happen. The window might
@@ -30,10 +346,13 @@ class GLObject(object):
         # at the wrong moment might remove other gl objects, leading to
         # very strange and hard to debug behavior.
         # 
-        # So we don't do anything. If each GLObject was aware of the
-        # context in which it resides, we could do auto-cleanup though...
-        # todo: it's not very Pythonic to have to delete an object.
-        pass
+        # So we queue the handle, and it is deleted at the end of the
+        # next frame in the context that created the object.
+        try:
+            if self._need_delete:
+                deletion_queue.add(self._context, self._garbage())
+        except Exception:
+            pass  # E.g. at interpreter shutdown
 
     def delete(self):
         """ Delete the object from GPU memory """
@@ -43,6 +362,7 @@ class GLObject(object):
         self._handle = -1
         self._need_create = True
         self._need_delete = False
+        gpu_memory._remove(self)
 
     def activate(self):
         """ Activate the object on GPU """
@@ -54,6 +374,9 @@ class GLObject(object):
         if self._need_create:
             self._create()
             self._need_create = False
+            self._need_delete = True
+            self._context = gl.get_current_context()
+            deletion_queue._register(self)
         self._activate()
     
     def deactivate(self):
@@ -67,12 +390,90 @@ class GLObject(object):
 
         return self._handle
 
+    @property
+    def pending_nbytes(self):
+        """ Number of bytes waiting to be uploaded """
+
+        return 0
+
+    @property
+    def _gpu_nbytes(self):
+        """ Number of bytes used on the GPU (see GPUMemory) """
+
+        return 0
+
+    def _evict(self):
+        """ Delete the object from the GPU, such that it is re-created
+        from its CPU storage when activated. Returns False if the object
+        cannot be evicted.
+        """
+
+        return False
+
+    @property
+    def resident(self):
+        """ Whether the object exists on the GPU with all its data
+        uploaded. When uploads are limited by a budget (see
+        ``upload_budget`` and ``UploadScheduler``), data can be partially
+        resident for a few frames.
+        """
+
+        return not self._need_create and not self.pending_nbytes
+
     @property
     def target(self):
         """ OpenGL type of object. """
 
         return self._target
 
+    @property
+    def upload_budget(self):
+        """ The max number of bytes that is uploaded per frame, or None
+        for no limit. Pending data that exceeds the budget is uploaded
+        (in chunks) when the object is activated in the next frames. See
+        also ``UploadScheduler`` for a budget shared by all objects.
+        """
+
+        return self._upload_budget
+
+    @upload_budget.setter
+    def upload_budget(self, nbytes):
+        if nbytes is not None:
+            nbytes = int(nbytes)
+            if nbytes <= 0:
+                raise ValueError("Upload budget must be positive")
+        self._upload_budget = nbytes
+
+    def _take_upload(self, nbytes, unit=1):
+        """ Get the number of bytes (a multiple of unit) of a pending
+        write of nbytes to upload now, given the chunk size and the
+        budget of the current frame, and spend these bytes from the
+        budget (of this object and of the upload scheduler). Returns 0
+        if the budget is spent, in which case the object is queued in
+        the upload scheduler.
+        """
+
+        chunk = max(unit, self._upload_chunk_nbytes // unit * unit)
+        size = min(nbytes, chunk)
+        if self._upload_budget is not None:
+            frame = gl.get_frame_count()
+            if frame != self._upload_frame:
+                self._upload_frame, self._upload_used = frame, 0
+            allowed = (self._upload_budget - self._upload_used) // unit * unit
+            if allowed <= 0:
+                if self._upload_used:
+                    allowed = 0
+                else:
+                    allowed = unit  # Make progress if a unit exceeds budget
+            size = min(size, allowed)
+        if size:
+            size = upload_scheduler._take(size, unit)
+        if size == 0:
+            upload_scheduler.add(self)
+        elif self._upload_budget is not None:
+            self._upload_used += size
+        return size
+
     def _create(self):
         """ Dummy create method """
         raise NotImplementedError()
@@ -81,6 +482,13 @@ class GLObject(object):
         """ Dummy delete method """
         raise NotImplementedError()
 
+    def _garbage(self):
+        """ Get the deletions (gl function name, handle) to do when the
+        object is garbage collected (see DeletionQueue). These must not
+        refer to the object.
+        """
+        return []
+
     def _activate(self):
         """ Dummy activate method """
         raise NotImplementedError()
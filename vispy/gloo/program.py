@@ -4,6 +4,10 @@
 # Distributed under the (new) BSD License. See LICENSE.txt for more info.
 # -----------------------------------------------------------------------------
 import re
+import ctypes
+import weakref
+import itertools
+
 import numpy as np
 
 from . import gl
@@ -33,18 +37,53 @@ class Program(GLObject):
     count : int (optional)
         Number of vertices this program will use. This can be given to
         initialize a VertexBuffer during Program initialization.
+    usage : str | GLenum
+        Usage hint for the vertex buffers that this program creates for
+        attribute data. See VertexBuffer. Default 'dynamic'.
 
     Notes
     -----
     If several shaders are specified, only one can contain the main
     function. OpenGL ES 2.0 does not support a list of shaders.
+
+    Programs with the same shader code share one linked GL program
+    (within a GL context, see ``gl.set_current_context()``), so that the
+    shaders are only compiled and linked once. The uniforms are uploaded
+    again when another program that shares the GL program has been used.
+
+    For instanced drawing, use vertex buffers with a divisor for the
+    per-instance attributes, and pass the number of instances to
+    ``draw()``. When the driver does not support instanced drawing
+    (see ``gl.get_instancing()``), the data is replicated for each
+    instance on the CPU, which requires the vertex buffers (and index
+    buffer) to have CPU storage.
+
+    Only the uniforms that were set since the last draw are uploaded.
+    The attribute pointers are kept in a precomputed layout (like a
+    vertex array object), which is only re-specified when an attribute
+    gets another buffer, when a view moves in its buffer, or when
+    another program (or frame) has specified the attribute pointers.
     """
 
+    # The attribute pointer state per context: {context: [layout serial,
+    # frame, enabled locations]}. Attribute pointers are context state,
+    # not program state, so they have to be re-specified when another
+    # program has been drawn. Layouts are identified by a serial number,
+    # so that their buffers are not kept alive.
+    _applied_layout = {}
+    _layout_serials = itertools.count(1)
+
+    # The linked GL programs, per context and shader code:
+    # {context: {code: [handle, refcount, weakref to last user]}}.
+    # Programs that are built without a current context are not shared.
+    _linked = {}
+
     # ---------------------------------
-    def __init__(self, vert=None, frag=None, count=0):
+    def __init__(self, vert=None, frag=None, count=0, usage='dynamic'):
         GLObject.__init__(self)
 
         self._count = count
+        self._usage = usage
         self._buffer = None
         
         self._need_build = True
@@ -52,6 +91,12 @@ class Program(GLObject):
         # Init uniforms and attributes
         self._uniforms = {}
         self._attributes = {}
+        self._samplers = []
+        self._dirty_uniforms = set()  # Uniforms that need an upload
+        self._layout = None  # Attribute layout (see _get_layout)
+        self._layout_serial = 0
+        self._link_key = None  # (context, code, entry) of the GL program
+        self._replicated = {}  # name -> (key, buffer) for instancing on CPU
         
         # Get all vertex shaders
         self._verts = []
@@ -99,7 +144,8 @@ class Program(GLObject):
             dtype = []
             for attribute in self._attributes.values():
                 dtype.append(attribute.dtype)
-            self._buffer = VertexBuffer(np.zeros(self._count, dtype=dtype))
+            self._buffer = VertexBuffer(np.zeros(self._count, dtype=dtype),
+                                        usage=usage)
             self.bind(self._buffer)
 
     def attach(self, shaders):
@@ -167,17 +213,54 @@ class Program(GLObject):
 
     def _create(self):
         """
-        Create the GL program object if needed.
+        Create the GL program object if needed. This is done when the
+        program is built, because the object may be shared.
         """
-        # Check if program has been created
-        if self._handle <= 0:
-            self._handle = gl.glCreateProgram()
-            if not self._handle:
-                raise RuntimeError("Cannot create program object")
+        pass
     
     def _delete(self):
-        logger.debug("GPU: Deleting program")
-        gl.glDeleteProgram(self._handle)
+        self._release()
+        for key, buffer in self._replicated.values():
+            buffer.delete()
+        self._replicated = {}
+
+    def _release(self):
+        """ Release the GL program. It is deleted when no other program
+        uses it.
+        """
+        if self._unlink():
+            logger.debug("GPU: Deleting program")
+            gl.glDeleteProgram(self._handle)
+        self._handle = -1
+
+    def _unlink(self):
+        """ Stop using the GL program. Returns True if no other program
+        uses it, i.e. if it must be deleted.
+        """
+        entry = self._get_link_entry()
+        context, code = self._link_key[:2] if entry else (None, None)
+        self._link_key = None
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                if context is not None:
+                    del Program._linked[context][code]
+                return True
+        return False
+
+    def _garbage(self):
+        """ Deletions to do when the program is garbage collected """
+
+        if self._unlink():
+            return [('glDeleteProgram', self._handle)]
+        return []
+
+    @staticmethod
+    def _forget_context(context):
+        """ Forget the GL programs and attribute pointer state of a
+        context that was destroyed """
+        Program._linked.pop(context, None)
+        Program._applied_layout.pop(context, None)
     
     def _activate(self):
         """Activate the program as part of current rendering state."""
@@ -191,6 +274,15 @@ class Program(GLObject):
         
         # Go and use the prrogram
         gl.glUseProgram(self.handle)
+
+        # Upload all uniforms if another program used the GL program
+        entry = self._get_link_entry()
+        if entry is not None and entry[2]() is not self:
+            entry[2] = weakref.ref(self)
+            for uniform in self._uniforms.values():
+                if uniform._data is not None:
+                    uniform._need_update = True
+                    self._dirty_uniforms.add(uniform)
         
         # Stuff we need to do *after* glUse-ing the program
         self._activate_variables()
@@ -214,10 +306,29 @@ class Program(GLObject):
         if not self._frags:
             raise ValueError("No fragment shader has been given")
 
-        # Detach any attached shaders
-        attached = gl.glGetAttachedShaders(self._handle)
-        for handle in attached:
-            gl.glDetachShader(self._handle, handle)
+        # Use the linked program with the same code if there is one
+        self._release()
+        context = gl.get_current_context()
+        code = (tuple([shader.code for shader in self._verts]),
+                tuple([shader.code for shader in self._frags]))
+        # Without a known context, the program cannot be shared
+        if context is None:
+            programs = {}
+        else:
+            programs = Program._linked.setdefault(context, {})
+        entry = programs.get(code)
+        if entry is not None:
+            entry[1] += 1
+            self._handle = entry[0]
+            self._link_key = context, code, entry
+            self._need_delete = True
+            self._enable_variables()
+            self._layout = None
+            return
+
+        self._handle = gl.glCreateProgram()
+        if not self._handle:
+            raise RuntimeError("Cannot create program object")
 
         # Attach vertex and fragment shaders
         for shader in self._verts:
@@ -241,8 +352,27 @@ class Program(GLObject):
             print(gl.glGetProgramInfoLog(self._handle))
             raise RuntimeError('Program validation error')
         
+        # Share the program with other programs with the same code
+        programs[code] = entry = [self._handle, 1, weakref.ref(self)]
+        self._link_key = context, code, entry
+        self._need_delete = True
+
         # Now we know what variable will be used by the program
         self._enable_variables()
+        self._layout = None
+
+    def _get_link_entry(self):
+        """ Get the [handle, refcount, user] entry of the GL program, or
+        None if it has been forgotten (with its context).
+        """
+        if self._link_key is None:
+            return None
+        context, code, entry = self._link_key
+        if context is None:
+            return entry  # Not shared
+        if Program._linked.get(context, {}).get(code) is not entry:
+            return None
+        return entry
     
     def _create_variables(self):
         """ Create the uniform and attribute objects based on the
@@ -257,6 +387,8 @@ class Program(GLObject):
 
         # Build uniforms
         self._uniforms = {}
+        self._samplers = []
+        self._dirty_uniforms = set()
         count = 0
         for (name, gtype) in self.all_uniforms:
             uniform = Uniform(self, name, gtype)
@@ -264,9 +396,11 @@ class Program(GLObject):
             if gtype in (gl.GL_SAMPLER_2D, GL_SAMPLER_3D):
                 uniform._unit = count
                 count += 1
+                self._samplers.append(uniform)
             self._uniforms[name] = uniform
         
         # Build attributes
+        self._layout = None
         self._attributes = {}
         dtype = []
         for (name, gtype) in self.all_attributes:
@@ -292,23 +426,84 @@ class Program(GLObject):
         """ Activate the uniforms and attributes so that the Program
         can use them. This method is called when the Program gets activated.
         """
-        for uniform in self._uniforms.values():
+        # Textures are bound on each draw, other uniforms are only
+        # uploaded when they have changed.
+        for uniform in self._samplers:
             if uniform.enabled:
                 uniform.activate()
-        for attribute in self._attributes.values():
-            if attribute.enabled:
-                attribute.activate()
+        if self._dirty_uniforms:
+            dirty, self._dirty_uniforms = self._dirty_uniforms, set()
+            for uniform in dirty:
+                if uniform.enabled:
+                    uniform.activate()
+        self._activate_attributes()
+
+    def _get_layout(self):
+        """ Get the attribute layout: a list of (location, size, gtype,
+        stride, offset, buffer) for the enabled attributes. For generic
+        attributes, size is None and buffer is the attribute.
+        """
+        layout = self._layout
+        if layout is not None:
+            # Views (e.g. of a BufferArena) may have moved
+            for location, size, gtype, stride, offset, buffer in layout:
+                if size is not None and buffer.offset != offset:
+                    layout = None
+                    break
+        if layout is None:
+            layout = []
+            for attribute in self._attributes.values():
+                if attribute.enabled:
+                    layout.append(attribute._get_layout())
+            self._layout = layout
+            self._layout_serial = next(Program._layout_serials)
+        return layout
+
+    def _activate_attributes(self):
+        """ Update the vertex buffers, and specify the attribute pointers
+        if the layout is not the one that was last specified.
+        """
+        layout = self._get_layout()
+        frame = gl.get_frame_count()
+        applied = Program._applied_layout.setdefault(
+            gl.get_current_context(), [None, None, set()])
+        if applied[0] == self._layout_serial and applied[1] == frame:
+            for location, size, gtype, stride, offset, buffer in layout:
+                if size is not None and buffer._need_update:
+                    buffer.activate()
+            return
+
+        applied[0], applied[1] = self._layout_serial, frame
+        # Disable the arrays that a previous layout enabled
+        enabled = set([location for location, size, _, _, _, _ in layout
+                       if location >= 0 and size is not None])
+        for location in sorted(applied[2] - enabled):
+            gl.glDisableVertexAttribArray(location)
+        applied[2] = enabled
+        instancing = gl.get_instancing()
+        for location, size, gtype, stride, offset, buffer in layout:
+            if location < 0:
+                continue
+            elif size is None:
+                # Generic attribute (all vertices receive the same value)
+                gl.glDisableVertexAttribArray(location)
+                buffer._afunction(location, *buffer.data)
+            else:
+                buffer.activate()
+                gl.glEnableVertexAttribArray(location)
+                gl.glVertexAttribPointer(location, size, gtype, gl.GL_FALSE,
+                                         stride, offset)
+                if instancing is not None:
+                    instancing[0](location, buffer.divisor)
     
     def _deactivate_variables(self):
         """ Deactivate all enabled uniforms and attributes. This method
         gets called when the Program gets deactivated.
         """
-        for uniform in self._uniforms.values():
+        for uniform in self._samplers:
             if uniform.enabled:
                 uniform.deactivate()
-        for attribute in self._attributes.values():
-            if attribute.enabled:
-                attribute.deactivate()
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
     
     def bind(self, data):
         """ Bind a VertexBuffer that has structured data
@@ -453,8 +648,97 @@ class Program(GLObject):
         shaders.extend(self._frags)
         return shaders
 
-    # first=0, count=None):
-    def draw(self, mode=gl.GL_TRIANGLES, indices=None, check_error=True):
+    @property
+    def resident(self):
+        """ Whether the vertex buffers and textures of this program exist
+        on the GPU with all their data uploaded. When uploads are limited
+        by a budget (see ``UploadScheduler``), a visual can use this to
+        know that its data is only partially resident.
+        """
+
+        for attribute in self._attributes.values():
+            if isinstance(attribute.data, VertexBuffer):
+                if not attribute.data.resident:
+                    return False
+        for uniform in self._uniforms.values():
+            data = uniform.data
+            if isinstance(data, GLObject) and not data.resident:
+                return False
+        return True
+
+    def _vertex_count(self):
+        """ Get the number of vertices: the size of the first attribute
+        buffer that is not per instance.
+        """
+        attributes = list(self._attributes.values())
+        for attribute in attributes:
+            data = attribute.data
+            if isinstance(data, VertexBuffer) and not data.divisor:
+                return data.size
+        return attributes[0].size if attributes else 0
+
+    def _replicate(self, instances, indices):
+        """ Replace the data of the attributes by buffers in which the
+        data is replicated for each instance, for instanced drawing
+        without GL support. Returns the original data, and the index
+        buffer to use.
+        """
+        count = self._vertex_count()
+        originals = {}
+        for attribute in self._attributes.values():
+            data = attribute.data
+            if not isinstance(data, VertexBuffer):
+                continue
+            if data.base is None:
+                values = data.data
+            elif data.base.data is not None:
+                values = data.base.data[data._key]
+            else:
+                values = None
+            if values is None:
+                raise RuntimeError('Instanced drawing without GL support '
+                                   'needs CPU storage for attribute %r'
+                                   % attribute.name)
+            if data.divisor:
+                values = values[np.arange(instances) // data.divisor]
+                values = np.repeat(values, count, axis=0)
+            else:
+                values = np.concatenate([values[:count]] * instances)
+            originals[attribute] = data
+            attribute._data = self._replicated_buffer(attribute.name, values)
+
+        if isinstance(indices, IndexBuffer):
+            if indices.data is None:
+                raise RuntimeError('Instanced drawing without GL support '
+                                   'needs CPU storage for the indices')
+            values = indices.data.astype(np.uint32)
+            values = np.concatenate([values + i * count
+                                     for i in range(instances)])
+            if count * instances <= 65536:
+                values = values.astype(np.uint16)
+            indices = self._replicated_buffer(None, values)
+
+        self._layout = None
+        return originals, indices
+
+    def _replicated_buffer(self, name, values):
+        """ Get a buffer (reused if possible) with the replicated values
+        for an attribute (or the indices if name is None).
+        """
+        key = values.dtype, values.shape
+        if name in self._replicated:
+            old_key, buffer = self._replicated[name]
+            if old_key == key:
+                buffer.set_data(values)
+                return buffer
+            buffer.delete()
+        cls = VertexBuffer if name is not None else IndexBuffer
+        buffer = cls(values, store=False)
+        self._replicated[name] = key, buffer
+        return buffer
+
+    def draw(self, mode=gl.GL_TRIANGLES, indices=None, check_error=True,
+             instances=None, first=0, count=None, ranges=None):
         """ Draw the attribute arrays in the specified mode.
 
         Parameters
@@ -462,10 +746,28 @@ class Program(GLObject):
         mode : str | GL_ENUM
             GL_POINTS, GL_LINES, GL_LINE_STRIP, GL_LINE_LOOP,
             GL_TRIANGLES, GL_TRIANGLE_STRIP, GL_TRIANGLE_FAN
+        indices : IndexBuffer | None
+            The indices of the vertices to draw. Default None (draw the
+            vertices in order).
+        check_error : bool
+            Whether to check for GL errors after drawing. Only done if
+            the error check mode is 'draw' (see ``gl.set_error_check()``).
+        instances : int | None
+            The number of instances to draw (instanced drawing). The
+            attributes with a vertex buffer that has a divisor get the
+            next element for each (divisor) instance(s). Default None
+            (not instanced, or one instance if a buffer has a divisor).
+            Nothing is drawn for zero instances.
         first : int
-            The starting vertex index in the vertex array. Default 0.
-        count : int
-            The number of vertices to draw. Default all.
+            The starting vertex index in the vertex array (or in the
+            index buffer). Default 0.
+        count : int | None
+            The number of vertices (or indices) to draw. Default all.
+        ranges : list of (first, count) | None
+            Draw several ranges of vertices (or indices), with a single
+            activation of the program. For instance to draw a subset of
+            many polylines stored in one buffer. Cannot be combined with
+            first and count.
         """
         _known_modes = ('points', 'lines', 'line_strip', 'line_loop',
                         'triangles', 'triangle_strip', 'triangle_fan')
@@ -474,33 +776,105 @@ class Program(GLObject):
                 raise ValueError('mode must be one of %s, not "%s"'
                                  % (_known_modes, mode))
             mode = getattr(gl, 'GL_%s' % mode.upper())
-        self.activate()
 
-        # WARNING: The "list" of values from a dict is not a list (py3k)
-        attributes = list(self._attributes.values())
+        # Get the ranges to draw
+        if ranges is None:
+            ranges = [(first, count)]
+        elif first != 0 or count is not None:
+            raise ValueError('Cannot use ranges together with first/count')
+        if isinstance(indices, IndexBuffer):
+            total = indices.size
+        else:
+            total = self._vertex_count()
+        ranges = [self._check_range(first, count, total)
+                  for first, count in ranges]
+
+        # Instanced drawing, replicating the data if GL does not support it
+        originals, instancing = None, None
+        if instances is not None:
+            instances = int(instances)
+            if instances < 0:
+                raise ValueError('Number of instances must be >= 0, not %d'
+                                 % instances)
+            if instances == 0:
+                return
+        else:
+            for attribute in self._attributes.values():
+                if getattr(attribute.data, 'divisor', 0):
+                    instances = 1
+                    break
+        if instances is not None:
+            instancing = gl.get_instancing()
+            if instancing is None:
+                originals, indices = self._replicate(instances, indices)
+                if ranges == [(0, total)]:
+                    ranges = [(0, total * instances)]
+                else:
+                    ranges = [(first + i * total, count)
+                              for i in range(instances)
+                              for first, count in ranges]
+                instances = None
+
+        try:
+            self._draw(mode, indices, ranges, instances, instancing)
+        finally:
+            if originals is not None:
+                for attribute, data in originals.items():
+                    attribute._data = data
+                self._layout = None
+
+        # Check ok
+        if check_error and gl.get_error_check() == 'draw':
+            gl.check_error()
+
+    def _check_range(self, first, count, total):
+        """ Check a range to draw, returns (first, count).
+        """
+        first = int(first)
+        count = total - first if count is None else int(count)
+        if first < 0 or count < 0 or first + count > total:
+            raise ValueError('Range (%d, %d) is out of bounds, there are '
+                             '%d vertices (or indices)' % (first, count,
+                                                           total))
+        return first, count
+
+    def _draw(self, mode, indices, ranges, instances, instancing):
+        """ Activate the program and draw the ranges. Instanced if
+        instancing is given.
+        """
+        self.activate()
 
         # Get buffer size first attribute
         # We need more tests here
-        #  - do we have at least 1 attribute ?
         #  - does all attributes report same count ?
-        # count = (count or attributes[0].size) - first
 
         if isinstance(indices, IndexBuffer):
             indices.activate()
             gltypes = {np.dtype(np.uint8): gl.GL_UNSIGNED_BYTE,
                        np.dtype(np.uint16): gl.GL_UNSIGNED_SHORT,
                        np.dtype(np.uint32): gl.GL_UNSIGNED_INT}
-            gl.glDrawElements(mode, indices.size, gltypes[indices.dtype], None)
+            gltype = gltypes[indices.dtype]
+            itemsize = indices.dtype.itemsize
+            for first, count in ranges:
+                if not count:
+                    continue
+                offset = first * itemsize
+                if instancing is not None:
+                    instancing[2](mode, count, gltype,
+                                  ctypes.c_void_p(offset), instances)
+                else:
+                    gl.glDrawElements(mode, count, gltype, offset)
             indices.deactivate()
         else:
-            #count = (count or attributes[0].size) - first
-            first = 0
-            count = attributes[0].size
-            gl.glDrawArrays(mode, first, count)
+            for first, count in ranges:
+                if not count:
+                    continue
+                if instancing is not None:
+                    instancing[1](mode, first, count, instances)
+                else:
+                    gl.glDrawArrays(mode, first, count)
 
-        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
         self.deactivate()
 
-        # Check ok
-        if check_error:
-            gl.check_error()
+
+gl._context_listeners.append(Program._forget_context)
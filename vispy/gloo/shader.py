@@ -7,7 +7,7 @@ import re
 import os.path
 
 from . import gl
-from ..util import logger
+from ..util import logger, lru_cache
 from .globject import GLObject
 from .texture import GL_SAMPLER_3D
 
@@ -123,6 +123,11 @@ class Shader(GLObject):
 
         gl.glDeleteShader(self._handle)
 
+    def _garbage(self):
+        """ Deletions to do when the shader is garbage collected """
+
+        return [('glDeleteShader', self._handle)]
+
     def _parse_error(self, error):
         """
         Parses a single GLSL error and extracts the line number and error
@@ -194,41 +199,37 @@ class Shader(GLObject):
     def uniforms(self):
         """ Shader uniforms obtained from source code """
 
-        uniforms = []
-        regex = re.compile("""\s*uniform\s+(?P<type>\w+)\s+"""
-                           """(?P<name>\w+)\s*(\[(?P<size>\d+)\])?\s*;""")
-        for m in re.finditer(regex, self._code):
-            size = -1
-            gtype = Shader._gtypes[m.group('type')]
-            if m.group('size'):
-                size = int(m.group('size'))
-            if size >= 1:
-                for i in range(size):
-                    name = '%s[%d]' % (m.group('name'), i)
-                    uniforms.append((name, gtype))
-            else:
-                uniforms.append((m.group('name'), gtype))
-        return uniforms
+        return list(_parse_variables('uniform', self._code))
 
     @property
     def attributes(self):
         """ Shader attributes obtained from source code """
 
-        attributes = []
-        regex = re.compile("""\s*attribute\s+(?P<type>\w+)\s+"""
-                           """(?P<name>\w+)\s*(\[(?P<size>\d+)\])?\s*;""")
-        for m in re.finditer(regex, self._code):
-            size = -1
-            gtype = Shader._gtypes[m.group('type')]
-            if m.group('size'):
-                size = int(m.group('size'))
-            if size >= 1:
-                for i in range(size):
-                    name = '%s[%d]' % (m.group('name'), i)
-                    attributes.append((name, gtype))
-            else:
-                attributes.append((m.group('name'), gtype))
-        return attributes
+        return list(_parse_variables('attribute', self._code))
+
+
+@lru_cache()
+def _parse_variables(qualifier, code):
+    """ Get the (name, gtype) of the variables with the given qualifier
+    (uniform or attribute) in the code. The result is cached per code.
+    """
+
+    variables = []
+    regex = re.compile(r"""\s*%s\s+(?P<type>\w+)\s+"""
+                       r"""(?P<name>\w+)\s*(\[(?P<size>\d+)\])?\s*;"""
+                       % qualifier)
+    for m in re.finditer(regex, code):
+        size = -1
+        gtype = Shader._gtypes[m.group('type')]
+        if m.group('size'):
+            size = int(m.group('size'))
+        if size >= 1:
+            for i in range(size):
+                name = '%s[%d]' % (m.group('name'), i)
+                variables.append((name, gtype))
+        else:
+            variables.append((m.group('name'), gtype))
+    return tuple(variables)
 
 
 # ------------------------------------------------------ VertexShader class ---
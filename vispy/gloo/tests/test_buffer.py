@@ -7,7 +7,8 @@ import unittest
 import numpy as np
 
 from vispy.gloo import gl
-from vispy.gloo.buffer import Buffer, DataBuffer, VertexBuffer, IndexBuffer
+from vispy.gloo.buffer import (Buffer, DataBuffer, VertexBuffer, IndexBuffer,
+                               RingVertexBuffer, BufferArena)
 
 
 # -----------------------------------------------------------------------------
@@ -26,6 +27,18 @@ class BufferTest(unittest.TestCase):
         assert B._usage == gl.GL_DYNAMIC_DRAW
         assert B._resizeable is True
 
+    # Usage hint
+    # ----------
+    def test_usage(self):
+        B = Buffer(usage='static')
+        assert B.usage == gl.GL_STATIC_DRAW
+        B = Buffer(usage=gl.GL_STREAM_DRAW)
+        assert B.usage == gl.GL_STREAM_DRAW
+        B = Buffer(usage='auto')
+        assert B.usage == gl.GL_DYNAMIC_DRAW
+        self.assertRaises(ValueError, Buffer, usage='often')
+        self.assertRaises(ValueError, Buffer, usage=gl.GL_FLOAT)
+
     # Unknown target
     # --------------
     def test_init_wrong_target(self):
@@ -372,7 +385,64 @@ class DataBufferTest(unittest.TestCase):
         assert np.allclose(data1['position'][:5], data2['position'][:5])
         assert np.allclose(data1['texcoord'][:5], data2['texcoord'][:5])
         assert np.allclose(data1['color'][:5], data2['color'][:5])
+        # Merged with the pending upload of the whole buffer
+        assert len(B._pending_data) == 1
+
+    # Writes from storage are merged
+    # ------------------------------
+    def test_setitem_merge(self):
+        data = np.zeros(100, np.float32)
+        B = DataBuffer(data)
+        B._pending_data = []
+        for i in range(10, 20):
+            B[i] = i
+        for i in range(30, 35):
+            B[i] = i
+        B[18:32] = 1
+        assert len(B._pending_data) == 1
+        data, nbytes, offset = B._pending_data[0]
+        assert offset == 10 * 4
+        assert nbytes == 25 * 4
+        assert np.all(data.view(np.float32) == B.data[10:35])
+
+    # Large dirty part results in a full upload
+    # -----------------------------------------
+    def test_setitem_full_upload(self):
+        data = np.zeros(100, np.float32)
+        B = DataBuffer(data)
+        B._pending_data = []
+        B[:20] = 1
+        B[40:60] = 1
         assert len(B._pending_data) == 2
+        B[80:] = 1
+        assert len(B._pending_data) == 1
+        assert B._pending_data[0][1:] == (400, 0)
+
+    # Many scattered writes are merged
+    # --------------------------------
+    def test_setitem_scattered(self):
+        data = np.zeros(1000, np.float32)
+        B = DataBuffer(data)
+        B._pending_data = []
+        for i in range(0, 100, 2):
+            B[i] = i
+        assert len(B._pending_data) <= B._max_pending_ranges
+        assert B._pending_data[0][2] == 0
+        assert sum([p[1] for p in B._pending_data]) <= 99 * 4
+
+    # Writes not from storage are not merged
+    # --------------------------------------
+    def test_set_data_no_merge(self):
+        data = np.zeros(100, np.float32)
+        B = DataBuffer(data)
+        B._pending_data = []
+        B[:10] = 1
+        B.set_data(np.ones(10, np.float32), offset=5)
+        B[10:20] = 2
+        assert len(B._pending_data) == 3
+        # But shadowed writes are dropped
+        B.set_data(np.ones(20, np.float32), offset=0)
+        assert len(B._pending_data) == 1
 
     # Set field without storage: error
     # --------------------------------
@@ -409,6 +479,64 @@ class DataBufferTest(unittest.TestCase):
         assert B.nbytes == data.nbytes
         assert B._need_resize is True
 
+    # Resize within the allocated memory
+    # ----------------------------------
+    def test_resize_capacity(self):
+        B = DataBuffer(np.zeros(10, np.float32))
+        B._capacity = B.capacity_nbytes
+        B._need_resize = False
+        B.resize(5)
+        assert B.nbytes == 5 * 4
+        assert B.capacity_nbytes == 10 * 4
+        assert B._need_resize is False
+        B.resize(12)
+        assert B._need_resize is True
+        assert B.capacity_nbytes == 15 * 4
+
+    # Extend
+    # ------
+    def test_extend(self):
+        B = VertexBuffer(np.zeros((10, 2), np.float32))
+        Z = B['f0']
+        B._capacity = B.capacity_nbytes
+        B._need_resize = False
+        B._pending_data = []
+
+        # Grows, uploads all data from storage
+        B.extend(np.ones((2, 2)))
+        assert B.size == 12
+        assert B.nbytes == 12 * 8
+        assert B.capacity_nbytes == 15 * 8
+        assert B._need_resize is True
+        assert Z._valid is False
+        assert [p[1:] for p in B._pending_data] == [(12 * 8, 0)]
+        assert np.all(B.data['f0'][10:] == 1)
+
+        # Fits in the allocated memory, uploads only the new data
+        B._capacity = B.capacity_nbytes
+        B._need_resize = False
+        B._pending_data = []
+        Z = B['f0']
+        B.extend(np.ones((3, 2)) * 2)
+        assert B.size == 15
+        assert B._need_resize is False
+        assert Z._valid is True
+        assert Z.size == 15
+        assert [p[1:] for p in B._pending_data] == [(3 * 8, 12 * 8)]
+        assert np.all(B.data['f0'][12:] == 2)
+        assert np.all(B.data['f0'][:10] == 0)
+
+    # Extend without storage
+    # ----------------------
+    def test_extend_no_storage(self):
+        B = VertexBuffer(np.zeros((10, 2), np.float32), store=False)
+        B.extend(np.ones((2, 2)))  # Not uploaded yet, so this is fine
+        assert len(B._pending_data) == 2
+        B._capacity = B.capacity_nbytes
+        B._need_resize = False
+        B.resize(10)
+        self.assertRaises(RuntimeError, B.extend, np.ones((6, 2)))
+
     # Resize not allowed using ellipsis
     # --------------------------------
     def test_no_resize_ellipsis(self):
@@ -471,5 +599,151 @@ class IndexBufferTest(unittest.TestCase):
             #    V = IndexBuffer(dtype=dtype)
             self.assertRaises(TypeError, IndexBuffer, dtype=dtype)
 
+# -----------------------------------------------------------------------------
+
+
+class RingVertexBufferTest(unittest.TestCase):
+
+    # Append without wrapping around
+    # ------------------------------
+    def test_append(self):
+        V = RingVertexBuffer(dtype=np.float32, size=10)
+        V._pending_data = []
+        assert V.ranges == []
+        V.append(np.arange(4))
+        assert V.head == 4
+        assert V.count == 4
+        assert V.ranges == [(0, 4)]
+        assert len(V._pending_data) == 1
+        data, nbytes, offset = V._pending_data[0]
+        assert (nbytes, offset) == (16, 0)
+        assert np.all(V.data['f0'][:4] == np.arange(4))
+
+    # Append with wrapping around uses two uploads
+    # --------------------------------------------
+    def test_append_wrap(self):
+        V = RingVertexBuffer(dtype=np.float32, size=10)
+        V.append(np.arange(8))
+        V._pending_data = []
+        V.append(np.arange(8, 13))
+        assert V.head == 3
+        assert V.count == 10
+        assert V.ranges == [(3, 7), (0, 3)]
+        assert sorted(p[1:] for p in V._pending_data) == [(8, 32), (12, 0)]
+        chronological = np.concatenate([V.data['f0'][f:f + n]
+                                        for f, n in V.ranges])
+        assert np.all(chronological == np.arange(3, 13))
+
+    # Append more samples than fit
+    # ----------------------------
+    def test_append_overflow(self):
+        V = RingVertexBuffer(dtype=np.float32, size=10)
+        V.append(np.arange(5))
+        V.append(np.arange(5, 30))
+        assert V.head == 0
+        assert V.ranges == [(0, 10)]
+        assert np.all(V.data['f0'] == np.arange(20, 30))
+
+    # Append vectors, with and without storage
+    # ----------------------------------------
+    def test_append_vectors(self):
+        for store in (True, False):
+            V = RingVertexBuffer(dtype=[('f0', np.float32, 2)], size=10,
+                                 store=store)
+            V._pending_data = []
+            V.append(np.ones((12, 2)))
+            assert V.head == 2
+            assert sum(p[1] for p in V._pending_data) == 10 * 8
+        self.assertRaises(ValueError, V.append, np.ones((12, 3)))
+
+    # Slicing gives a view
+    # --------------------
+    def test_slice(self):
+        for data in (None, np.arange(10, dtype=np.float32)):
+            V = RingVertexBuffer(data=data, dtype=np.float32, size=10)
+            Z = V[2:5]
+            assert Z.base is V
+            assert (Z.size, Z.offset) == (3, 8)
+
+
+# -----------------------------------------------------------------------------
+
+
+class BufferArenaTest(unittest.TestCase):
+
+    # Allocations share a block
+    # -------------------------
+    def test_allocate(self):
+        A = BufferArena(dtype=[('f0', np.float32, 2)], block_size=100)
+        V1 = A.allocate(np.ones((10, 2)))
+        V2 = A.allocate(size=20)
+        assert V1.base is V2.base
+        assert (V1.offset, V1.size) == (0, 10)
+        assert (V2.offset, V2.size) == (80, 20)
+        assert A.size == 30
+        assert np.all(V1.base.data['f0'][:10] == 1)
+        V2[...] = np.zeros(20, dtype=A.dtype)
+        self.assertRaises(ValueError, A.allocate)
+        self.assertRaises(ValueError, A.allocate, np.ones((10, 3)))
+
+    # Freed space is reused, and neighbouring ranges are merged
+    # ---------------------------------------------------------
+    def test_free(self):
+        A = BufferArena(dtype=np.float32, block_size=100)
+        V1, V2, V3 = [A.allocate(size=10) for i in range(3)]
+        A.free(V2)
+        A.free(V1)
+        assert not V1._valid
+        block = A.blocks[0]
+        assert A._free[block] == [(0, 20), (30, 100)]
+        V4 = A.allocate(size=15)
+        assert V4.offset == 0
+        self.assertRaises(ValueError, A.free, V1)
+
+    # Compaction moves views and uploads the moved data once
+    # ------------------------------------------------------
+    def test_compact(self):
+        A = BufferArena(dtype=np.float32, block_size=100)
+        views = [A.allocate(np.arange(10) + 10 * i) for i in range(10)]
+        for V in views[::2]:
+            A.free(V)
+        block = A.blocks[0]
+        block._pending_data = []
+        # 50 elements are free, but not contiguous
+        V = A.allocate(np.arange(40))
+        assert len(A.blocks) == 1
+        # The moved data and the new data are uploaded at once
+        assert [p[1:] for p in block._pending_data] == [(360, 0)]
+        for i, V_ in enumerate(views[1::2]):
+            assert V_.offset == 40 * i
+            assert np.all(block.data['f0'][V_._key] ==
+                          np.arange(10) + 10 * (2 * i + 1))
+        assert V.offset == 200
+
+    # Allocations that do not fit get a new block
+    # -------------------------------------------
+    def test_new_block(self):
+        A = BufferArena(dtype=np.float32, block_size=100)
+        A.allocate(size=60)
+        V = A.allocate(size=60)
+        V2 = A.allocate(size=250)
+        assert len(A.blocks) == 3
+        assert V.base is A.blocks[1]
+        assert A.blocks[2].size == 250
+        assert V2.size == 250
+
+    # Writes to views on a block are merged before upload
+    # ---------------------------------------------------
+    def test_upload(self):
+        A = BufferArena(dtype=np.float32, block_size=100)
+        views = [A.allocate(size=10) for i in range(4)]
+        block = A.blocks[0]
+        block._pending_data = []
+        for V in views:
+            V[...] = np.ones(10, dtype=A.dtype)
+        assert len(block._pending_data) == 1
+        assert block._pending_data[0][1:] == (160, 0)
+
+
 if __name__ == "__main__":
     unittest.main()
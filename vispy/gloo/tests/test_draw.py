@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+import numpy as np
+from nose.tools import assert_equal, assert_raises, assert_true
+
+from vispy.gloo import gl, Program, VertexBuffer, IndexBuffer, BufferArena
+from vispy.gloo.gl import mock
+
+
+VERT = """
+uniform float u_scale;
+uniform vec2 u_offset;
+attribute vec2 a_position;
+void main() {
+    gl_Position = vec4(a_position * u_scale + u_offset, 0.0, 1.0);
+}
+"""
+
+FRAG = """
+void main() {
+    gl_FragColor = vec4(1.0, 1.0, 1.0, 1.0);
+}
+"""
+
+
+def setup_module():
+    gl.use_gl('mock')
+
+
+def teardown_module():
+    gl.use_gl()  # Reset to default
+
+
+def _count(funcname):
+    """ Count the calls since the last _mark() """
+    return [c[0] for c in mock.commands[_mark.start:]].count(funcname)
+
+
+def _mark():
+    _mark.start = len(mock.commands)
+
+
+def _program():
+    program = Program(VERT, FRAG)
+    program['a_position'] = np.zeros((6, 2), np.float32)
+    program['u_scale'] = 1.0
+    program['u_offset'] = (0, 0)
+    return program
+
+
+def test_uniform_dirty_tracking():
+    """ Only uniforms that changed are uploaded """
+    mock.reset()
+    program = _program()
+    program.draw('triangles')
+    _mark()
+    program.draw('triangles')
+    assert_equal(_count('glUniform1fv') + _count('glUniform2fv'), 0)
+
+    program['u_scale'] = 2.0
+    program.draw('triangles')
+    assert_equal(_count('glUniform1fv'), 1)
+    assert_equal(_count('glUniform2fv'), 0)
+    assert_equal(_count('glDrawArrays'), 2)
+
+
+def test_attribute_layout():
+    """ Attribute pointers are only specified when the layout changes """
+    program = _program()
+    program.draw('triangles')
+    _mark()
+    program.draw('triangles')
+    assert_equal(_count('glVertexAttribPointer'), 0)
+    assert_equal(_count('glEnableVertexAttribArray'), 0)
+
+    # Updating the data uploads it, but keeps the layout
+    program['a_position'] = np.ones((6, 2), np.float32)
+    program.draw('triangles')
+    assert_equal(_count('glBufferSubData'), 1)
+    assert_equal(_count('glVertexAttribPointer'), 0)
+
+    # Another buffer, another program, or another frame
+    program['a_position'] = VertexBuffer(np.ones((6, 2), np.float32))
+    program.draw('triangles')
+    assert_equal(_count('glVertexAttribPointer'), 1)
+    _program().draw('triangles')
+    program.draw('triangles')
+    assert_equal(_count('glVertexAttribPointer'), 3)
+    gl.end_frame()
+    program.draw('triangles')
+    assert_equal(_count('glVertexAttribPointer'), 4)
+    gl.check_error()
+
+
+def test_attribute_layout_disable():
+    """ Arrays enabled for another program are disabled """
+    program1, program2 = _instanced_program(), _program()
+    program1.draw('triangles', instances=5)
+    locations = set([layout[0] for layout in program1._get_layout()])
+    _mark()
+    program2.draw('triangles')
+    used = program2._get_layout()[0][0]
+    disabled = [c[1][0] for c in mock.commands[_mark.start:]
+                if c[0] == 'glDisableVertexAttribArray']
+    assert_equal(disabled, sorted(locations - set([used])))
+    # Only the serial number of the layout is kept, not its buffers
+    assert_equal(Program._applied_layout[None][0], program2._layout_serial)
+    gl.check_error()
+
+
+def test_attribute_layout_moved_view():
+    """ Attribute pointers are re-specified when a view moves """
+    arena = BufferArena(dtype=[('a_position', np.float32, 2)], block_size=20)
+    first = arena.allocate(np.zeros((6, 2), np.float32))
+    view = arena.allocate(np.ones((6, 2), np.float32))
+    program = _program()
+    program['a_position'] = view
+    program.draw('triangles')
+    arena.free(first)
+    arena.compact()
+    _mark()
+    program.draw('triangles')
+    assert_equal(_count('glVertexAttribPointer'), 1)
+    pointers = [c[1] for c in mock.commands if c[0] == 'glVertexAttribPointer']
+    assert_equal(pointers[-2][-1], 48)
+    assert_equal(pointers[-1][-1], 0)
+    gl.check_error()
+
+
+def test_program_cache():
+    """ Programs with the same code share a linked GL program """
+    mock.reset()
+    gl.set_current_context('main')
+    try:
+        _test_program_cache()
+    finally:
+        gl.set_current_context(None)
+
+    # Without a known context, programs are not shared
+    mock.reset()
+    program1, program2 = _program(), _program()
+    program1.draw('triangles')
+    program2.draw('triangles')
+    assert_equal(mock.count('glLinkProgram'), 2)
+    assert_true(program1.handle != program2.handle)
+    program1.delete()
+    assert_equal(mock.count('glDeleteProgram'), 1)
+    gl.check_error()
+
+
+def _test_program_cache():
+    program1, program2 = _program(), _program()
+    program1.draw('triangles')
+    program2.draw('triangles')
+    assert_equal(mock.count('glLinkProgram'), 1)
+    assert_equal(mock.count('glCompileShader'), 2)
+    assert_equal(program1.handle, program2.handle)
+
+    # Uniforms are uploaded again when switching programs
+    program2['u_scale'] = 3.0
+    _mark()
+    program2.draw('triangles')
+    program1.draw('triangles')
+    assert_equal(_count('glUniform1fv'), 2)
+    assert_equal(_count('glUniform2fv'), 1)
+    program1.draw('triangles')
+    assert_equal(_count('glUniform1fv'), 2)
+
+    # Programs are only shared within a context
+    gl.set_current_context('other')
+    try:
+        program3 = _program()
+        program3.draw('triangles')
+        assert_equal(mock.count('glLinkProgram'), 2)
+        gl.forget_context('other')
+        assert_equal(gl.get_current_context(), None)
+    finally:
+        gl.set_current_context('main')
+
+    # The GL program is deleted when it is not used anymore
+    handle = program1.handle
+    program1.delete()
+    assert_equal(mock.count('glDeleteProgram'), 0)
+    program2.delete()
+    assert_equal(mock.count('glDeleteProgram'), 1)
+    assert_equal(gl.glIsProgram(handle), False)
+    gl.check_error()
+
+
+VERT_INSTANCED = """
+attribute vec2 a_position;
+attribute vec2 a_offset;
+void main() {
+    gl_Position = vec4(a_position + a_offset, 0.0, 1.0);
+}
+"""
+
+
+def _instanced_program():
+    program = Program(VERT_INSTANCED, FRAG)
+    program['a_position'] = np.arange(6, dtype=np.float32).reshape(3, 2)
+    offsets = np.arange(5, dtype=np.float32).repeat(2).reshape(5, 2)
+    program['a_offset'] = VertexBuffer(offsets, divisor=2)
+    return program
+
+
+def test_instanced_draw():
+    """ Instanced drawing sets the divisors and draws instances """
+    mock.reset()
+    program = _instanced_program()
+    assert_equal(program['a_offset'].divisor, 2)
+    _mark()
+    program.draw('triangles', instances=10)
+    assert_equal(_count('glVertexAttribDivisor'), 2)
+    divisors = sorted(c[1][1] for c in mock.commands
+                      if c[0] == 'glVertexAttribDivisor')
+    assert_equal(divisors, [0, 2])
+    draws = [c for c in mock.commands if c[0] == 'glDrawArraysInstanced']
+    assert_equal(draws, [('glDrawArraysInstanced',
+                          (gl.GL_TRIANGLES, 0, 3, 10))])
+    assert_equal(_count('glDrawArrays'), 0)
+    gl.check_error()
+
+
+def test_instanced_draw_fallback():
+    """ Instanced drawing replicates the data if GL does not support it """
+    mock.instancing = False
+    try:
+        mock.reset()
+        assert_equal(gl.get_instancing(), None)
+        program = _instanced_program()
+        _mark()
+        program.draw('triangles', instances=4)
+        assert_equal(_count('glVertexAttribDivisor'), 0)
+        assert_equal(_count('glDrawArraysInstanced'), 0)
+        draws = [c for c in mock.commands if c[0] == 'glDrawArrays']
+        assert_equal(draws, [('glDrawArrays', (gl.GL_TRIANGLES, 0, 12))])
+        name, buffer = program._replicated['a_offset']
+        assert_equal(buffer.size, 12)
+        assert_equal(program['a_offset'].size, 5)  # original restored
+        gl.check_error()
+
+        # Drawing again reuses the replicated buffers
+        _mark()
+        program.draw('triangles', instances=4)
+        assert_equal(_count('glCreateBuffer'), 0)
+        assert_equal(_count('glDrawArrays'), 1)
+
+        # Zero instances draws nothing
+        _mark()
+        program.draw('triangles', instances=0)
+        assert_equal(_count('glDrawArrays'), 0)
+        assert_raises(ValueError, program.draw, 'triangles', instances=-1)
+    finally:
+        mock.instancing = True
+        mock.reset()
+
+
+def test_draw_ranges():
+    """ Draw a sub-range, or many ranges with a single activation """
+    mock.reset()
+    program = _program()
+    _mark()
+    program.draw('line_strip', first=2, count=3)
+    program.draw('line_strip', first=4)
+    draws = [c[1] for c in mock.commands if c[0] == 'glDrawArrays']
+    assert_equal(draws, [(gl.GL_LINE_STRIP, 2, 3), (gl.GL_LINE_STRIP, 4, 2)])
+
+    _mark()
+    program.draw('line_strip', ranges=[(0, 2), (3, 0), (3, 3)])
+    draws = [c[1] for c in mock.commands[_mark.start:]
+             if c[0] == 'glDrawArrays']
+    assert_equal(draws, [(gl.GL_LINE_STRIP, 0, 2), (gl.GL_LINE_STRIP, 3, 3)])
+    assert_equal(_count('glUseProgram'), 2)  # activate and deactivate
+    gl.check_error()
+
+    # Ranges of indices are given as byte offsets in the index buffer
+    indices = IndexBuffer(np.arange(6, dtype=np.uint16))
+    _mark()
+    program.draw('lines', indices, ranges=[(0, 2), (4, 2)])
+    draws = [c[1] for c in mock.commands[_mark.start:]
+             if c[0] == 'glDrawElements']
+    assert_equal(draws, [(gl.GL_LINES, 2, gl.GL_UNSIGNED_SHORT, 0),
+                         (gl.GL_LINES, 2, gl.GL_UNSIGNED_SHORT, 8)])
+
+    assert_raises(ValueError, program.draw, 'lines', first=4, count=3)
+    assert_raises(ValueError, program.draw, 'lines', first=-1)
+    assert_raises(ValueError, program.draw, 'lines', count=2,
+                  ranges=[(0, 2)])
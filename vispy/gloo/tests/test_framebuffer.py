@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Vispy Development Team. All Rights Reserved.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+import numpy as np
+from nose.tools import assert_equal, assert_true
+
+from vispy.gloo import gl, DepthBuffer, RenderTargetPool
+from vispy.gloo.gl import mock
+
+
+def test_render_target_pool():
+    """ Render targets are reused in the next frame """
+    gl.use_gl('mock')
+    try:
+        mock.reset()
+        pool = RenderTargetPool(max_idle=2)
+
+        def draw(shape):
+            tex = pool.texture(shape + (4,), np.uint8)
+            depth = pool.render_buffer(DepthBuffer, shape)
+            fbo = pool.frame_buffer(tex, depth=depth)
+            fbo.activate()
+            fbo.deactivate()
+            return tex, depth, fbo
+
+        objects = draw((10, 20))
+        assert_equal(mock.count('glCreateTexture'), 1)
+        assert_equal(mock.count('glCreateFramebuffer'), 1)
+        # Objects in use are not handed out twice
+        other = pool.texture((10, 20, 4), np.uint8)
+        assert_true(other is not objects[0])
+        assert_equal(pool.count(), 4)
+
+        # The same objects are handed out in the next frame
+        pool.end_frame()
+        gl.end_frame()
+        mock.commands[:] = []
+        again = draw((10, 20))
+        for obj1, obj2 in zip(objects, again):
+            assert_true(obj1 is obj2)
+        assert_equal(mock.count('glCreateTexture'), 0)
+        assert_equal(mock.count('glCreateRenderbuffer'), 0)
+        assert_equal(mock.count('glFramebufferTexture2D'), 0)
+
+        # Other shapes resize free objects in place
+        pool.end_frame()
+        gl.end_frame()
+        mock.commands[:] = []
+        tex, depth, fbo = draw((30, 40))
+        assert_equal(tex.shape, (30, 40, 4))
+        assert_equal(depth.shape, (30, 40))
+        assert_equal(mock.count('glCreateTexture'), 0)
+        assert_equal(mock.count('glTexImage2D'), 1)
+        assert_equal(mock.count('glRenderbufferStorage'), 1)
+        # Other formats and dtypes get other textures
+        assert_true(pool.texture((30, 40, 4), np.float32) is not tex)
+        assert_true(pool.texture((30, 40), np.uint8) is not tex)
+
+        # Objects can be given back within a frame
+        tex2 = pool.texture((5, 5), np.float32, 'luminance')
+        pool.release(tex2)
+        assert_true(pool.texture((5, 5), np.float32, 'luminance') is tex2)
+
+        # Objects that are not used are deleted
+        pool.end_frame()
+        for i in range(4):
+            gl.end_frame()
+            pool.end_frame()
+        assert_equal(pool.count(), 0)
+        assert_true(not gl.glIsTexture(tex.handle))
+        assert_true(not gl.glIsFramebuffer(fbo.handle))
+
+        # The pool is per context
+        draw((10, 20))
+        context = gl.get_current_context()
+        gl.set_current_context('other')
+        assert_equal(pool.count(), 0)
+        gl.set_current_context(context)
+        assert_equal(pool.count(), 3)
+    finally:
+        gl.use_gl()  # Reset to default
@@ -3,7 +3,13 @@
 # Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
 # Distributed under the terms of the new BSD License.
 # -----------------------------------------------------------------------------
+import gc
 import unittest
+
+import numpy as np
+
+from vispy.gloo import gl, VertexBuffer, Texture2D, deletion_queue
+from vispy.gloo.gl import mock
 from vispy.gloo.globject import GLObject
 
 
@@ -21,5 +27,55 @@ class GLObjectTest(unittest.TestCase):
         assert O._need_delete is False
         assert O._id > 0
         assert O._id == GLObject._idcount
+
+
+# -----------------------------------------------------------------------------
+def test_deletion_queue():
+    """ Collected objects are deleted at the end of a frame """
+    gl.use_gl('mock')
+    try:
+        mock.reset()
+        V = VertexBuffer(np.zeros(10, np.float32))
+        T = Texture2D(np.zeros((10, 10), np.float32))
+        V.activate()
+        T.activate()
+        handles = V.handle, T.handle
+        del V, T
+        gc.collect()
+        assert deletion_queue.pending() == 2
+        assert mock.count('glDeleteBuffer') == 0
+        assert deletion_queue.flush() == 2
+        assert mock.count('glDeleteBuffer') == 1
+        assert mock.count('glDeleteTexture') == 1
+        assert not gl.glIsBuffer(handles[0])
+        assert not gl.glIsTexture(handles[1])
+
+        # Objects are deleted in the context that created them
+        gl.set_current_context('other')
+        V = VertexBuffer(np.zeros(10, np.float32))
+        V.activate()
+        gl.set_current_context(None)
+        del V
+        gc.collect()
+        assert deletion_queue.pending() == 0
+        assert deletion_queue.pending('other') == 1
+        assert deletion_queue.flush() == 0
+
+        # Unless the context is gone
+        gl.forget_context('other')
+        assert deletion_queue.pending('other') == 0
+        gl.set_current_context('other')
+        V = VertexBuffer(np.zeros(10, np.float32))
+        V.activate()
+        gl.forget_context('other')
+        del V
+        gc.collect()
+        assert deletion_queue.pending('other') == 0
+        assert deletion_queue.pending() == 0
+    finally:
+        gl.set_current_context(None)
+        gl.use_gl()  # Reset to default
+
+
 if __name__ == "__main__":
     unittest.main()
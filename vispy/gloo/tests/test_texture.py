@@ -6,8 +6,10 @@
 import unittest
 import numpy as np
 
-from vispy.gloo.texture import Texture, Texture1D, Texture2D, Texture3D
+from vispy.gloo.texture import (Texture, Texture1D, Texture2D, Texture3D,
+                                TextureAtlas)
 from vispy.gloo import gl
+from vispy.gloo.gl import mock
 from vispy.testing import requires_pyopengl
 
 
@@ -599,6 +601,80 @@ class Texture3DTest(unittest.TestCase):
         self.assertRaises(ValueError, T.set_data, newdata)
 
 
+# ------------------------------------------------------------ TextureAtlas ---
+def test_texture_atlas():
+    """ Texture atlas grows, adds pages and evicts pages """
+    gl.use_gl('mock')
+    try:
+        mock.reset()
+        evicted = []
+        atlas = TextureAtlas((64, 64), max_shape=(128, 128), max_pages=2,
+                             on_evict=evicted.append)
+        assert atlas.get_free_region(64, 40) == (0, 0, 64, 40)
+        assert atlas.get_free_region(20, 20) == (0, 40, 20, 20)
+        atlas.activate()
+        atlas.deactivate()
+        handle = atlas.handle
+        assert atlas.version == 0
+
+        # The atlas grows, and copies its content on the GPU
+        assert atlas.get_free_region(32, 32) == (20, 40, 32, 32)
+        assert atlas.shape == (128, 64, 3)
+        assert atlas.version == 1
+        assert atlas.get_free_region(100, 10) == (0, 72, 100, 10)
+        assert atlas.shape == (128, 128, 3)
+        mock.commands[:] = []
+        atlas.activate()
+        atlas.deactivate()
+        assert atlas.handle != handle
+        assert not gl.glIsTexture(handle)
+        assert mock.count('glCopyTexSubImage2D') == 1
+        assert mock.commands[[c[0] for c in mock.commands].index(
+            'glCopyTexSubImage2D')][1][-2:] == (64, 64)
+        assert gl.glGetParameter(gl.GL_FRAMEBUFFER_BINDING) == 0
+        assert atlas.get_free_region(200, 10) is None
+
+        # Keyed regions go to other pages when the atlas is full
+        page, region = atlas.allocate('a', 128, 20)
+        assert page is atlas and region == (0, 82, 128, 20)
+        page, region = atlas.allocate('b', 128, 100)
+        assert page is not atlas and region == (0, 0, 128, 100)
+        assert atlas.pages == [atlas, page]
+        assert atlas.version == 2
+        assert atlas.get_region('b') == (page, region)
+        assert atlas.get_region('c') == (None, None)
+
+        # Pages that are used in this frame are not evicted
+        assert atlas.allocate('c', 128, 100) == (None, None)
+        gl.end_frame()
+        atlas.touch(['b'])
+        page, region = atlas.allocate('c', 128, 100)
+        assert page is atlas and region == (0, 0, 128, 100)
+        assert evicted == ['a']
+        assert atlas.get_region('a') == (None, None)
+        assert atlas.version == 3
+
+        # If the content cannot be copied, the regions on it are evicted
+        evicted = []
+        atlas = TextureAtlas((64, 64), max_shape=(128, 128),
+                             on_evict=evicted.append)
+        atlas.allocate('a', 64, 40)
+        atlas.activate()
+        atlas.deactivate()
+        atlas.allocate('b', 64, 40)  # grows the atlas
+        gl.glCheckFramebufferStatus = \
+            lambda target: gl.GL_FRAMEBUFFER_UNSUPPORTED
+        mock.commands[:] = []
+        atlas.activate()
+        atlas.deactivate()
+        assert mock.count('glCopyTexSubImage2D') == 0
+        assert evicted == ['a']
+        assert atlas.get_region('b')[0] is atlas
+        assert atlas.version == 2
+    finally:
+        gl.use_gl()  # Reset to default
+
+
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+import os
+import tempfile
+
+import numpy as np
+from nose.tools import assert_equal, assert_true, assert_raises
+
+from vispy import gloo
+from vispy.gloo import gl, VertexBuffer, Texture2D
+from vispy.gloo.gl import mock
+
+_fnames = []
+
+
+def setup_module():
+    gl.use_gl('mock profile')
+
+
+def teardown_module():
+    gl.use_gl()  # Reset to default
+    gl.profile_proxy.reset()
+    for fname in _fnames:
+        try:
+            os.remove(fname)
+        except OSError:
+            pass
+
+
+def _memmap(shape, dtype):
+    fd, fname = tempfile.mkstemp()
+    os.close(fd)
+    _fnames.append(fname)
+    data = np.memmap(fname, dtype=dtype, mode='w+', shape=shape)
+    data[...] = np.arange(data.size).reshape(shape)
+    return data
+
+
+def _uploads(funcname):
+    return [args for name, args in mock.commands if name == funcname]
+
+
+def test_buffer_memmap():
+    """ Memory-mapped data is uploaded in chunks without copying """
+    mock.reset()
+    data = _memmap((1000, 3), np.float32)
+    V = VertexBuffer(data)
+    assert_true(np.may_share_memory(V.data, data))
+    V._upload_chunk_nbytes = 5000
+    V.activate()
+    uploads = _uploads('glBufferSubData')
+    assert_equal([args[1] for args in uploads], [0, 5000, 10000])
+    assert_equal([args[2].nbytes for args in uploads], [5000, 5000, 2000])
+    assert_equal(V.pending_nbytes, 0)
+    gl.check_error()
+
+
+def test_buffer_bytes():
+    """ Buffers can be created from objects with raw bytes """
+    data = bytearray(np.arange(10, dtype=np.float32).tostring())
+    V = VertexBuffer(data, dtype=np.float32)
+    assert_equal(V.size, 10)
+    assert_true(np.all(V.data['f0'] == np.arange(10)))
+    data[:4] = np.array([42], np.float32).tostring()
+    assert_equal(V.data['f0'][0], 42)  # No copy was made
+
+
+def test_buffer_budget():
+    """ Uploads beyond the budget are done in the next frames """
+    mock.reset()
+    V = VertexBuffer(np.zeros(100, np.float32))
+    assert_raises(ValueError, setattr, V, 'upload_budget', 0)
+    V.upload_budget = 150
+    V.activate()
+    assert_equal(V.pending_nbytes, 250)
+    V.activate()  # Budget of this frame is spent
+    assert_equal(V.pending_nbytes, 250)
+    for i in range(2):
+        gl.end_frame()
+        V.activate()
+    assert_equal(V.pending_nbytes, 0)
+    uploads = _uploads('glBufferSubData')
+    assert_equal([args[1] for args in uploads], [0, 150, 300])
+    gl.check_error()
+
+
+def test_texture_memmap():
+    """ Memory-mapped textures are uploaded in chunks of rows """
+    mock.reset()
+    data = _memmap((10, 20, 3), np.uint8)
+    T = Texture2D(data)
+    assert_true(np.may_share_memory(T.data, data))
+    T.upload_budget = 300  # Five rows per frame
+    T._upload_chunk_nbytes = 200  # Three rows per call
+    for i in range(2):
+        T.activate()
+        gl.end_frame()
+    uploads = _uploads('glTexSubImage2D')
+    assert_equal([args[3] for args in uploads], [0, 3, 5, 8])
+    assert_equal([args[-1].shape[0] for args in uploads], [3, 2, 3, 2])
+    assert_equal(len(T._pending_data), 0)
+    gl.check_error()
+
+
+def test_texture_regions():
+    """ Texture writes are merged into regions before uploading """
+    mock.reset()
+    T = Texture2D(np.zeros((100, 100), np.uint8))
+    T.activate()
+    gl.end_frame()
+    gl.profile_proxy.reset()
+    mock.commands[:] = []
+
+    # Adjacent rows and nearby tiles are merged, far ones are not
+    T[10] = 1
+    T[11] = 2
+    T[12:14, :50] = 3
+    T[90:92, 90:92] = 4
+    T[90, 90] = 5  # overwrites part of the previous write
+    T.activate()
+    uploads = _uploads('glTexSubImage2D')
+    assert_equal([(args[2], args[3]) for args in uploads], [(0, 10),
+                                                            (90, 90)])
+    assert_equal([args[-1].shape[:2] for args in uploads], [(4, 100),
+                                                            (2, 2)])
+    assert_equal(T.data[90:92, 90:92, 0].tolist(), [[5, 4], [4, 4]])
+    gl.end_frame()
+
+    # The whole texture is uploaded if most of it is dirty
+    for i in range(0, 100, 2):
+        T[i] = i
+    T.activate()
+    assert_equal(len(_uploads('glTexSubImage2D')), 2)
+    assert_equal(_uploads('glTexImage2D')[-1][-1].shape, (100, 100, 1))
+    gl.end_frame()
+    gl.check_error()
+
+    events = gl.stats()['events']['texture_upload']
+    assert_equal([(e['writes'], e['uploads'], e['full']) for e in events],
+                 [(5, 2, False), (50, 1, True)])
+    assert_equal(events[0]['nbytes'], 404)
+    assert_equal(events[1]['dirty_nbytes'], 5000)
+
+
+def test_upload_scheduler():
+    """ Upload scheduler shares a per-frame budget between objects """
+    mock.reset()
+    scheduler = gloo.upload_scheduler
+    assert_raises(ValueError, setattr, scheduler, 'nbytes', 0)
+    assert_raises(ValueError, setattr, scheduler, 'seconds', -1)
+    V1 = VertexBuffer(np.zeros(100, np.float32))
+    V2 = VertexBuffer(np.zeros(100, np.float32))
+    T = Texture2D(np.zeros((10, 10), np.float32))
+    assert_true(not V1.resident)
+    scheduler.nbytes = 300
+    try:
+        for B in (V1, V2, T):
+            B.activate()
+        assert_equal(V1.pending_nbytes, 100)
+        assert_equal(V2.pending_nbytes, 400)
+        assert_equal(T.pending_nbytes, 400)
+        assert_equal(scheduler.pending_nbytes, 900)
+        scheduler.run()  # Budget of this frame is spent
+        assert_equal(scheduler.pending_nbytes, 900)
+
+        # The queued objects are uploaded in the next frames
+        gl.end_frame()
+        scheduler.run()
+        assert_equal(V1.pending_nbytes + V2.pending_nbytes, 200)
+        assert_true(V1.resident and not V2.resident)
+        for i in range(3):
+            gl.end_frame()
+            scheduler.run()
+        assert_equal(scheduler.pending_nbytes, 0)
+        assert_true(V2.resident and T.resident)
+        assert_equal(len(scheduler._queue), 0)
+
+        # With a time budget, at least one chunk is uploaded per frame
+        scheduler.nbytes, scheduler.seconds = None, 1e-9
+        V1._upload_chunk_nbytes = 40
+        V1.set_data(np.ones(100, np.float32))
+        gl.end_frame()
+        V1.activate()
+        assert_true(V1.pending_nbytes <= 360)
+        for i in range(9):
+            gl.end_frame()
+            scheduler.run()
+        assert_true(V1.resident)
+    finally:
+        scheduler.nbytes = scheduler.seconds = None
+        scheduler._queue.clear()
+    gl.check_error()
+
+
+def test_gpu_memory():
+    """ GPU memory is accounted, and evicted when over the budget """
+    mock.reset()
+    memory = gloo.gpu_memory
+    assert_raises(ValueError, setattr, memory, 'budget', 0)
+    T1, T2, T3 = [Texture2D(np.zeros((10, 10), np.float32))
+                  for i in range(3)]
+    V = VertexBuffer(np.zeros(100, np.float32), store=False)
+    for ob in (V, T1, T2):
+        ob.activate()
+    assert_equal(memory.count(), 3)
+    assert_equal(memory.nbytes(), 1200)
+    gl.end_frame()
+
+    memory.budget = 1300
+    try:
+        # The least recently activated object with storage is evicted
+        T3.activate()
+        assert_equal(memory.nbytes(), 1200)
+        assert_true(not T1.resident and T2.resident and V.resident)
+        assert_equal(mock.count('glDeleteTexture'), 1)
+
+        # Evicted objects are uploaded again on activation
+        T1.activate()
+        assert_equal(memory.nbytes(), 1200)
+        assert_true(T1.resident and not T2.resident)
+        uploads = _uploads('glTexSubImage2D')
+        assert_equal(len(uploads), 4)
+        assert_equal(uploads[-1][-1].shape, (10, 10, 1))
+
+        # Objects activated in this frame are not evicted
+        T2.activate()
+        assert_equal(memory.nbytes(), 1600)
+        assert_true(T1.resident and T2.resident and T3.resident)
+    finally:
+        memory.budget = None
+
+    T1.delete()
+    assert_equal(memory.count(), 3)
+    assert_equal(memory.nbytes(), 1200)
+    gl.check_error()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+import numpy as np
+from nose.tools import assert_equal, assert_true
+
+from vispy.gloo import gl, Program, VertexBuffer
+from vispy.gloo.gl import mock
+
+
+VERT = """
+attribute vec2 a_position;
+void main() {
+    gl_Position = vec4(a_position, 0.0, 1.0);
+}
+"""
+
+FRAG = """
+void main() {
+    gl_FragColor = vec4(1.0, 1.0, 1.0, 1.0);
+}
+"""
+
+
+def setup_module():
+    gl.use_gl('mock profile')
+
+
+def teardown_module():
+    gl.use_gl()  # Reset to default
+    gl.profile_proxy.reset()
+
+
+def _run_frames(buffers, nframes, update_every=0):
+    for i in range(nframes):
+        for B in buffers:
+            if update_every and i % update_every == 0:
+                B.set_data(B.data)
+            B.activate()
+        gl.end_frame()
+
+
+def test_program_usage():
+    """ Program passes usage hint to the buffers it creates """
+    program = Program(VERT, FRAG, usage='stream')
+    program['a_position'] = np.zeros((10, 2), np.float32)
+    assert_equal(program['a_position'].usage, gl.GL_STREAM_DRAW)
+    program = Program(VERT, FRAG, count=10, usage='static')
+    assert_equal(program._buffer.usage, gl.GL_STATIC_DRAW)
+
+
+def test_auto_usage():
+    """ Usage hint is selected from the updates in the first frames """
+    mock.reset()
+    gl.profile_proxy.reset()
+    data = np.zeros((10, 2), np.float32)
+    static, dynamic, stream = [VertexBuffer(data, usage='auto')
+                               for i in range(3)]
+    for B, every in ((static, 0), (dynamic, 4), (stream, 1)):
+        _run_frames([B], 5, every)
+        assert_equal(B.usage, gl.GL_DYNAMIC_DRAW)
+        _run_frames([B], 10, every)
+        assert_true(not B._auto_usage)
+    assert_equal(static.usage, gl.GL_STATIC_DRAW)
+    assert_equal(dynamic.usage, gl.GL_DYNAMIC_DRAW)
+    assert_equal(stream.usage, gl.GL_STREAM_DRAW)
+
+    # The memory is re-specified with the new hint
+    usages = [args[2] for funcname, args in mock.commands
+              if funcname == 'glBufferData']
+    assert_equal(usages.count(gl.GL_STATIC_DRAW), 1)
+    assert_equal(usages.count(gl.GL_STREAM_DRAW), 1)
+
+    # And the decisions are recorded in the stats
+    events = gl.stats()['events']['usage_hint']
+    assert_equal(sorted(e[1] for e in events),
+                 sorted([gl.GL_STATIC_DRAW, gl.GL_DYNAMIC_DRAW,
+                         gl.GL_STREAM_DRAW]))
@@ -3,11 +3,14 @@
 # Copyright (c) 2014, Vispy Development Team. All Rights Reserved.
 # Distributed under the (new) BSD License. See LICENSE.txt for more info.
 # -----------------------------------------------------------------------------
+from collections import OrderedDict
+
 import numpy as np
 
 from . import gl
-from .globject import GLObject
+from .globject import GLObject, gpu_memory
 from .wrappers import _check_conversion
+from .util import _as_array
 from ..util import logger
 
 
@@ -54,6 +57,28 @@ def _check_texture_format(value):
     return _check_conversion(value, valid_dict)
 
 
+def _box(offset, shape):
+    """ Get the box ((start, stop) for each dimension) of a write. """
+    offset = tuple(offset) + (0,) * (len(shape) - len(offset))
+    return tuple((o, o + s) for o, s in zip(offset, shape))
+
+
+def _box_size(box):
+    size = 1
+    for start, stop in box:
+        size *= stop - start
+    return size
+
+
+def _box_union(box1, box2):
+    return tuple((min(a[0], b[0]), max(a[1], b[1]))
+                 for a, b in zip(box1, box2))
+
+
+def _box_contains(box1, box2):
+    return all(a[0] <= b[0] and b[1] <= a[1] for a, b in zip(box1, box2))
+
+
 # ----------------------------------------------------------- Texture class ---
 class Texture(GLObject):
     """
@@ -103,6 +128,14 @@ class Texture(GLObject):
         # np.dtype(np.float64) : gl.GL_DOUBLE
     }
 
+    # When the pending writes cover more than this fraction of the
+    # texture, the whole texture is uploaded at once.
+    _full_upload_threshold = 0.5
+
+    # The cost of an upload call, in bytes. Pending writes are merged
+    # into their bounding box when uploading it costs less.
+    _upload_call_nbytes = 4096
+
     def __init__(self, data=None, shape=None, dtype=None, base=None,
                  target=None, offset=None, store=True, resizeable=True):
         GLObject.__init__(self)
@@ -120,6 +153,7 @@ class Texture(GLObject):
         # Extra stages that are handled in _activate()
         self._need_resize = False
         self._need_parameterization = True
+        self._respecify = False  # Whether full uploads re-specify
 
         self._interpolation = gl.GL_NEAREST
         self._wrapping = gl.GL_CLAMP_TO_EDGE
@@ -128,10 +162,7 @@ class Texture(GLObject):
         if data is not None:
             self._need_resize = True
             # Handle dtype
-            if dtype is not None:
-                data = np.array(data, dtype=dtype, copy=False)
-            else:
-                data = np.array(data, copy=False)
+            data = _as_array(data, dtype)
             self._dtype = data.dtype
             # Handle shape
             data = self._normalize_shape(data)
@@ -198,6 +229,43 @@ class Texture(GLObject):
 
         return self._base
 
+    @property
+    def pending_nbytes(self):
+        """ Number of bytes waiting to be uploaded """
+
+        return sum([data.nbytes for data, offset in self._pending_data])
+
+    @property
+    def _gpu_nbytes(self):
+        """ Number of bytes used on the GPU (see GPUMemory) """
+
+        if self._need_create or self._base is not None:
+            return 0
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+    def _evict(self):
+        """ Delete the texture from the GPU, and upload it again from the
+        CPU storage when it is activated.
+        """
+
+        if self._base is not None or not self._store or self._data is None:
+            return False
+        self.delete()
+        self._need_resize = True
+        self._need_parameterization = True
+        self._pending_data = [(self._data, (0,) * len(self.shape))]
+        return True
+
+    @property
+    def resident(self):
+        """ Whether the texture exists on the GPU with all its data
+        uploaded (see GLObject.resident).
+        """
+
+        if self._base is not None:
+            return self._base.resident
+        return GLObject.resident.fget(self)
+
     @property
     def data(self):
         """ Texture CPU storage """
@@ -323,11 +391,13 @@ class Texture(GLObject):
 
         # Force using the same data type. We could probably allow it,
         # but with the views and data storage, this is rather complex.
+        data = _as_array(data)
         if data.dtype != self.dtype:
             raise ValueError('Cannot set texture data with another dtype.')
 
         # Copy if needed, check/normalize shape
-        data = np.array(data, copy=copy)
+        if copy:
+            data = data.copy()
         data = self._normalize_shape(data)
 
         # Check data has the right shape
@@ -351,10 +421,11 @@ class Texture(GLObject):
             if offset[i] + data.shape[i] > self.shape[i]:
                 raise ValueError("Data is too large")
 
-        if self._store:
-            pass
-            # todo: @nico should we not update self._data?
-            # but we need to keep the offset into account.
+        # Update the CPU storage (unless data is taken from it)
+        if self._store and self._data is not None:
+            if not np.may_share_memory(data, self._data):
+                slices = [slice(b[0], b[1]) for b in _box(offset, data.shape)]
+                self._data[tuple(slices)] = data
 
         self._pending_data.append((data, offset))
 
@@ -468,7 +539,7 @@ class Texture(GLObject):
         # We have CPU storage
         if self.data is not None:
             self.data[key] = data
-            data = self.data[key]
+            data = self.data[tuple(slices)]
         else:
             # Make sure data is an array
             if not isinstance(data, np.ndarray):
@@ -518,6 +589,11 @@ class Texture(GLObject):
         logger.debug("GPU: Deleting texture")
         gl.glDeleteTexture(self._handle)
 
+    def _garbage(self):
+        """ Deletions to do when the texture is garbage collected """
+
+        return [('glDeleteTexture', self._handle)]
+
     def _activate(self):
         """ Activate texture on GPU """
 
@@ -528,7 +604,10 @@ class Texture(GLObject):
         if self.base is not None:
             return
 
-        # Resize if necessary
+        # Resize if necessary. If not, uploads of the whole texture
+        # re-specify it, so that the driver need not wait until the GPU
+        # is done with the old content.
+        self._respecify = not self._need_resize
         if self._need_resize:
             self._resize()
             self._need_resize = False
@@ -542,14 +621,80 @@ class Texture(GLObject):
         if self._pending_data:
             logger.debug("GPU: Updating texture (%d pending operation(s))" %
                          len(self._pending_data))
+            if len(self._pending_data) > 1:
+                self._merge_pending()
             self._update_data()
 
+        gpu_memory._touch(self)
+
     def _deactivate(self):
         """ Deactivate texture on GPU """
 
         logger.debug("GPU: Deactivate texture")
         gl.glBindTexture(self._target, 0)
 
+    def _merge_pending(self):
+        """ Merge the pending writes before uploading them.
+
+        Writes that are overwritten by a later write are dropped. With
+        CPU storage, the writes are taken from the storage, so that
+        overlapping and nearby writes can be merged into their bounding
+        box when that is cheaper, and the whole texture is uploaded
+        when most of it is dirty. The outcome is recorded in the stats
+        (event 'texture_upload').
+        """
+
+        pending = self._pending_data
+        nwrites = len(pending)
+        dirty_nbytes = sum([data.nbytes for data, offset in pending])
+        boxes = [_box(offset, data.shape) for data, offset in pending]
+
+        # Drop writes that are overwritten by a later write
+        keep = [i for i, box in enumerate(boxes)
+                if not any([_box_contains(b, box) for b in boxes[i+1:]])]
+        pending = [pending[i] for i in keep]
+        boxes = [boxes[i] for i in keep]
+
+        full = False
+        if self._store and self._data is not None:
+            itemsize = self._data.itemsize
+            overhead = self._upload_call_nbytes // itemsize
+
+            # Merge each box with the boxes for which this is cheaper
+            merged = []
+            for box in boxes:
+                i = 0
+                while i < len(merged):
+                    union = _box_union(box, merged[i])
+                    if (_box_size(union) <= _box_size(box) +
+                            _box_size(merged[i]) + overhead):
+                        box = union
+                        del merged[i]
+                        i = 0
+                    else:
+                        i += 1
+                merged.append(box)
+
+            # Upload the whole texture if a large part of it is dirty
+            size = sum([_box_size(box) for box in merged])
+            if size > self._full_upload_threshold * self._data.size:
+                merged = [_box((), self._data.shape)]
+                full = True
+
+            pending = []
+            for box in merged:
+                slices = tuple([slice(start, stop) for start, stop in box])
+                offset = tuple([start for start, stop in box])
+                pending.append((self._data[slices], offset))
+
+        self._pending_data = pending
+        info = dict(writes=nwrites, uploads=len(pending), full=full,
+                    dirty_nbytes=dirty_nbytes,
+                    nbytes=sum([data.nbytes for data, offset in pending]))
+        gl.record_event('texture_upload', info)
+        logger.debug("GPU: Merged %d texture writes into %d uploads" %
+                     (nwrites, len(pending)))
+
     # Taken from pygly
     def _get_alignment(self, width):
         """Determines a textures byte alignment.
@@ -705,6 +850,13 @@ class Texture2D(Texture):
         or GL_RGB, GL_RGBA). If not given the format is chosen automatically
         based on the number of channels. When the data has one channel,
         'luminance' is assumed.
+
+    Notes
+    -----
+    Large data is uploaded in chunks of rows, and at most
+    ``upload_budget`` bytes are uploaded per frame (if set). The data
+    can be a memory-mapped array (np.memmap), which is then streamed to
+    the GPU without reading it into memory at once.
     """
 
     def __init__(self, data=None, shape=None, dtype=None, store=True,
@@ -778,19 +930,32 @@ class Texture2D(Texture):
     def _update_data(self):
         """ Texture update on GPU """
 
-        # Update data
+        # Update data, in chunks of rows and within the upload budget
         while self._pending_data:
             data, offset = self._pending_data.pop(0)
             x, y = 0, 0
             if offset is not None:
                 y, x = offset[0], offset[1]
+            row_nbytes = data[:1].nbytes
+            nrows = self._take_upload(data.nbytes, row_nbytes) // row_nbytes
+            if nrows == 0:
+                self._pending_data.insert(0, (data, offset))
+                break
+            elif nrows < data.shape[0]:
+                rest = (y + nrows, x) + tuple(offset[2:])
+                self._pending_data.insert(0, (data[nrows:], rest))
+                data = data[:nrows]
             # Set alignment (width is nbytes_per_pixel * npixels_per_line)
             alignment = self._get_alignment(data.shape[-2]*data.shape[-1])
             if alignment != 4:
                 gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, alignment)
             #width, height = data.shape[1], data.shape[0]
-            gl.glTexSubImage2D(self.target, 0, x, y, self._format,
-                               self._gtype, data)
+            if self._respecify and data.shape == self.shape:
+                gl.glTexImage2D(self.target, 0, self._format, self._format,
+                                self._gtype, data)
+            else:
+                gl.glTexSubImage2D(self.target, 0, x, y, self._format,
+                                   self._gtype, data)
             if alignment != 4:
                 gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, 4)
          
@@ -818,6 +983,11 @@ class Texture3D(Texture):
         or GL_RGB, GL_RGBA. If not given the format is chosen automatically 
         based on the number of channels. When the data has one channel,
         GL_LUMINANCE is assumed.
+
+    Notes
+    -----
+    Large data is uploaded in chunks of slices (along the first
+    dimension), within the upload budget (see ``Texture2D``).
     """
 
     def __init__(self, data=None, shape=None, dtype=None, store=True, 
@@ -910,11 +1080,21 @@ class Texture3D(Texture):
         except ImportError:
             raise ImportError('PyOpenGL is required for 3D texture support')
 
+        # Update data, in chunks of slices and within the upload budget
         while self._pending_data:
             data, offset = self._pending_data.pop(0)
             x, y, z = 0, 0, 0
             if offset is not None:
                 z, y, x = offset[0], offset[1], offset[2]
+            slice_nbytes = data[:1].nbytes
+            n = self._take_upload(data.nbytes, slice_nbytes) // slice_nbytes
+            if n == 0:
+                self._pending_data.insert(0, (data, offset))
+                break
+            elif n < data.shape[0]:
+                rest = (z + n, y, x) + tuple(offset[3:])
+                self._pending_data.insert(0, (data[n:], rest))
+                data = data[:n]
             # Set alignment (width is nbytes_per_pixel * npixels_per_line)
             alignment = self._get_alignment(data.shape[-3] *
                                             data.shape[-2] * data.shape[-1])
@@ -933,16 +1113,35 @@ class Texture3D(Texture):
 class TextureAtlas(Texture2D):
     """Group multiple small data regions into a larger texture.
 
-    The algorithm is based on the article by Jukka Jylänki : "A Thousand Ways
+    The algorithm is based on the article by Jukka Jylänki : "A Thousand Ways
     to Pack the Bin - A Practical Approach to Two-Dimensional Rectangle Bin
     Packing", February 27, 2010. More precisely, this is an implementation of
     the Skyline Bottom-Left algorithm based on C++ sources provided by Jukka
-    Jylänki at: http://clb.demon.fi/files/RectangleBinPack/.
+    Jylänki at: http://clb.demon.fi/files/RectangleBinPack/.
+
+    When a region does not fit, the atlas grows (doubling its smallest
+    side) up to ``max_shape``. The content that is on the GPU (e.g.
+    rendered via a FrameBuffer) is copied to the larger texture on the
+    GPU. Regions allocated with ``allocate()`` are identified by a key.
+    When the atlas cannot grow anymore, they are put in new pages (other
+    TextureAtlas objects), up to ``max_pages``. After that, the least
+    recently used page is cleared, and ``on_evict`` is called with the
+    key of each region that was on it. Pages with regions that were used
+    in the current frame are not cleared. If the content of a page cannot
+    be copied when it grows (the texture cannot be attached to a
+    FrameBuffer), ``on_evict`` is called for the regions that were lost.
 
     Parameters
     ----------
     shape : tuple of int
         Texture width and height (optional).
+    max_shape : tuple of int | None
+        The max width and height to grow to. Default None (same as
+        shape).
+    max_pages : int
+        The max number of pages for ``allocate()``. Default 1.
+    on_evict : callable | None
+        Function that is called with the key of each evicted region.
 
     Notes
     -----
@@ -953,15 +1152,44 @@ class TextureAtlas(Texture2D):
         >>> bounds = atlas.get_free_region(20, 30)
         >>> atlas.set_region(bounds, np.random.rand(20, 30).T)
     """
-    def __init__(self, shape=(1024, 1024)):
+    def __init__(self, shape=(1024, 1024), max_shape=None, max_pages=1,
+                 on_evict=None):
         shape = np.array(shape, int)
         assert shape.ndim == 1 and shape.size == 2
         shape = tuple(2 ** (np.log2(shape) + 0.5).astype(int)) + (3,)
-        self._atlas_nodes = [(0, 0, shape[1])]
+        if max_shape is None:
+            max_shape = shape[:2]
+        max_shape = np.array(max_shape, int)
+        assert max_shape.ndim == 1 and max_shape.size == 2
+        self._max_shape = tuple(np.maximum(
+            2 ** (np.log2(max_shape) + 0.5).astype(int), shape[:2]))
+        # Skyline nodes (x, y, width), ordered by x
+        self._atlas_nodes = np.array([(0, 0, shape[1])], int)
         data = np.zeros(shape, np.float32)
         super(TextureAtlas, self).__init__(data)
         self.interpolation = 'linear'
         self.wrapping = 'clamp_to_edge'
+        self._gpu_shape = None  # Shape of the content on the GPU
+        self._max_pages = int(max_pages)
+        self._on_evict = on_evict
+        self._pages = [self]
+        self._owner = self  # The atlas that the regions are allocated in
+        # key -> [page, region, frame, version of page at allocation]
+        self._regions = OrderedDict()
+        self._version = 0
+
+    @property
+    def pages(self):
+        """ The pages (TextureAtlas objects) of this atlas """
+        return list(self._pages)
+
+    @property
+    def version(self):
+        """ Number that is increased whenever a page of this atlas grows
+        or is cleared. Normalized texture coordinates of the regions must
+        then be computed again.
+        """
+        return sum(page._version for page in self._pages)
 
     def get_free_region(self, width, height):
         """Get a free region of given size and allocate it
@@ -979,69 +1207,227 @@ class TextureAtlas(Texture2D):
             A newly allocated region as (x, y, w, h) or None
             (if failed).
         """
-        best_height = best_width = np.inf
-        best_index = -1
-        for i in range(len(self._atlas_nodes)):
-            y = self._fit(i, width, height)
-            if y >= 0:
-                node = self._atlas_nodes[i]
-                if (y+height < best_height or
-                        (y+height == best_height and node[2] < best_width)):
-                    best_height = y+height
-                    best_index = i
-                    best_width = node[2]
-                    region = node[0], y, width, height
-        if best_index == -1:
+        found = self._find(width, height)
+        while found is None and self._grow():
+            found = self._find(width, height)
+        if found is None:
             return None
-
-        node = region[0], region[1] + height, width
-        self._atlas_nodes.insert(best_index, node)
-        i = best_index+1
-        while i < len(self._atlas_nodes):
-            node = self._atlas_nodes[i]
-            prev_node = self._atlas_nodes[i-1]
-            if node[0] < prev_node[0]+prev_node[2]:
-                shrink = prev_node[0]+prev_node[2] - node[0]
-                x, y, w = self._atlas_nodes[i]
-                self._atlas_nodes[i] = x+shrink, y, w-shrink
-                if self._atlas_nodes[i][2] <= 0:
-                    del self._atlas_nodes[i]
-                    i -= 1
-                else:
-                    break
-            else:
-                break
-            i += 1
+        index, stop, y = found
+
+        # Replace the nodes under the region with a node on top of it
+        nodes = self._atlas_nodes
+        x = nodes[index, 0]
+        right = nodes[stop:]
+        last = nodes[stop - 1]
+        if last[0] + last[2] > x + width:
+            node = x + width, last[1], last[0] + last[2] - x - width
+            right = np.concatenate(([node], right))
+        nodes = np.concatenate((nodes[:index], [(x, y + height, width)],
+                                right))
 
         # Merge nodes
-        i = 0
-        while i < len(self._atlas_nodes)-1:
-            node = self._atlas_nodes[i]
-            next_node = self._atlas_nodes[i+1]
-            if node[1] == next_node[1]:
-                self._atlas_nodes[i] = node[0], node[1], node[2]+next_node[2]
-                del self._atlas_nodes[i+1]
+        keep = np.ones(len(nodes), bool)
+        keep[1:] = nodes[1:, 1] != nodes[:-1, 1]
+        starts = np.flatnonzero(keep)
+        widths = np.add.reduceat(nodes[:, 2], starts)
+        nodes = nodes[starts]
+        nodes[:, 2] = widths
+        self._atlas_nodes = nodes
+
+        return int(x), int(y), width, height
+
+    def allocate(self, key, width, height):
+        """Allocate a region for the given key, in any page
+
+        Parameters
+        ----------
+        key : object
+            Hashable object that identifies the region.
+        width : int
+            Width of region to allocate
+        height : int
+            Height of region to allocate
+
+        Returns
+        -------
+        page : TextureAtlas | None
+            The page of the region, or None (if failed).
+        bounds : tuple | None
+            The region as (x, y, w, h), or None (if failed).
+        """
+        if key in self._regions:
+            raise ValueError('Region %r is already allocated' % (key,))
+        for page in self._pages:
+            region = page.get_free_region(width, height)
+            if region is not None:
+                break
+        else:
+            if len(self._pages) < self._max_pages:
+                page = TextureAtlas(self._pages[-1].shape[:2],
+                                    self._max_shape)
+                page._owner = self
+                page.interpolation = self._interpolation
+                page.wrapping = self._wrapping
+                self._pages.append(page)
             else:
-                i += 1
-
-        return region
-
-    def _fit(self, index, width, height):
-        """Test if region (width, height) fit into self._atlas_nodes[index]"""
-        node = self._atlas_nodes[index]
-        x, y = node[0], node[1]
-        width_left = width
-        if x+width > self.shape[1]:
-            return -1
-        i = index
-        while width_left > 0:
-            node = self._atlas_nodes[i]
-            y = max(y, node[1])
-            if y+height > self.shape[0]:
-                return -1
-            width_left -= node[2]
-            i += 1
-        return y
+                page = self._evict_page()
+            region = None
+            if page is not None:
+                region = page.get_free_region(width, height)
+            if region is None:
+                return None, None
+        self._regions[key] = [page, region, gl.get_frame_count(),
+                              page._version]
+        return page, region
+
+    def get_region(self, key):
+        """Get the page and bounds of the region with the given key (see
+        ``allocate()``), or (None, None) if there is no such region.
+        """
+        entry = self._regions.get(key)
+        if entry is None:
+            return None, None
+        entry[2] = gl.get_frame_count()
+        return entry[0], entry[1]
+
+    def touch(self, keys):
+        """Mark the regions with the given keys as used in this frame"""
+        frame = gl.get_frame_count()
+        for key in keys:
+            entry = self._regions.get(key)
+            if entry is not None:
+                entry[2] = frame
+
+    def _find(self, width, height):
+        """Find the best position for a region (width, height). Returns
+        (index of first node, index after last node, y) or None.
+        """
+        xs, ys, ws = self._atlas_nodes.T
+        # Nodes index..stop-1 are under a region at the x of node index
+        index = np.arange(len(xs))
+        stop = np.searchsorted(xs, xs + width, 'left')
+        bounds = np.empty(2 * len(xs), int)
+        bounds[0::2], bounds[1::2] = index, stop
+        y = np.maximum.reduceat(np.append(ys, 0), bounds)[0::2]
+        fits = (xs + width <= self.shape[1]) & (y + height <= self.shape[0])
+        if not fits.any():
+            return None
+        # Bottom-left: lowest top edge first, then the narrowest node
+        score = (y + height) * (self.shape[1] + 1) + ws
+        best = index[fits][np.argmin(score[fits])]
+        return best, stop[best], y[best]
+
+    def _grow(self):
+        """Double the smallest side of the atlas (within max_shape),
+        keeping its content. Returns whether the atlas was grown.
+        """
+        height, width = self.shape[:2]
+        if height <= width and height < self._max_shape[0]:
+            height *= 2
+        elif width < self._max_shape[1]:
+            width *= 2
+        elif height < self._max_shape[0]:
+            height *= 2
+        else:
+            return False
+        logger.debug("Growing texture atlas to %sx%s" % (width, height))
+
+        # Add a node for the new columns
+        if width > self.shape[1]:
+            self._atlas_nodes = np.concatenate(
+                (self._atlas_nodes, [(self.shape[1], 0,
+                                      width - self.shape[1])]))
+
+        # Grow, keeping pending writes (their offsets stay valid)
+        data = np.zeros((height, width, self.shape[2]), self.dtype)
+        data[:self.shape[0], :self.shape[1]] = self._data
+        for view in self._views:
+            view._valid = False
+        self._views = []
+        self._shape = data.shape
+        self._data = data
+        self._need_resize = True
+        self._version += 1
+        return True
+
+    def _evict_page(self):
+        """Clear the least recently used page that was not used in this
+        frame, and return it (or None).
+        """
+        frame = gl.get_frame_count()
+        last_used = dict((id(page), -1) for page in self._pages)
+        for entry in self._regions.values():
+            last_used[id(entry[0])] = max(last_used[id(entry[0])], entry[2])
+        page = min(self._pages, key=lambda page: last_used[id(page)])
+        if last_used[id(page)] >= frame:
+            return None
+        keys = [key for key, entry in self._regions.items()
+                if entry[0] is page]
+        page._atlas_nodes = np.array([(0, 0, page.shape[1])], int)
+        page._version += 1
+        self._drop_regions(keys)
+        return page
+
+    def _drop_regions(self, keys):
+        """Forget the regions with the given keys and call on_evict"""
+        for key in keys:
+            del self._regions[key]
+        gl.record_event('atlas_evict', len(keys))
+        if self._on_evict is not None:
+            for key in keys:
+                self._on_evict(key)
+
+    def _create(self):
+        """ Create texture on GPU """
+
+        Texture2D._create(self)
+        self._gpu_shape = None
+
+    def _resize(self):
+        """ Texture resize on GPU, keeping the content if the atlas has
+        grown.
+        """
+
+        if self._gpu_shape is None:
+            Texture2D._resize(self)
+            self._gpu_shape = self.shape
+            return
+
+        # Copy the content of the old texture into a new one
+        logger.debug("GPU: Copying texture atlas content")
+        old_handle, (height, width) = self._handle, self._gpu_shape[:2]
+        self._handle = gl.glCreateTexture()
+        gl.glBindTexture(self.target, self._handle)
+        Texture2D._resize(self)
+        framebuffer = gl.glCreateFramebuffer()
+        previous = gl.glGetParameter(gl.GL_FRAMEBUFFER_BINDING)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, framebuffer)
+        gl.glFramebufferTexture2D(gl.GL_FRAMEBUFFER, gl.GL_COLOR_ATTACHMENT0,
+                                  self.target, old_handle, 0)
+        status = gl.glCheckFramebufferStatus(gl.GL_FRAMEBUFFER)
+        if status == gl.GL_FRAMEBUFFER_COMPLETE:
+            gl.glCopyTexSubImage2D(self.target, 0, 0, 0, 0, 0, width, height)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, previous)
+        gl.glDeleteFramebuffer(framebuffer)
+        gl.glDeleteTexture(old_handle)
+        self._gpu_shape = self.shape
+        self._need_parameterization = True
+
+        if status != gl.GL_FRAMEBUFFER_COMPLETE:
+            # E.g. float textures are not color-renderable on ES 2.0. The
+            # regions that were allocated before the atlas grew are lost
+            # (later regions are not rendered yet).
+            logger.warning("Could not copy texture atlas content "
+                           "(framebuffer status %s)" % status)
+            owner = self._owner
+            keys = [key for key, entry in owner._regions.items()
+                    if entry[0] is self and entry[3] < self._version]
+            self._version += 1
+            owner._drop_regions(keys)
+
+    def _evict(self):
+        # Content that is rendered to the atlas is not in the CPU storage
+        return False
 
 '''
 # ---------------------------------------------------- TextureCubeMap class ---
@@ -1151,6 +1537,11 @@ class TextureCubeMap(Texture):
 
         logger.debug("GPU: Deleting texture")
 
+    def _garbage(self):
+        """ Deletions to do when the texture is garbage collected """
+
+        return []
+
     def _parameterize(self):
         """ Paramaterize texture """
 
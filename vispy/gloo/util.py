@@ -4,9 +4,29 @@
 # Distributed under the (new) BSD License. See LICENSE.txt for more info.
 # -----------------------------------------------------------------------------
 
+import numpy as np
+
 from .wrappers import read_pixels
 
 
+def _as_array(data, dtype=None):
+    """ Get data as a numpy array, without copying it if possible.
+    Objects with raw bytes that support the buffer protocol (e.g.
+    mmap.mmap, bytearray) are wrapped, so that memory-mapped data is
+    not read into memory. Numpy memmaps are used as they are.
+    """
+
+    if not isinstance(data, np.ndarray):
+        try:
+            view = memoryview(data)
+        except TypeError:
+            pass
+        else:
+            if view.ndim <= 1 and view.format in ('B', 'b', 'c'):
+                return np.frombuffer(data, dtype=dtype or np.uint8)
+    return np.array(data, dtype=dtype, copy=False)
+
+
 def _screenshot(viewport=None, alpha=True):
     """ Take a screenshot using glReadPixels. Not sure where to put this
     yet, so a private function for now. Used in make.py.
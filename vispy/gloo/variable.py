@@ -227,6 +227,8 @@ class Uniform(Variable):
             self._data[...] = np.array(data, copy=False).ravel()
 
         self._need_update = True
+        if self._program is not None:
+            self._program._dirty_uniforms.add(self)
 
     def _activate(self):
         # if self._gtype in (gl.GL_SAMPLER_1D, gl.GL_SAMPLER_2D):
@@ -318,8 +320,11 @@ class Attribute(Variable):
         if isinstance(data, VertexBuffer):
             # New vertex buffer
             self._data = data
+            self._invalidate_layout()
         elif isinstance(self._data, VertexBuffer):
             # We already have a vertex buffer
+            if self._data.base is None:
+                data = self._data._convert_data(data)
             self._data[...] = data
         elif (isnumeric or (isinstance(data, (tuple, list)) and
                             len(data) in (1, 2, 3, 4) and
@@ -332,6 +337,7 @@ class Attribute(Variable):
             self._generic = True
             #self._need_update = True
             self._afunction = Attribute._afunctions[self._gtype]
+            self._invalidate_layout()
             return
         else:
             # For array-like, we need to build a proper VertexBuffer
@@ -341,7 +347,8 @@ class Attribute(Variable):
             data = data.ravel().view([self.dtype])
             # WARNING : transform data with the right type
             # data = np.array(data,copy=False)
-            self._data = VertexBuffer(data)
+            self._data = VertexBuffer(data, usage=self._program._usage)
+            self._invalidate_layout()
         
         self._generic = False
 
@@ -385,6 +392,33 @@ class Attribute(Variable):
             gl.glVertexAttribPointer(
                 self.handle, size, gtype, gl.GL_FALSE, stride, offset)
 
+    def _invalidate_layout(self):
+        """ Let the program know that its attribute layout has changed """
+
+        if self._program is not None:
+            self._program._layout = None
+
+    def _get_layout(self):
+        """ Get (location, size, gtype, stride, offset, buffer) of this
+        attribute, for the attribute layout of the program. For generic
+        attributes, size is None and buffer is this attribute.
+        """
+
+        # Check active status (mandatory)
+        if not self._enabled:
+            raise RuntimeError("Attribute %r is not active" % self.name)
+        if self._data is None:
+            raise RuntimeError("Attribute data not set for %r" % self.name)
+
+        if self._need_create:
+            self._create()
+            self._need_create = False
+        if self._generic:
+            return self._handle, None, None, None, None, self
+        size, gtype, dtype = gl_typeinfo[self._gtype]
+        return (self._handle, size, gtype,
+                self.data.stride, self.data.offset, self.data)
+
     def _create(self):
         """ Create attribute on GPU (get handle) """
         self._handle = gl.glGetAttribLocation(self._program.handle, self.name)
@@ -7,7 +7,7 @@ from __future__ import division
 from ..gloo import gl
 from .. import app
 from .subscene import SubScene
-from .transforms import STTransform
+from .transforms import STTransform, TransformCache
 from .events import SceneDrawEvent, SceneMouseEvent
 from ..util import logger
 
@@ -22,6 +22,9 @@ class SceneCanvas(app.Canvas):
         self._fb_stack = []  # for storing information about framebuffers used
         self._vp_stack = []  # for storing information about viewports used
 
+        # Cache of the transform chains of the scene (see SceneEvent)
+        self.transform_cache = TransformCache()
+
         app.Canvas.__init__(self, *args, **kwargs)
         self.events.mouse_press.connect(self._process_mouse_event)
         self.events.mouse_move.connect(self._process_mouse_event)
@@ -63,6 +66,7 @@ class SceneCanvas(app.Canvas):
             self._scene.draw(scene_event)
         finally:
             self.pop_viewport()
+            self.transform_cache.roll()
         
         if len(self._vp_stack) > 0:
             logger.warn("Viewport stack not fully cleared after draw.")
@@ -5,7 +5,6 @@
 from __future__ import division
 
 from ..util.event import Event
-from .transforms import ChainTransform
 
 
 class SceneEvent(Event):
@@ -117,8 +116,7 @@ class SceneEvent(Event):
                 break
         
         tr = [e.transform for e in path]
-        # TODO: cache transform chains
-        return ChainTransform(tr)
+        return self.canvas.transform_cache.get(tr)
     
     def map_entity_to_doc(self, entity, obj):
         return self.entity_transform(entity).map(obj)
@@ -142,8 +140,7 @@ class SceneEvent(Event):
         top-level entity in the scene.
         """
         tr = [e.transform for e in self._stack]
-        # TODO: cache transform chains
-        return ChainTransform(tr)
+        return self.canvas.transform_cache.get(tr)
 
     @property
     def render_transform(self):
@@ -156,14 +153,18 @@ class SceneEvent(Event):
 
         Most entities should use this transform when drawing.
         """
-        return self.canvas.render_transform * self.full_transform
+        tr = [e.transform for e in self._stack]
+        return self.canvas.transform_cache.get_rooted(
+            'render', self.canvas.render_transform, tr)
 
     @property
     def fb_transform(self):
         """ Transform mapping from the local coordinate system of the current
         entity to the framebuffer coordinate system.
         """
-        return self.canvas.fb_transform * self.full_transform
+        tr = [e.transform for e in self._stack]
+        return self.canvas.transform_cache.get_rooted(
+            'fb', self.canvas.fb_transform, tr)
     
     def map_to_fb(self, obj):
         return self.fb_transform.map(obj)
@@ -5,8 +5,8 @@
 from __future__ import division, print_function
 import re
 
-from ...gloo import Program, VertexShader, FragmentShader
-from .function import Function, FunctionChain
+from ...gloo import Program, VertexShader, FragmentShader, gl
+from .function import Function, FunctionChain, Variable
 from . import parsing
 from ...util import logger
 from ...ext.six import string_types
@@ -52,6 +52,11 @@ class ModularProgram(Program):
         GLSL code for vertex shader main function
     fmain : str
         GLSL code for fragment shader main function
+    minify : bool
+        If True, comments, redundant whitespace and functions that are
+        not used are removed from the generated shaders, which makes them
+        faster to compile. Default False (the generated code is kept
+        readable for debugging).
 
     Upon initialization, the GLSL code is searched for undefined function
     prototypes.
@@ -93,10 +98,11 @@ class ModularProgram(Program):
         func['input_position'] = VertexBuffer(...)
 
     """
-    def __init__(self, vmain, fmain):
+    def __init__(self, vmain, fmain, minify=False):
         Program.__init__(self)
         self.vmain = vmain
         self.fmain = fmain
+        self.minify = minify
 
         # keep track of attached shaders
         self.vshader = None
@@ -121,8 +127,14 @@ class ModularProgram(Program):
         # hook definitions
         self._hook_defs = {}  # {'hook_name': Function}
         
-        # Cache state of Variables so we know which ones require update
-        self._variable_state = {}
+        # Names of the variables whose value must be applied. Variables
+        # notify the program when their value changes.
+        self._dirty_variables = set()
+
+        # Fingerprint of the hook graph that the shaders were compiled
+        # for, and the objects of that graph (see _fingerprint)
+        self._build_fingerprint = None
+        self._build_objects = []
 
         self._find_hooks()
 
@@ -266,28 +278,120 @@ class ModularProgram(Program):
             self._need_build = False
     
     def _build(self):
-        # generate all code..
-        self._compile()
+        # If the hook graph has the same structure as when the shaders were
+        # compiled (e.g. a transform was replaced by another transform of
+        # the same type), the new objects take the names of the old ones,
+        # and only their variables are applied.
+        fingerprint, objects = self._fingerprint()
+        if (fingerprint == self._build_fingerprint and
+                self.vshader is not None):
+            logger.debug("Hook graph is unchanged; not recompiling")
+            self._rename(objects)
+            if self._get_link_entry() is not None:
+                return
+        else:
+            # generate all code..
+            self._compile()
 
-        if self.vshader is not None:
-            self.detach([self.vshader, self.fshader])
-            self.vshader = self.fshader = None
+            if self.vshader is not None:
+                self.detach([self.vshader, self.fshader])
+                self.vshader = self.fshader = None
 
-        vs = VertexShader(self.vert_code)
-        fs = FragmentShader(self.frag_code)
-        self.attach([vs, fs])
-        self.vshader = vs
-        self.fshader = fs
+            vs = VertexShader(self.vert_code)
+            fs = FragmentShader(self.frag_code)
+            self.attach([vs, fs])
+            self.vshader = vs
+            self.fshader = fs
+            self._build_fingerprint = fingerprint
+            self._build_objects = objects
 
         # and continue.
         super(ModularProgram, self)._build()
 
+    def _fingerprint(self):
+        """
+        Return a fingerprint of the structure of the hook graph, and the
+        list of objects in the graph, in the order in which they appear
+        in the fingerprint. The fingerprint depends on the code of the
+        functions and on the names and types of the variables, but not on
+        the variable values. Objects that appear more than once in the
+        graph are referred to by their index in the list.
+        """
+        index = {}  # {object: index in objects}
+        objects = []
+        items = []
+        for hook_name, func in self._hook_defs.items():
+            items.append(hook_name)
+            if func is None:
+                items.append(None)
+                continue
+            for obj in self._function_dependencies(func):
+                if obj in index:
+                    items.append(index[obj])
+                    continue
+                index[obj] = len(objects)
+                objects.append(obj)
+                if isinstance(obj, Variable):
+                    spec = obj.spec
+                    items.append(('variable', obj.name, obj.is_anonymous,
+                                  None if spec is None else spec[:2]))
+                elif isinstance(obj, FunctionChain):
+                    items.append(('chain', obj.name, obj.is_anonymous,
+                                  tuple([index[f] for f in obj._funcs])))
+                elif isinstance(obj, Function):
+                    names = sorted(obj.template_vars)
+                    items.append(('function', obj.code,
+                                  tuple([(name, index[obj[name]])
+                                         for name in names])))
+                else:
+                    items.append(obj)
+        return tuple(items), objects
+
+    def _rename(self, objects):
+        """
+        Give the objects of the hook graph the names (and compiled code)
+        of the objects at the same position in the graph that the shaders
+        were compiled for.
+        """
+        new = dict(zip(self._build_objects, objects))
+        old_namespace = self.namespace
+        self.namespace = dict([(name, new.get(obj, obj))
+                               for name, obj in self.namespace.items()])
+        self._object_names = dict([(new.get(obj, obj), name) for obj, name
+                                   in self._object_names.items()])
+        self._object_code = dict([(new.get(obj, obj), code) for obj, code
+                                  in self._object_code.items()])
+        self._build_objects = objects
+        self._track_variables(old_namespace)
+
+    def _track_variables(self, old_namespace):
+        """
+        Let the variables in the new namespace notify this program of value
+        changes, and stop those that are not in it anymore. All variables
+        must be applied.
+        """
+        for name, obj in (old_namespace or {}).items():
+            if (isinstance(obj, Variable) and
+                    self.namespace.get(name) is not obj):
+                obj._detach(self)
+        self._dirty_variables = set()
+        for name, obj in self.namespace.items():
+            if isinstance(obj, Variable) and obj.vtype != 'varying':
+                obj._attach(self, name)
+                self._dirty_variables.add(name)
+
+    def _variable_changed(self, name):
+        """
+        Called by a variable in the namespace when its value has changed.
+        """
+        self._dirty_variables.add(name)
+
     def _activate_variables(self):
         # set all variables
         self._apply_variables()
-        
+
         super(ModularProgram, self)._activate_variables()
-        
+
     def _find_hooks(self):
         # Locate all undefined function prototypes in both shaders
         vprots = parsing.find_prototypes(self.vmain)
@@ -311,6 +415,7 @@ class ModularProgram(Program):
         all_objs = []
 
         # map of {name: object} for this compilation
+        old_namespace = self.namespace
         self.namespace = namespace = {}
 
         # 1) Walk over all hook definitions and collect a list of their object
@@ -340,7 +445,12 @@ class ModularProgram(Program):
 
         # 2) Add objects with fixed names to the namespace
         anon = []  # keep track of all anonymous objects
+        seen = set()
         for obj in all_objs:
+            if obj in seen:
+                # shared by several functions
+                continue
+            seen.add(obj)
             if obj.is_anonymous:
                 anon.append(obj)
             else:
@@ -397,6 +507,15 @@ class ModularProgram(Program):
         # 6) Assemble shaders
         self.vert_code = '\n'.join(shader_code['vertex'])
         self.frag_code = '\n'.join(shader_code['fragment'])
+        if self.minify:
+            size = len(self.vert_code) + len(self.frag_code)
+            self.vert_code = parsing.minify(self.vert_code)
+            self.frag_code = parsing.minify(self.frag_code)
+            new_size = len(self.vert_code) + len(self.frag_code)
+            logger.debug("Minified shaders from %d to %d characters"
+                         % (size, new_size))
+            gl.record_event('minify', (size, new_size))
+        self._track_variables(old_namespace)
 
         logger.debug('==================== VERTEX SHADER ====================')
         logger.debug(self.vert_code)
@@ -470,15 +589,14 @@ class ModularProgram(Program):
 
     def _apply_variables(self):
         """
-        Apply all program variables that are carried by the components of this
-        program.
+        Apply the program variables that are carried by the components of this
+        program and that have changed. The number of applied variables is
+        recorded in the stats (event 'variables').
         """
-        logger.debug("Apply variables:")
-        for name, spec in self.namespace.items():
-            if isinstance(spec, Function) or spec.vtype == 'varying':
-                continue
-            logger.debug("    %s = %s" % (name, spec.value))
-            state_id = spec.state_id
-            if self._variable_state.get(name, None) != state_id:
-                self[name] = spec.value
-                self._variable_state[name] = state_id
+        if not self._dirty_variables:
+            return
+        dirty, self._dirty_variables = self._dirty_variables, set()
+        for name in dirty:
+            self[name] = self.namespace[name].value
+        logger.debug("Applied %d variables" % len(dirty))
+        gl.record_event('variables', len(dirty))
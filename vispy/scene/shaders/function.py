@@ -4,8 +4,10 @@
 
 from __future__ import division
 import string
+import weakref
 
 from . import parsing
+from ...util import lru_cache
 from ...util.event import EmitterGroup, Event
 from ...ext.six import string_types
 
@@ -69,6 +71,7 @@ class Variable(ShaderObject):
     """
     def __init__(self, function, name, spec=None, anonymous=False):
         self._state_counter = 0
+        self._programs = None  # {program: name} of programs using this
         super(Variable, self).__init__()
         self.function = function
         self._name = name  # local name within the function
@@ -125,6 +128,20 @@ class Variable(ShaderObject):
     def spec(self, s):
         self._spec = s
         self._state_counter += 1
+        if self._programs:
+            for program, name in list(self._programs.items()):
+                program._variable_changed(name)
+
+    def _attach(self, program, name):
+        """Notify *program* when the value changes; *name* is the name of
+        this variable in the program."""
+        if self._programs is None:
+            self._programs = weakref.WeakKeyDictionary()
+        self._programs[program] = name
+
+    def _detach(self, program):
+        if self._programs is not None:
+            self._programs.pop(program, None)
         
     @property
     def state_id(self):
@@ -138,6 +155,28 @@ class Variable(ShaderObject):
                 (self.name, self.function.name, id(self)))
 
 
+@lru_cache()
+def _parse_template(code):
+    """
+    Parse the code of a Function. Returns (signature, anonymous,
+    template_vars, template), which is shared by all Functions with this
+    code, and therefore immutable.
+    """
+    name, args, rtype = parsing.parse_function_signature(code)
+    args = tuple(args)
+    anon = name.startswith('$')
+    if anon:
+        name = name[1:]
+    # find all template variables, excluding the function name
+    template_vars = set()
+    for var in parsing.find_template_variables(code):
+        var = var.lstrip('$')
+        if var != name:
+            template_vars.add(var)
+    template = string.Template(Function.clean_code(code))
+    return (name, args, rtype), anon, frozenset(template_vars), template
+
+
 class Function(ShaderObject):
     """
     This class represents a single function in GLSL. Its *code* property
@@ -231,7 +270,7 @@ class Function(ShaderObject):
 
             [(arg_name, arg_type), ...]
         """
-        return self.signature[1]
+        return list(self.signature[1])
 
     @property
     def rtype(self):
@@ -292,29 +331,17 @@ class Function(ShaderObject):
         # string.Template instance used to compile code with new function /
         # variable names.
         if self._str_template is None:
-            self._str_template = \
-                string.Template(Function.clean_code(self.code))
+            self._str_template = _parse_template(self.code)[3]
         return self._str_template
 
     def _parse_signature(self):
         # Search code for function signature and template variables
-        name, args, rtype = parsing.parse_function_signature(self.code)
-        anon = name.startswith('$')
-        if anon:
-            name = name[1:]
-        self._anonymous = anon
-
-        self._signature = (name, args, rtype)
+        self._signature, self._anonymous = _parse_template(self.code)[:2]
 
     def _parse_template_vars(self):
         # find all template variables in self.code, excluding the function
         # name.
-        self._template_vars = set()
-        for var in parsing.find_template_variables(self.code):
-            var = var.lstrip('$')
-            if var == self.name:
-                continue
-            self._template_vars.add(var)
+        self._template_vars = _parse_template(self.code)[2]
 
     #def _parse_program_vars(self):
         ## should find all statically-defined program variables and populate
@@ -6,6 +6,8 @@ from __future__ import division
 
 import re
 
+from ...util import lru_cache
+
 # regular expressions for parsing GLSL
 re_type = r'(?:void|int|float|vec2|vec3|vec4|mat2|mat3|mat4)'
 re_identifier = r'(?:[a-zA-Z_][\w_]*)'
@@ -108,3 +110,86 @@ def find_template_variables(code):
 
     """
     return re.findall(re_template_var, code)
+
+
+# comments like "// ..." and "/* ... */"
+re_comment = r"//[^\n]*|/\*.*?\*/"
+
+# identifiers that may refer to functions
+re_reference = r"\b" + re_identifier + r"\b"
+
+
+def _match_brace(code, start):
+    """
+    Return the index just past the brace that closes the brace at *start*.
+    """
+    depth = 0
+    for i in range(start, len(code)):
+        if code[i] == '{':
+            depth += 1
+        elif code[i] == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    raise Exception("Unbalanced braces in shader code.")
+
+
+@lru_cache(maxsize=128)
+def minify(code):
+    """
+    Return *code* with comments, redundant whitespace and unused functions
+    removed.
+
+    A function is used if it is called (directly or indirectly) from main,
+    or referred to anywhere outside of a function definition (e.g. in a
+    macro). Prototypes are removed along with their function. Code that
+    is not understood is kept as it is.
+    """
+    code = re.sub(re_comment, '', code, flags=re.S)
+
+    # Split the code into top-level function definitions and prototypes,
+    # and everything else.
+    chunks = []  # [(function name or None, code), ...]
+    regex = re.compile(r"^\s*(?:" + re_func_decl + r"\s*{|" +
+                       re_func_prot + ")", re.M)
+    pos = 0
+    while True:
+        m = regex.search(code, pos)
+        if m is None:
+            break
+        chunks.append((None, code[pos:m.start()]))
+        name = m.group(2) or m.group(10)
+        if m.group(2) is None:
+            end = m.end()  # prototype
+        else:
+            end = _match_brace(code, m.end() - 1)
+        chunks.append((name, code[m.start():end]))
+        pos = end
+    chunks.append((None, code[pos:]))
+
+    # Find the functions that are reachable from main and the other code
+    refs = {}  # {function name: set of referenced names}
+    for name, text in chunks:
+        refs.setdefault(name, set()).update(re.findall(re_reference, text))
+    used = set()
+    todo = ['main'] + list(refs.pop(None))
+    while todo:
+        name = todo.pop()
+        if name in used or name not in refs:
+            continue
+        used.add(name)
+        todo.extend(refs[name])
+
+    code = ''.join(text for name, text in chunks
+                   if name is None or name in used)
+
+    # Collapse whitespace, but keep lines and spaces for preprocessor
+    # directives (e.g. "#define A (x)" is not "#define A(x)")
+    lines = []
+    for line in code.split('\n'):
+        line = re.sub(r"\s+", ' ', line).strip()
+        if line and not line.startswith('#'):
+            line = re.sub(r" ?([{}();,]) ?", r"\1", line)
+        if line:
+            lines.append(line)
+    return '\n'.join(lines)
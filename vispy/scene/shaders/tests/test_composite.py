@@ -1,6 +1,10 @@
-from nose.tools import assert_raises
+import numpy as np
+from nose.tools import assert_raises, assert_equal, assert_true
 
-from vispy.scene.shaders.function import Function, Variable
+from vispy.gloo import gl
+from vispy.gloo.gl import mock
+from vispy.scene.shaders.function import Function, FunctionChain, Variable
+from vispy.scene.shaders.composite import ModularProgram
 
 
 def test_function():
@@ -53,6 +57,187 @@ def test_function():
     assert(func3.name == 'some_function')
 
 
+def test_program_rebuild():
+    """ ModularProgram only recompiles when the hook graph changes """
+    vmain = """
+    vec4 map_position(vec4);
+    attribute vec2 a_position;
+    void main() {
+        gl_Position = map_position(vec4(a_position, 0, 1));
+    }
+    """
+    fmain = """
+    void main() {
+        gl_FragColor = vec4(1, 1, 1, 1);
+    }
+    """
+    code = """
+    vec4 $scale(vec4 pos) {
+        return pos * $factor;
+    }
+    """
+
+    def scale(factor):
+        func = Function(code)
+        func['factor'] = ('uniform', 'vec4', factor)
+        return func
+
+    def draw(program):
+        program.prepare()
+        program['a_position'] = np.zeros((3, 2), np.float32)
+        program.draw('triangles')
+
+    gl.use_gl('mock')
+    try:
+        mock.reset()
+        program = ModularProgram(vmain, fmain)
+        program['map_position'] = scale((1, 1, 1, 1))
+        draw(program)
+        assert_equal(mock.count('glLinkProgram'), 1)
+        name = program._object_names[program.namespace['map_position'][
+            'factor']]
+
+        # Another function with the same code does not relink
+        program['map_position'] = scale((2, 2, 2, 2))
+        draw(program)
+        assert_equal(mock.count('glLinkProgram'), 1)
+        assert_equal(mock.count('glCompileShader'), 2)
+        loc = gl.glGetUniformLocation(program.handle, name)
+        assert_equal(tuple(gl.glGetUniform(program.handle, loc)),
+                     (2, 2, 2, 2))
+
+        # The same structure in a chain does not relink either
+        program['map_position'] = FunctionChain(None, [scale((1, 1, 1, 1)),
+                                                       scale((3, 3, 3, 3))])
+        draw(program)
+        assert_equal(mock.count('glLinkProgram'), 2)
+        program['map_position'] = FunctionChain(None, [scale((1, 1, 1, 1)),
+                                                       scale((4, 4, 4, 4))])
+        draw(program)
+        assert_equal(mock.count('glLinkProgram'), 2)
+
+        # Variables that are shared change the structure
+        first, second = scale((1, 1, 1, 1)), Function(code)
+        second['factor'] = first['factor']
+        program['map_position'] = FunctionChain(None, [first, second])
+        draw(program)
+        assert_equal(mock.count('glLinkProgram'), 3)
+        gl.check_error()
+    finally:
+        gl.use_gl()  # Reset to default
+
+
+def test_program_variables():
+    """ ModularProgram only applies variables that have changed """
+    vmain = """
+    vec4 map_position(vec4);
+    attribute vec2 a_position;
+    void main() {
+        gl_Position = map_position(vec4(a_position, 0, 1));
+    }
+    """
+    fmain = """
+    void main() {
+        gl_FragColor = vec4(1, 1, 1, 1);
+    }
+    """
+    func = Function("""
+    vec4 $transform(vec4 pos) {
+        return pos * $scale + $translate;
+    }
+    """)
+    func['scale'] = ('uniform', 'vec4', (1, 1, 1, 1))
+    func['translate'] = ('uniform', 'vec4', (0, 0, 0, 0))
+
+    def applied():
+        gl.end_frame()
+        events = gl.stats()['events'].get('variables', [])
+        gl.profile_proxy.reset()
+        return sum(events)
+
+    gl.use_gl('mock profile')
+    try:
+        mock.reset()
+        program = ModularProgram(vmain, fmain)
+        program['map_position'] = func
+        program.prepare()
+        program['a_position'] = np.zeros((3, 2), np.float32)
+        gl.profile_proxy.reset()
+        program.draw('triangles')
+        assert_equal(applied(), 2)
+
+        # Nothing is applied in frames without changes
+        program.draw('triangles')
+        program.draw('triangles')
+        assert_equal(applied(), 0)
+
+        # Changed variables notify the program
+        func['scale'] = ('uniform', 'vec4', (2, 2, 2, 2))
+        program.draw('triangles')
+        assert_equal(applied(), 1)
+        assert_equal(mock.count('glUniform4fv'), 3)
+
+        # Variables that are not in the program anymore do not
+        old = func['translate']
+        program['map_position'] = Function("""
+        vec4 $transform(vec4 pos) {
+            return pos;
+        }
+        """)
+        program.prepare()
+        program['a_position'] = np.zeros((3, 2), np.float32)
+        program.draw('triangles')
+        assert_equal(applied(), 0)
+        func['translate'] = ('uniform', 'vec4', (1, 1, 1, 1))
+        assert_true(program not in old._programs)
+        assert_equal(program._dirty_variables, set())
+    finally:
+        gl.use_gl()  # Reset to default
+
+
+def test_program_minify():
+    """ ModularProgram removes unused functions from its shaders """
+    vmain = """
+    vec4 map_position(vec4);
+    vec4 map_unused(vec4);
+    attribute vec2 a_position;
+    void main() {
+        // map_unused is not called
+        gl_Position = map_position(vec4(a_position, 0, 1));
+    }
+    """
+    fmain = """
+    void main() {
+        gl_FragColor = vec4(1, 1, 1, 1);
+    }
+    """
+    code = """
+    vec4 $transform(vec4 pos) {
+        return pos * $scale;
+    }
+    """
+
+    gl.use_gl('mock profile')
+    try:
+        sizes = []
+        for minify in (False, True):
+            program = ModularProgram(vmain, fmain, minify=minify)
+            for hook in ('map_position', 'map_unused'):
+                func = Function(code)
+                func['scale'] = ('uniform', 'vec4', (1, 1, 1, 1))
+                program[hook] = func
+            gl.profile_proxy.reset()
+            program.prepare()
+            sizes.append(len(program.vert_code) + len(program.frag_code))
+            assert_equal(minify, 'map_unused' not in program.vert_code)
+            assert_true('map_position' in program.vert_code)
+            assert_equal(minify, '//' not in program.vert_code)
+        gl.end_frame()
+        assert_equal(gl.stats()['events']['minify'], [tuple(sizes)])
+    finally:
+        gl.use_gl()  # Reset to default
+
+
 #vmain = """
 #vec3 my_hook1(vec2 x, float y);
 #vec3 my_hook2(vec2 x);
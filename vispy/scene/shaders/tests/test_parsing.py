@@ -1,5 +1,7 @@
 import re
-from vispy.scene.shaders.parsing import re_identifier
+from vispy.scene.shaders.parsing import (re_identifier, minify,
+                                         find_prototypes)
+from vispy.scene.shaders.function import Function
 
 
 def test_identifier():
@@ -10,3 +12,65 @@ def test_identifier():
     assert(re.match(re_identifier, '7Ax2_d3__7') is None)
     assert(re.match('('+re_identifier+')', 'x,y').groups()[0] == 'x')
     assert(re.match('('+re_identifier+')', 'x y').groups()[0] == 'x')
+
+
+def test_parse_cache():
+    code = """
+    vec4 $scale(vec4 pos) {
+        return pos * $factor;
+    }
+    """
+    func1, func2 = Function(code), Function(code + ' ')
+    func3 = Function(code)
+    assert func1.name == func3.name == 'scale'
+    assert func1.template_vars == set(['factor'])
+    # Functions with the same code share the parse results
+    assert func1.signature is func3.signature
+    assert func1.template_vars is func3.template_vars
+    assert func1._template is func3._template
+    assert func1.signature is not func2.signature
+    # but not their variables
+    func1['factor'] = ('uniform', 'vec4', (1, 1, 1, 1))
+    func3['factor'] = ('uniform', 'vec4', (2, 2, 2, 2))
+    assert func1['factor'] is not func3['factor']
+    # The shared results cannot be modified via the Functions
+    func1.args.append(('vec4', 'other'))
+    assert func3.args == [('vec4', 'pos')]
+    prots = find_prototypes('vec4 hook(vec4);')
+    prots[0][1].append(('vec4', ))
+    assert find_prototypes('vec4 hook(vec4);') == [('hook', [('vec4', )],
+                                                    'vec4')]
+
+
+def test_minify():
+    code = """
+    #define SCALE(x) scale(x)  // macros may call functions
+    vec4 transform(vec4);
+    vec4 unused(vec4 pos);
+    float scale(float x) { return x * 2.0; }
+    float offset(float x) { return x + 1.0; }
+    /* The main function
+       { */
+    void main() {
+        gl_Position = transform(vec4(1, 2, 3, 4));
+    }
+    vec4 transform(vec4 pos) {
+        if (pos.x > 0.0) { pos.x = offset(pos.x); }
+        return SCALE(pos);
+    }
+    vec4 unused(vec4 pos) {
+        return offset(pos);
+    }
+    """
+    expected = ("#define SCALE(x) scale(x)\n"
+                "vec4 transform(vec4);\n"
+                "float scale(float x){return x * 2.0;}\n"
+                "float offset(float x){return x + 1.0;}\n"
+                "void main(){\n"
+                "gl_Position = transform(vec4(1,2,3,4));\n"
+                "}\n"
+                "vec4 transform(vec4 pos){\n"
+                "if(pos.x > 0.0){pos.x = offset(pos.x);}\n"
+                "return SCALE(pos);\n"
+                "}")
+    assert minify(code) == expected
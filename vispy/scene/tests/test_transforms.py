@@ -159,6 +159,85 @@ def test_st_mapping():
     assert np.allclose(t.map(p1)[:, :len(p2)], p2)
 
 
+def test_transform_version():
+    s = ST(scale=(2, 3))
+    a = AT()
+    v = s.version
+    fn = s.shader_map()
+    scale = fn['scale']
+    # Setting the same values does not change the transform
+    s.scale = (2, 3)
+    s.set_mapping([[0, 0], [1, 1]], [[0, 0], [2, 3]])
+    assert s.version == v
+    assert s.shader_map()['scale'] is scale
+    spec = scale.spec
+    s.shader_map()
+    assert scale.spec is spec  # variables are not set again
+    s.translate = (1, 1)
+    assert s.version == v + 1
+    s.shader_map()
+    assert scale.spec is not spec
+
+    v = a.version
+    a.rotate(90, (0, 0, 1))
+    assert a.version == v + 1
+
+    chain = CT(s, a)
+    v = chain.version
+    s.scale = (4, 4)
+    assert chain.version == v + 1
+    fn = chain.shader_map()
+    chain.append(NT())
+    assert chain.version == v + 2
+    assert chain.shader_map() is not fn
+
+
+def test_transform_cache():
+    s, a, lt = ST(), AT(), LT()
+    cache = tr.TransformCache(max_age=1)
+    chain = cache.get([s, a])
+    assert chain.transforms == [s, a]
+    assert cache.get((s, a)) is chain
+    assert cache.get([a, s]) is not chain
+    # Chains remain valid when their transforms change
+    s.scale = (2, 2)
+    fn = chain.shader_map()
+    assert cache.get([s, a]) is chain
+    assert chain.shader_map() is fn
+    assert np.allclose(chain.map((1, 1))[:2], (2, 2))
+
+    # Nested chains are flattened again when they change
+    nested = CT(a)
+    chain = cache.get([s, nested])
+    assert chain.transforms == [s, a]
+    nested.append(lt)
+    chain2 = cache.get([s, nested])
+    assert chain2 is not chain
+    assert chain2.transforms == [s, a, lt]
+
+    # Chains can start with a transform that is created for each call
+    chain = cache.get_rooted('render', ST(scale=(2, 2)), [a])
+    root = chain.transforms[0]
+    assert chain.transforms[1:] == [a]
+    assert cache.get_rooted('render', ST(scale=(2, 2)), [a]) is chain
+    v = root.version
+    chain3 = cache.get_rooted('render', ST(scale=(3, 3)), [a])
+    assert chain3 is not chain
+    assert root.version == v  # earlier chains do not change
+    assert np.allclose(chain.map((1, 1))[:2], (2, 2))
+    assert np.allclose(chain3.map((1, 1))[:2], (3, 3))
+    assert cache.get_rooted('render', ST(scale=(2, 2)), [a]) is chain
+    assert cache.get_rooted('fb', ST(scale=(2, 2)), [a]) is not chain
+
+    # Chains that are not used are removed
+    cache.roll()
+    assert cache.get([s, nested]) is chain2
+    cache.roll()
+    cache.roll()
+    assert cache.get([s, nested]) is not chain2
+    assert cache.get_rooted('render', ST(scale=(2, 2)), [a]) is not chain
+
+
 if __name__ == '__main__':
     for key in [key for key in globals()]:
         if key.startswith('test_'):
@@ -55,6 +55,9 @@ class Transform(object):
     Optionally, an inverse() method returns a new Transform performing the
     inverse mapping.
 
+    Each Transform has a version number that is increased whenever the
+    transform changes (see update()).
+
     Note that although all classes should define both map() and imap(), it
     is not necessarily the case that imap(map(x)) == x; there may be instances
     where the inverse mapping is ambiguous or otherwise meaningless.
@@ -85,6 +88,9 @@ class Transform(object):
     def __init__(self):
         self._shader_map = Function(self.glsl_map)
         self._shader_imap = Function(self.glsl_imap)
+        self._version = 0
+        # versions that the shader map / imap variables were last set for
+        self._shader_versions = [None, None]
 
     def map(self, obj):
         """
@@ -129,13 +135,31 @@ class Transform(object):
         #return self._resolve(name, var_prefix, imap=True)
         return self._shader_imap
 
+    @property
+    def version(self):
+        """ Number that is increased whenever this Transform changes.
+        """
+        return self._version
+
     def update(self):
         """
         Called to inform any listeners that this Transform has changed.
         """
+        self._version += 1
         self._shader_map.update()
         self._shader_imap.update()
 
+    def _shader_outdated(self, imap):
+        """
+        Return True if the variables of the shader map (or imap) must be set,
+        because this Transform changed since they were last set. Subclasses
+        use this to avoid setting (and applying) unchanged variables.
+        """
+        if self._shader_versions[imap] == self._version:
+            return False
+        self._shader_versions[imap] = self._version
+        return True
+
     #def _resolve(self, name, var_prefix, imap):
         ## The default implemntation assumes the following:
         ## * The first argument to the GLSL function should not be bound
@@ -312,15 +336,16 @@ class ChainTransform(Transform):
                 trs.append(tr)
         self._transforms = trs
 
+        # ChainTransform does not have shader maps
+        self._shader_map = None
+        self._shader_imap = None
+        self._version = 0
+
         # Post-process
         self.flatten()
         #if simplify:
         #    self.simplify()
 
-        # ChainTransform does not have shader maps
-        self._shader_map = None
-        self._shader_imap = None
-
     @property
     def transforms(self):
         """ Get the list of transform that make up the transform chain.
@@ -335,6 +360,22 @@ class ChainTransform(Transform):
 #             raise TypeError("Transform chain must be a list")
 #         self._transforms = tr
 
+    @property
+    def version(self):
+        """ Number that is increased whenever this chain or any of its
+        transforms changes.
+        """
+        return self._version + sum(tr.version for tr in self._transforms)
+
+    def update(self):
+        """
+        Called when the list of transforms has changed.
+        """
+        self._version += 1
+        # the shader functions must be rebuilt
+        self._shader_map = None
+        self._shader_imap = None
+
     @property
     def Linear(self):
         b = True
@@ -428,7 +469,9 @@ class ChainTransform(Transform):
                     new_tr.extend(tr.transforms)
                 else:
                     new_tr.append(tr)
-            self._transforms = new_tr
+            if encountered_chains:
+                self._transforms = new_tr
+                self.update()
 
     def simplify(self):
         """
@@ -451,7 +494,9 @@ class ChainTransform(Transform):
                     new_tr.append(pr)
                 else:
                     new_tr.append(t2)
-            self._transforms = new_tr
+            if not exit:
+                self._transforms = new_tr
+                self.update()
             if exit:
                 break
         # todo: get rid of this in-place + return thing
@@ -465,6 +510,7 @@ class ChainTransform(Transform):
         Add a new Transform to the end of this chain.
         """
         self.transforms.append(tr)
+        self.update()
         # Keep simple for now. Let's look at efficienty later
         # I feel that this class should not decide when to compose transforms
 #         while len(self.transforms) > 0:
@@ -484,6 +530,7 @@ class ChainTransform(Transform):
         Add a new Transform to the beginning of this chain.
         """
         self.transforms.insert(0, tr)
+        self.update()
         # Keep simple for now. Let's look at efficienty later
 #         while len(self.transforms) > 0:
 #             pr = self.transforms[0] * tr
@@ -516,6 +563,77 @@ class ChainTransform(Transform):
         return "<ChainTransform [%s]>" % (", ".join(names))
 
 
+class TransformCache(object):
+    """
+    Cache of ChainTransforms, so that the same chain (and its shader
+    FunctionChain) is returned each time a chain of the same transforms is
+    requested.
+
+    The chains refer to the transforms themselves, so a chain remains valid
+    when its transforms change their parameters. It is only composed anew
+    if a ChainTransform in the path changed its list of transforms. The
+    chains are shared, so they must not be modified.
+
+    Arguments:
+
+    max_age : int
+        Chains that were not requested in this many calls to roll() are
+        removed from the cache.
+    """
+    def __init__(self, max_age=1):
+        self.max_age = max_age
+        self._cache = {}  # {transforms: [chain versions, chain, age]}
+        self._roots = {}  # {(name, scale, translate): [STTransform, age]}
+
+    def get(self, path):
+        """
+        Return a ChainTransform of the transforms in *path*.
+        """
+        key = tuple(path)
+        versions = tuple(tr._version for tr in key
+                         if isinstance(tr, ChainTransform))
+        entry = self._cache.get(key, None)
+        if entry is None or entry[0] != versions:
+            entry = self._cache[key] = [versions, ChainTransform(key), 0]
+        entry[2] = 0
+        return entry[1]
+
+    def get_rooted(self, name, root, path):
+        """
+        Return a ChainTransform of *root* followed by the transforms in
+        *path*.
+
+        *root* is an STTransform that is typically created anew for each
+        call (e.g. SceneCanvas.render_transform). Instead of *root*, the
+        chain starts with an STTransform of the cache with the same scale
+        and translation, which is shared by the chains with the same
+        *name* and root parameters. It is never modified, so a returned
+        chain remains valid when other roots are requested.
+        """
+        key = name, tuple(root.scale), tuple(root.translate)
+        entry = self._roots.get(key, None)
+        if entry is None:
+            entry = self._roots[key] = [STTransform(scale=root.scale,
+                                                    translate=root.translate),
+                                        0]
+        entry[1] = 0
+        return self.get([entry[0]] + list(path))
+
+    def roll(self):
+        """
+        Increase the age of all chains and roots, and remove the ones that
+        were not requested recently. Typically called once per draw.
+        """
+        for key, entry in list(self._cache.items()):
+            entry[2] += 1
+            if entry[2] > self.max_age:
+                del self._cache[key]
+        for key, entry in list(self._roots.items()):
+            entry[1] += 1
+            if entry[1] > self.max_age:
+                del self._roots[key]
+
+
 class NullTransform(Transform):
     """ Transform having no effect on coordinates (identity transform).
     """
@@ -588,13 +706,17 @@ class STTransform(Transform):
         return STTransform(scale=s, translate=t)
 
     def shader_map(self):
-        self._shader_map['scale'] = ('uniform', 'vec4', self.scale)
-        self._shader_map['translate'] = ('uniform', 'vec4', self.translate)
+        if self._shader_outdated(imap=False):
+            self._shader_map['scale'] = ('uniform', 'vec4', self.scale)
+            self._shader_map['translate'] = ('uniform', 'vec4',
+                                             self.translate)
         return self._shader_map
 
     def shader_imap(self):
-        self._shader_imap['scale'] = ('uniform', 'vec4', self.scale)
-        self._shader_imap['translate'] = ('uniform', 'vec4', self.translate)
+        if self._shader_outdated(imap=True):
+            self._shader_imap['scale'] = ('uniform', 'vec4', self.scale)
+            self._shader_imap['translate'] = ('uniform', 'vec4',
+                                              self.translate)
         return self._shader_imap
 
     @property
@@ -603,9 +725,11 @@ class STTransform(Transform):
 
     @scale.setter
     def scale(self, s):
-        self._scale[:len(s)] = s[:4]
-        self._scale[len(s):] = 1.0
-        self.shader_map()  # update shader variables
+        scale = np.ones(4, dtype=np.float32)
+        scale[:len(s)] = s[:4]
+        if np.any(scale != self._scale):
+            self._scale = scale
+            self.update()
 
     @property
     def translate(self):
@@ -613,9 +737,11 @@ class STTransform(Transform):
 
     @translate.setter
     def translate(self, t):
-        self._translate[:len(t)] = t[:4]
-        self._translate[len(t):] = 0.0
-        self.shader_map()  # update shader variables
+        translate = np.zeros(4, dtype=np.float32)
+        translate[:len(t)] = t[:4]
+        if np.any(translate != self._translate):
+            self._translate = translate
+            self.update()
 
     def as_affine(self):
         m = AffineTransform()
@@ -716,12 +842,14 @@ class AffineTransform(Transform):
 
     def shader_map(self):
         fn = super(AffineTransform, self).shader_map()
-        fn['matrix'] = ('uniform', 'mat4', self.matrix)
+        if self._shader_outdated(imap=False):
+            fn['matrix'] = ('uniform', 'mat4', self.matrix)
         return fn
 
     def shader_imap(self):
         fn = super(AffineTransform, self).shader_imap()
-        fn['inv_matrix'] = ('uniform', 'mat4', self.inv_matrix)
+        if self._shader_outdated(imap=True):
+            fn['inv_matrix'] = ('uniform', 'mat4', self.inv_matrix)
         return fn
 
     def inverse(self):
@@ -887,8 +1015,11 @@ class LogTransform(Transform):
 
     @base.setter
     def base(self, s):
-        self._base[:len(s)] = s
-        self._base[len(s):] = 0.0
+        base = np.zeros(3, dtype=np.float32)
+        base[:len(s)] = s
+        if np.any(base != self._base):
+            self._base = base
+            self.update()
 
     @arg_to_array
     def map(self, coords, base=None):
@@ -913,12 +1044,14 @@ class LogTransform(Transform):
 
     def shader_map(self):
         fn = super(LogTransform, self).shader_map()
-        fn['base'] = ('uniform', 'vec3', self.base)
+        if self._shader_outdated(imap=False):
+            fn['base'] = ('uniform', 'vec3', self.base)
         return fn
 
     def shader_imap(self):
         fn = super(LogTransform, self).shader_imap()
-        fn['base'] = ('uniform', 'vec3', self.base)
+        if self._shader_outdated(imap=True):
+            fn['base'] = ('uniform', 'vec3', self.base)
         return fn
 
     def __repr__(self):
@@ -10,7 +10,8 @@ Adapted to `vispy` by Eric Larson <larson.eric.d@gmail.com>.
 import numpy as np
 from os import path as op
 from ....gloo import (Program, VertexShader, FragmentShader, FrameBuffer,
-                      VertexBuffer, Texture2D, set_viewport)
+                      VertexBuffer, Texture2D, set_viewport,
+                      render_target_pool)
 
 this_dir = op.dirname(__file__)
 
@@ -255,7 +256,9 @@ class SDFRenderer(object):
         assert isinstance(texture, Texture2D)
 
         # calculate the negative half (within object)
-        orig_tex = Texture2D(255 - data, format='luminance')
+        orig_tex = render_target_pool.texture(data.shape, np.uint8,
+                                              'luminance')
+        orig_tex.set_data(255 - data)
         orig_tex.wrapping = 'clamp_to_edge'
         orig_tex.interpolation = 'nearest'
         edf_neg_tex = self._render_edf(orig_tex)
@@ -273,6 +276,7 @@ class SDFRenderer(object):
         set_viewport(offset[0], offset[1], size[0], size[1])
         self.program_insert.draw('triangle_strip')
         self.fbo_to[-1].deactivate()
+        render_target_pool.release(orig_tex, edf_pos_tex, edf_neg_tex)
 
     def _render_edf(self, orig_tex):
         """Render an EDF to a texture"""
@@ -281,8 +285,8 @@ class SDFRenderer(object):
 
         comp_texs = []
         for _ in range(2):
-            tex = Texture2D(shape=sdf_size + (4,), dtype=np.float32,
-                            format='rgba')
+            tex = render_target_pool.texture(sdf_size + (4,), np.float32,
+                                             'rgba')
             tex.interpolation = 'nearest'
             tex.wrapping = 'clamp_to_edge'
             comp_texs.append(tex)
@@ -308,4 +312,5 @@ class SDFRenderer(object):
             self.program_flood.draw('triangle_strip')
             self.fbo_to[last_rend].deactivate()
             stepsize //= 2
+        render_target_pool.release(comp_texs[1 - last_rend])
         return comp_texs[last_rend]
@@ -29,7 +29,8 @@ class TextureFont(object):
         SDF renderer to use.
     """
     def __init__(self, font, renderer):
-        self._atlas = TextureAtlas()
+        self._atlas = TextureAtlas(max_shape=(2048, 2048), max_pages=4,
+                                   on_evict=self._evict_char)
         self._atlas.wrapping = 'clamp_to_edge'
         self._renderer = renderer
         self._font = deepcopy(font)
@@ -58,8 +59,18 @@ class TextureFont(object):
             raise TypeError('index must be a 1-character string')
         if char not in self._glyphs:
             self._load_char(char)
+        else:
+            self._atlas.touch([char])
         return self._glyphs[char]
 
+    def touch(self, text):
+        """Mark the glyphs of the given text as used in this frame, so
+        that they are not evicted from the atlas"""
+        self._atlas.touch(text)
+
+    def _evict_char(self, char):
+        del self._glyphs[char]
+
     def _load_char(self, char):
         """Build and store a glyph corresponding to an individual character
 
@@ -84,19 +95,15 @@ class TextureFont(object):
         # Store, while scaling down to proper size
         height = data.shape[0] // self.ratio
         width = data.shape[1] // self.ratio
-        region = self._atlas.get_free_region(width + 2, height + 2)
+        page, region = self._atlas.allocate(char, width + 2, height + 2)
         if region is None:
+            del self._glyphs[char]
             raise RuntimeError('Cannot store glyph')
         x, y, w, h = region
         x, y, w, h = x + 1, y + 1, w - 2, h - 2
 
-        self._renderer.render_to_texture(data, self._atlas, (x, y), (w, h))
-        u0 = x / float(self._atlas.shape[1])
-        v0 = y / float(self._atlas.shape[0])
-        u1 = (x+w) / float(self._atlas.shape[1])
-        v1 = (y+h) / float(self._atlas.shape[0])
-        texcoords = (u0, v0, u1, v1)
-        glyph.update(dict(size=(w, h), texcoords=texcoords))
+        self._renderer.render_to_texture(data, page, (x, y), (w, h))
+        glyph.update(dict(size=(w, h), page=page, region=(x, y, w, h)))
 
 
 class FontManager(object):
@@ -118,7 +125,9 @@ class FontManager(object):
 
 
 def _text_to_vbo(text, font, anchor_x, anchor_y, lowres_size):
-    """Convert text characters to VBO"""
+    """Convert text characters to VBO, with the characters grouped per
+    atlas page. Also returns the (page, first, count) of each group of
+    indices."""
     text_vtype = np.dtype([('a_position', 'f4', 2),
                            ('a_texcoord', 'f4', 2)])
     vertices = np.zeros(len(text) * 4, dtype=text_vtype)
@@ -126,14 +135,19 @@ def _text_to_vbo(text, font, anchor_x, anchor_y, lowres_size):
     width = height = ascender = descender = 0
     ratio, slop = 1. / font.ratio, font.slop
     x_off = -slop
+    # Load all glyphs first, because the atlas may grow while loading
+    glyphs = [font[char] for char in text]
     for ii, char in enumerate(text):
-        glyph = font[char]
+        glyph = glyphs[ii]
         kerning = glyph['kerning'].get(prev, 0.) * ratio
         x0 = x_off + glyph['offset'][0] * ratio + kerning
         y0 = glyph['offset'][1] * ratio + slop
         x1 = x0 + glyph['size'][0]
         y1 = y0 - glyph['size'][1]
-        u0, v0, u1, v1 = glyph['texcoords']
+        x, y, w, h = glyph['region']
+        shape = glyph['page'].shape
+        u0, v0 = x / float(shape[1]), y / float(shape[0])
+        u1, v1 = (x+w) / float(shape[1]), (y+h) / float(shape[0])
         position = [[x0, y0], [x0, y1], [x1, y1], [x1, y0]]
         texcoords = [[u0, v0], [u0, v1], [u1, v1], [u1, v0]]
         vi = ii * 4
@@ -162,7 +176,18 @@ def _text_to_vbo(text, font, anchor_x, anchor_y, lowres_size):
         dx = -width / 2.
     vertices['a_position'] += (dx, dy)
     vertices['a_position'] /= lowres_size
-    return VertexBuffer(vertices)
+
+    # Group the characters per page
+    pages = font._atlas.pages
+    page_index = np.array([pages.index(glyph['page']) for glyph in glyphs])
+    order = np.argsort(page_index, kind='mergesort')
+    vertices = vertices.reshape(-1, 4)[order].ravel()
+    ranges = []
+    for index in np.unique(page_index):
+        first = int(np.searchsorted(page_index[order], index))
+        count = int((page_index == index).sum())
+        ranges.append((pages[index], first * 6, count * 6))
+    return VertexBuffer(vertices), ranges
 
 
 class Text(Visual):
@@ -220,13 +245,25 @@ class Text(Visual):
         self._font = self._font_manager.get_font(face, bold, italic)
         self._program = ModularProgram(self.VERTEX_SHADER,
                                        self.FRAGMENT_SHADER)
-        self._vertices = _text_to_vbo(text, self._font, anchor_x, anchor_y,
-                                      self._font._lowres_size)
+        self._text = text
+        self._anchors = anchor_x, anchor_y
+        self._build_vertices()
         self._color = color
         idx = (np.array([0, 1, 2, 0, 2, 3], np.uint32) +
                np.arange(0, 4*len(text), 4, dtype=np.uint32)[:, np.newaxis])
         self._ib = IndexBuffer(idx.ravel())
 
+    def _build_vertices(self):
+        # The texture coordinates depend on the shape of the atlas pages,
+        # which may grow while the glyphs are loaded
+        while True:
+            self._atlas_version = self._font._atlas.version
+            self._vertices, self._ranges = _text_to_vbo(
+                self._text, self._font, self._anchors[0], self._anchors[1],
+                self._font._lowres_size)
+            if self._font._atlas.version == self._atlas_version:
+                break
+
     def set_options(self):
         """Special function that is used to set the options. Automatically
         called at initialization."""
@@ -237,9 +274,16 @@ class Text(Visual):
         # attributes / uniforms are not available until program is built
         self._program.prepare()  # Force ModularProgram to set shaders
         self._program['u_color'] = self._color
-        self._program['u_font_atlas'] = self._font._atlas
+        # Reload the glyphs if any were evicted from the atlas, or if the
+        # atlas has grown
+        if self._font._atlas.version != self._atlas_version:
+            self._build_vertices()
+        self._font.touch(self._text)
         self._program.bind(self._vertices)
         # XXX Don't know why I need this to have it "take", but I do
         set_state(blend=True, depth_test=False,
                   blend_func=('src_alpha', 'one_minus_src_alpha'))
-        self._program.draw('triangles', self._ib)
+        for page, first, count in self._ranges:
+            self._program['u_font_atlas'] = page
+            self._program.draw('triangles', self._ib, first=first,
+                               count=count)
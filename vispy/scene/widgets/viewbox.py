@@ -215,13 +215,12 @@ class ViewBox(Widget):
         in any situation, regardless of the transformations to this
         viewbox.
 
-        TODO:
-        Right now, this implementation create a program, texture and FBO
-        on *each* draw, because it does not work otherwise. This is probably
-        a bug in gloo that prevents using two FBO's / programs at the same
-        time.
+        The FBO, texture and depth buffer are taken from the render
+        target pool of gloo, which takes them back at the end of the
+        frame, so that they are reused in the next draw.
 
-        Also, we use plain gloo and calculate the transformation
+        TODO:
+        We use plain gloo and calculate the transformation
         ourselves, assuming 2D only. Eventually we should just use the
         transform of self. I could not get that to work, probably
         because I do not understand the component system yet.
@@ -251,14 +250,9 @@ class ViewBox(Widget):
             }
         """
 
-        # todo: don't do this on every draw
-        if True:
+        if getattr(self, '_myprogram', None) is None:
             # Create program
             self._myprogram = gloo.Program(render_vertex, render_fragment)
-            # Create texture
-            self._tex = gloo.Texture2D(shape=(10, 10, 4), dtype=np.uint8)
-            self._tex.interpolation = gl.GL_LINEAR
-            self._myprogram['u_texture'] = self._tex
             # Create texcoords and vertices
             # Note y-axis is inverted here because the viewbox coordinate
             # system has origin in the upper-left, but the image is rendered
@@ -270,14 +264,6 @@ class ViewBox(Widget):
             self._myprogram['a_position'] = self._vert = \
                 gloo.VertexBuffer(position)
 
-        # Get fbo, ensure it exists
-        fbo = getattr(self, '_fbo', None)
-        if True:  # fbo is None:
-            self._fbo = 4
-            self._fbo = fbo = gloo.FrameBuffer(self._tex,
-                                               depth=gloo.DepthBuffer((10,
-                                                                       10)))
-
         # Set texture coords to make the texture be drawn in the right place
         # Note that we would just use -1..1 if we would use a Visual.
         coords = [[0, 0], [self.size[0], self.size[1]]]
@@ -291,10 +277,14 @@ class ViewBox(Widget):
                             np.float32)
         self._vert.set_data(vertices)
 
-        # Set fbo size (mind that this is set using shape!)
+        # Get fbo of the right size (mind that this is set using shape!)
         resolution = [int(i+0.5) for i in self._resolution]  # set in draw()
         shape = resolution[1], resolution[0]
-        fbo.color_buffer.resize(shape+(4,))
-        fbo.depth_buffer.resize(shape)
+        pool = gloo.render_target_pool
+        self._tex = pool.texture(shape + (4,), np.uint8)
+        self._tex.interpolation = gl.GL_LINEAR
+        self._myprogram['u_texture'] = self._tex
+        depth = pool.render_buffer(gloo.DepthBuffer, shape)
+        fbo = pool.frame_buffer(self._tex, depth=depth)
 
         return fbo
@@ -16,5 +16,6 @@ from . import cube        # noqa
 from . import fonts       # noqa
 from . import transforms  # noqa
 from ._run import run_subprocess  # noqa
+from ._cache import lru_cache  # noqa
 from ._wrapper import test  # noqa
 from .image import make_png  # noqa
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Vispy Development Team. All Rights Reserved.
+# Distributed under the (new) BSD License. See LICENSE.txt for more info.
+
+from functools import wraps
+
+from .ordereddict import OrderedDict
+
+
+def lru_cache(maxsize=1024):
+    """Decorator that caches the results of a function
+
+    Like functools.lru_cache, which is not available on Python 2. The
+    results for the ``maxsize`` most recently used arguments are kept.
+    The results are shared between callers, so they must not be
+    modified.
+
+    Parameters
+    ----------
+    maxsize : int
+        The max number of cached results.
+
+    Returns
+    -------
+    decorator : callable
+        Decorator for a function of hashable positional arguments. The
+        decorated function gets a ``cache_info()`` method, which returns
+        (hits, misses, maxsize, currsize), and a ``cache_clear()``
+        method.
+    """
+    def decorator(func):
+        cache = OrderedDict()
+        stats = [0, 0]  # hits, misses
+
+        @wraps(func)
+        def wrapper(*args):
+            try:
+                result = cache.pop(args)
+                stats[0] += 1
+            except KeyError:
+                result = func(*args)
+                stats[1] += 1
+                if len(cache) >= maxsize:
+                    cache.popitem(last=False)
+            cache[args] = result  # (re)insert as most recently used
+            return result
+
+        def cache_info():
+            return stats[0], stats[1], maxsize, len(cache)
+
+        def cache_clear():
+            cache.clear()
+            stats[:] = [0, 0]
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
@@ -44,8 +44,14 @@ def use(app=None, gl=None):
         * 'angle': (TO COME) use real OpenGL ES 2.0 on Windows via Angle.
             Availability of ES 2.0 is larger for Windows, since it relies
             on DirectX.
+        * 'mock': record the GL commands without executing them. For
+            testing and profiling without a GPU.
         * If 'debug' is included in this argument, vispy will check for
           errors after each gl command.
+        * If 'shadow' is included in this argument, vispy will skip gl
+          commands that do not change the gl state.
+        * If 'profile' is included in this argument, vispy will collect
+          statistics of the gl commands per frame (see ``gl.stats()``).
     
     Notes
     -----
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from nose.tools import assert_equal
+
+from vispy.util import lru_cache
+
+
+def test_lru_cache():
+    """Test caching the results of a function
+    """
+    calls = []
+
+    @lru_cache(maxsize=2)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert_equal(square.__name__, 'square')
+    assert_equal([square(2), square(3), square(2)], [4, 9, 4])
+    assert_equal(calls, [2, 3])
+    assert_equal(square.cache_info(), (1, 2, 2, 2))
+    # The least recently used result is dropped
+    square(4)
+    square(2)
+    square(3)
+    assert_equal(calls, [2, 3, 4, 3])
+    square.cache_clear()
+    assert_equal(square.cache_info(), (0, 0, 2, 0))